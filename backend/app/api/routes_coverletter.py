@@ -1,18 +1,37 @@
+import asyncio
 import json
 import re
+import time
 from typing import Optional
 from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-from app.services.openai_client import run_llm
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, model_validator
+from app.services.openai_client import run_llm, llm_rate_limited
+from app.services.prompt_budget import Section, fit_sections, prompt_budget
+from app.services.llm_stream import sse_json_events
+from app.services.candidate_profile import extract_profile, get_profile_store, render_profile
+from app.services.llm_limiter import LLMOverloaded
+from app.schemas.coverletter import CoverLetterBatchRequest, CoverLetterJob
+from app.core.config import settings
+from app.utils.http import raise_if_rate_limited, raise_llm_busy, retry_after_seconds
+from app.utils.sse import SSE_HEADERS
 
 # --- СХЕМЫ ДАННЫХ ---
 class CoverLetterRequest(BaseModel):
-    resume_text: str
+    # Нужно одно из двух: полный текст резюме или profile_id из /api/profile
+    resume_text: Optional[str] = None
+    profile_id: Optional[str] = None
     job_title: str
     company: str
     job_description: str
     tone: str = "professional"
 
+    @model_validator(mode="after")
+    def _resume_or_profile(self):
+        if not self.resume_text and not self.profile_id:
+            raise ValueError("resume_text or profile_id is required")
+        return self
+
 class CoverLetterResponse(BaseModel):
     letter: str
     short_email: str
@@ -45,12 +64,27 @@ def _safe_json_parse(data):
                 pass
         raise ValueError("LLM returned invalid JSON format")
 
-# -----------------------------
-# GENERATE ENDPOINT
-# -----------------------------
-@router.post("/generate", response_model=CoverLetterResponse)
-def generate_cover_letter(payload: CoverLetterRequest):
-    prompt = f"""
+async def _candidate_text(payload: CoverLetterRequest) -> str:
+    """Профиль (если передан profile_id) короче полного резюме и уже без шума."""
+    if not payload.profile_id:
+        return payload.resume_text
+    profile = await get_profile_store().get(payload.profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Unknown profile_id")
+    return render_profile(profile)
+
+
+def _build_prompt(payload: CoverLetterRequest | CoverLetterJob, candidate: str) -> str:
+    # Резюме важнее описания вакансии; обе секции ужимаются под бюджет токенов
+    fitted = fit_sections(
+        [
+            Section("job_description", payload.job_description, priority=1, min_tokens=300),
+            Section("resume_text", candidate, priority=2, min_tokens=800),
+        ],
+        budget=prompt_budget() - 300,
+    )
+
+    return f"""
 Сгенерируй сопроводительное письмо и короткий email вариант.
 
 Верни ТОЛЬКО JSON:
@@ -64,30 +98,141 @@ def generate_cover_letter(payload: CoverLetterRequest):
 Компания: {payload.company}
 
 Описание вакансии:
-\"\"\"{payload.job_description}\"\"\"
+\"\"\"{fitted["job_description"]}\"\"\"
 
 Резюме кандидата:
-\"\"\"{payload.resume_text}\"\"\"
+\"\"\"{fitted["resume_text"]}\"\"\"
 """
 
+
+def _finalize(data: dict) -> dict:
+    # Проверка наличия полей в ответе
+    return CoverLetterResponse(
+        letter=data.get("letter") or "Не удалось сгенерировать основное письмо.",
+        short_email=data.get("short_email") or "Не удалось сгенерировать email-вариант.",
+    ).model_dump()
+
+# -----------------------------
+# GENERATE ENDPOINT
+# -----------------------------
+@router.post("/generate", response_model=CoverLetterResponse)
+async def generate_cover_letter(payload: CoverLetterRequest, stream: bool = False):
+    """
+    stream=true — ответ в виде SSE: поля letter и short_email приходят
+    событиями field по мере готовности, итоговая модель — событием done.
+    """
+    prompt = _build_prompt(payload, await _candidate_text(payload))
+
+    if stream:
+        return StreamingResponse(
+            sse_json_events(prompt, system=SYSTEM, temperature=0.4, finalize=_finalize),
+            media_type="text/event-stream",
+            headers=SSE_HEADERS,
+        )
+
     try:
         # Вызов ИИ
-        out = run_llm(prompt, system=SYSTEM, temperature=0.4)
+        out = await run_llm(prompt, system=SYSTEM, temperature=0.4)
+        raise_if_rate_limited(out)
 
         # Безопасный парсинг
         data = _safe_json_parse(out)
 
-        # Проверка наличия полей в ответе
-        final_data = {
-            "letter": data.get("letter") or "Не удалось сгенерировать основное письмо.",
-            "short_email": data.get("short_email") or "Не удалось сгенерировать email-вариант."
-        }
-
-        return final_data
+        return _finalize(data)
 
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"!!! Error in Cover Letter generation: {str(e)}")
         raise HTTPException(
             status_code=500,
             detail=f"Cover letter generation failed: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+
+# -----------------------------
+# ПАКЕТ ПИСЕМ
+# -----------------------------
+
+async def _batch_candidate(payload: CoverLetterBatchRequest) -> tuple[str, Optional[str]]:
+    """
+    Резюме сжимается один раз на весь пакет — в профиль кандидата
+    (он же сохраняется и переиспользуется следующими запросами).
+    """
+    if payload.profile_id:
+        profile = await get_profile_store().get(payload.profile_id)
+        if profile is None:
+            raise HTTPException(status_code=404, detail="Unknown profile_id")
+        return render_profile(profile), profile.id
+
+    try:
+        profile = await extract_profile(payload.resume_text)
+        return render_profile(profile), profile.id
+    except LLMOverloaded as e:
+        raise_llm_busy(e.retry_after)
+    except Exception as e:
+        # Без профиля письма всё равно пишем — по резюме, ужатому под бюджет
+        print(f"!!! Profile extraction failed, using resume text: {str(e)}")
+        return payload.resume_text, None
+
+
+async def _batch_lines(jobs: list[CoverLetterJob], candidate: str, profile_id: Optional[str]):
+    """
+    Письма генерируются параллельно, но не больше COVER_BATCH_CONCURRENCY
+    одновременно; строки NDJSON отдаются по мере готовности.
+    """
+    semaphore = asyncio.Semaphore(settings.COVER_BATCH_CONCURRENCY)
+
+    async def one(index: int, job: CoverLetterJob) -> dict:
+        started = time.monotonic()
+        line = {"index": index, "job_title": job.job_title, "company": job.company}
+        try:
+            async with semaphore:
+                out = await run_llm(_build_prompt(job, candidate), system=SYSTEM, temperature=0.4)
+            retry_after = llm_rate_limited(out)
+            if retry_after is not None:
+                line.update(status="error", error="llm_rate_limited", retry_after=retry_after_seconds(retry_after))
+            else:
+                line.update(status="ok", **_finalize(_safe_json_parse(out)))
+        except Exception as e:
+            print(f"!!! Error in Cover Letter batch ({job.company}): {str(e)}")
+            line.update(status="error", error=str(e))
+        line["elapsed"] = round(time.monotonic() - started, 3)
+        return line
+
+    tasks = [asyncio.create_task(one(i, job)) for i, job in enumerate(jobs)]
+    failed = 0
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            line = await next_done
+            failed += line["status"] != "ok"
+            yield json.dumps(line, ensure_ascii=False) + "\n"
+        yield json.dumps(
+            {"done": True, "total": len(tasks), "failed": failed, "profile_id": profile_id}
+        ) + "\n"
+    finally:
+        # Клиент отключился — не тратим лимиты OpenAI на остаток пакета
+        for task in tasks:
+            task.cancel()
+
+
+@router.post("/generate/batch")
+async def generate_cover_letters_batch(payload: CoverLetterBatchRequest):
+    """
+    Письма на несколько вакансий по одному резюме.
+    Ответ — application/x-ndjson: по строке на вакансию в порядке готовности
+    (index — позиция в jobs), в конце {"done": true, ..., "profile_id"}.
+    """
+    if len(payload.jobs) > settings.COVER_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Too many jobs: {len(payload.jobs)} > {settings.COVER_BATCH_MAX_ITEMS}",
+        )
+
+    candidate, profile_id = await _batch_candidate(payload)
+
+    return StreamingResponse(
+        _batch_lines(payload.jobs, candidate, profile_id),
+        media_type="application/x-ndjson",
+        headers={"X-Accel-Buffering": "no"},
+    )
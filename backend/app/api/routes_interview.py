@@ -1,11 +1,19 @@
 from fastapi import APIRouter, HTTPException, Form
 from app.schemas.interview import (
+    InterviewEvaluateBatchRequest,
     InterviewStartRequest,
+    InterviewStartResponse,
     InterviewTurnRequest,
     InterviewTurnResponse,
 )
-from app.services.interview import interview_turn
+from app.services.interview import interview_turn, start_interview
 from app.services.openai_client import run_llm
+from app.services.candidate_profile import get_profile_store, render_profile
+from app.services.interview_eval import EVAL_SYSTEM, evaluate_answers, evaluate_prompt
+from app.services.llm_limiter import LLMOverloaded
+from app.services.question_pool import QUESTIONS_SYSTEM, questions_prompt, sample_questions, seed_questions
+from app.core.config import settings
+from app.utils.http import raise_if_rate_limited, raise_llm_busy
 import json
 import re
 
@@ -17,32 +25,33 @@ router = APIRouter(prefix="/api/interview", tags=["interview"])
 # -----------------------------
 
 @router.post("/start")
-def interview_start(payload: InterviewStartRequest):
+async def interview_start(payload: InterviewStartRequest):
     try:
-        system = "Ты HR эксперт. Отвечай ТОЛЬКО валидным JSON, без лишнего текста."
-
-        prompt = f"""
-Сгенерируй 6-8 вопросов для собеседования.
-
-Позиция: {payload.role}
-Уровень: {payload.level}
-Фокус: {payload.focus or "общий"}
-
-Верни ТОЛЬКО JSON:
-
-{{
-  "questions": [
-    {{"type": "general", "question": "вопрос"}},
-    {{"type": "technical", "question": "вопрос"}}
-  ]
-}}
-"""
-
-        out = run_llm(prompt, system=system, temperature=0.7)
+        candidate = ""
+        if payload.profile_id:
+            profile = await get_profile_store().get(payload.profile_id)
+            if profile is None:
+                raise HTTPException(status_code=404, detail="Unknown profile_id")
+            candidate = f"\nКандидат (учитывай его опыт и навыки):\n{render_profile(profile)}\n"
+        elif settings.QUESTION_POOL_ENABLED:
+            # Популярные роли — из заранее сгенерированного пула, без LLM
+            pooled = await sample_questions(payload.role, payload.level, payload.focus)
+            if pooled:
+                return {"questions": [{**q, "id": i} for i, q in enumerate(pooled, 1)]}
+
+        prompt = questions_prompt(payload.role, payload.level, payload.focus, "6-8", candidate)
+
+        # Вопросы должны каждый раз быть разными — кэш не нужен
+        out = await run_llm(prompt, system=QUESTIONS_SYSTEM, temperature=0.7, cache=False)
+        raise_if_rate_limited(out)
 
         # Здесь была ошибка: передаем 'out' в парсер
         data = _safe_json_parse(out)
 
+        # Новая роль: живые вопросы становятся началом её пула
+        if not payload.profile_id and settings.QUESTION_POOL_ENABLED and data.get("questions"):
+            await seed_questions(payload.role, payload.level, payload.focus, data["questions"])
+
         # Добавляем id для фронта
         if data and "questions" in data:
             for i, q in enumerate(data.get("questions", []), 1):
@@ -50,6 +59,8 @@ def interview_start(payload: InterviewStartRequest):
 
         return data
 
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"!!! Error in interview_start: {e}")
         raise HTTPException(
@@ -69,32 +80,16 @@ async def interview_evaluate(
     position: str = Form(...)
 ):
     try:
-        system = "Ты строгий HR эксперт. Отвечай ТОЛЬКО JSON."
-
-        prompt = f"""
-Оцени ответ кандидата.
-
-Позиция: {position}
-Вопрос: {question}
-Ответ: {answer}
+        prompt = evaluate_prompt(position, question, answer)
 
-Верни JSON:
-
-{{
-  "evaluation": {{
-    "score": 1-10,
-    "positive": "что было хорошо",
-    "improvements": "что улучшить",
-    "better_answer": "пример сильного ответа"
-  }}
-}}
-"""
-
-        out = run_llm(prompt, system=system, temperature=0.5)
+        out = await run_llm(prompt, system=EVAL_SYSTEM, temperature=0.5)
+        raise_if_rate_limited(out)
         data = _safe_json_parse(out)
 
         return data
 
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"!!! Error in evaluate: {e}")
         raise HTTPException(
@@ -103,14 +98,57 @@ async def interview_evaluate(
         )
 
 
+@router.post("/evaluate/batch")
+async def interview_evaluate_batch(payload: InterviewEvaluateBatchRequest):
+    """Все ответы интервью разом: вместо N вызовов /evaluate — один или несколько пакетов."""
+    if len(payload.answers) > settings.INTERVIEW_EVAL_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Too many answers: {len(payload.answers)} > {settings.INTERVIEW_EVAL_MAX_ITEMS}",
+        )
+    try:
+        return await evaluate_answers(
+            payload.position, [(a.question, a.answer) for a in payload.answers]
+        )
+    except LLMOverloaded as e:
+        raise_llm_busy(e.retry_after)
+    except Exception as e:
+        print(f"!!! Error in evaluate batch: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Evaluation failed: {str(e)}"
+        )
+
+
 # -----------------------------
 # OLD TURN LOGIC
 # -----------------------------
 
+@router.post("/session", response_model=InterviewStartResponse)
+async def interview_session_start(payload: InterviewStartRequest):
+    """Сессия для /turn; профиль кандидата (profile_id) идёт в каждый ход."""
+    profile = None
+    if payload.profile_id:
+        stored = await get_profile_store().get(payload.profile_id)
+        if stored is None:
+            raise HTTPException(status_code=404, detail="Unknown profile_id")
+        profile = render_profile(stored)
+    try:
+        return await start_interview(payload.role, payload.level, payload.focus, profile=profile)
+    except LLMOverloaded as e:
+        raise_llm_busy(e.retry_after)
+    except Exception as e:
+        print(f"!!! Error in interview session start: {e}")
+        raise HTTPException(
+            status_code=500,
+            detail=f"Interview session start failed: {str(e)}"
+        )
+
+
 @router.post("/turn", response_model=InterviewTurnResponse)
-def interview_turn_endpoint(payload: InterviewTurnRequest):
+async def interview_turn_endpoint(payload: InterviewTurnRequest):
     try:
-        return interview_turn(
+        return await interview_turn(
             session_id=payload.session_id,
             answer=payload.answer
         )
@@ -145,4 +183,5 @@ def _safe_json_parse(text):
         except:
             pass
 
-        raise ValueError(f"LLM returned invalid JSON format. Received: {type(text)}")
\ No newline at end of file
+        raise ValueError(f"LLM returned invalid JSON format. Received: {type(text)}")
+
@@ -1,20 +1,30 @@
 from fastapi import APIRouter, HTTPException
 from app.schemas.matching import MatchingRequest
 from app.services.matching import recommend_internships
+from app.services.candidate_profile import get_profile_store
 
 router = APIRouter(prefix="/api/jobs", tags=["matching"])
 
 
 @router.post("/match")
-def match_jobs(payload: MatchingRequest):
+async def match_jobs(payload: MatchingRequest):
     try:
+        profile = None
+        if payload.profile_id:
+            profile = await get_profile_store().get(payload.profile_id)
+            if profile is None:
+                raise HTTPException(status_code=404, detail="Unknown profile_id")
+
         # Вызываем сервис подбора
-        result = recommend_internships(
+        result = await recommend_internships(
             target_role=payload.target_role,
             user_skills=payload.user_skills,
             resume_text=payload.resume_text,
             internships=payload.internships,
             top_k=payload.top_k or 10,
+            mode=payload.mode,
+            profile=profile,
+            filters=payload.filters,
         )
 
         jobs = []
@@ -53,6 +63,8 @@ def match_jobs(payload: MatchingRequest):
 
         return {"jobs": jobs}
 
+    except HTTPException:
+        raise
     except Exception as e:
         # Печатаем ошибку, чтобы видеть её в терминале
         print(f"!!! MATCHING ERROR: {str(e)}")
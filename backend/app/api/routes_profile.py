@@ -0,0 +1,50 @@
+from fastapi import APIRouter, HTTPException, UploadFile, File
+from app.core.config import settings
+from app.schemas.profile import CandidateProfile, ProfileExtractRequest
+from app.services.candidate_profile import extract_profile, get_profile_store
+from app.services.llm_limiter import LLMOverloaded
+from app.services.resume_cache import extract_resume_text
+from app.utils.file_parse import ParseTimeout
+from app.utils.http import raise_llm_busy
+from app.utils.upload import read_upload
+
+router = APIRouter(prefix="/api/profile", tags=["profile"])
+
+
+async def _extract_or_raise(resume_text: str) -> CandidateProfile:
+    if not resume_text.strip():
+        raise HTTPException(status_code=400, detail="Empty resume")
+    try:
+        return await extract_profile(resume_text)
+    except LLMOverloaded as e:
+        raise_llm_busy(e.retry_after)
+    except Exception as e:
+        print(f"!!! Error in profile extraction: {e}")
+        raise HTTPException(status_code=500, detail=f"Profile extraction failed: {str(e)}")
+
+
+@router.post("/extract", response_model=CandidateProfile)
+async def profile_extract(payload: ProfileExtractRequest):
+    """
+    Профиль по тексту резюме. Дальше в /api/jobs/match, /api/cover-letter/generate
+    и /api/interview/start можно передавать profile_id вместо resume_text.
+    """
+    return await _extract_or_raise(payload.resume_text)
+
+
+@router.post("/upload", response_model=CandidateProfile)
+async def profile_upload(file: UploadFile = File(...)):
+    data = await read_upload(file, settings.RESUME_MAX_UPLOAD_BYTES)
+    try:
+        text = await extract_resume_text(file.filename, data)
+    except ParseTimeout as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return await _extract_or_raise(text)
+
+
+@router.get("/{profile_id}", response_model=CandidateProfile)
+async def profile_get(profile_id: str):
+    profile = await get_profile_store().get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Unknown profile_id")
+    return profile
@@ -1,27 +1,48 @@
+import asyncio
 import json
+import time
 from fastapi import APIRouter, UploadFile, File, Form, HTTPException
-from app.utils.file_parse import extract_text
+from fastapi.responses import StreamingResponse
+from app.utils.file_parse import ParseTimeout
+from app.utils.http import raise_if_rate_limited, raise_llm_busy
+from app.utils.upload import read_upload
+from app.utils.sse import SSE_HEADERS, sse_event
+from app.core.config import settings
 from app.services.openai_client import run_llm
+from app.services.llm_stream import sse_json_events
+from app.services.llm_limiter import LLMOverloaded
+from app.services.resume_mapreduce import needs_map_reduce, map_chunks, reduce_prompt
+from app.services.resume_cache import resume_analysis_cache, analysis_key, extract_resume_text
+from app.services.candidate_profile import extract_profile
+from app.utils.cache import MISSING
+from app.services.prompt_budget import truncate_to_tokens
 
 router = APIRouter(tags=["resume"])
 
+# Увеличивать при любом изменении SYSTEM / _build_prompt / _build_analysis —
+# закэшированные анализы старой версии перестают использоваться
+PROMPT_VERSION = 2
+
 SYSTEM = (
     "Ты карьерный ассистент. Отвечай по-русски. "
     "Верни СТРОГО валидный JSON. Никакого лишнего текста."
 )
 
-@router.post("/analyze-resume")
-async def resume_review(
-    file: UploadFile = File(...),
-    target_role: str | None = Form(None),
-):
-    try:
-        # 1. Считываем файл и извлекаем текст
-        data = await file.read()
-        text = extract_text(file.filename, data)
 
-        # 1. Мы явно говорим ИИ, какие ключи нам нужны в JSON
-        prompt = f"""
+async def _cached_analysis(text: str, target_role: str | None):
+    if not settings.RESUME_CACHE_ENABLED:
+        return MISSING
+    return await resume_analysis_cache.get(analysis_key(text, target_role, PROMPT_VERSION))
+
+
+async def _store_analysis(text: str, target_role: str | None, analysis: dict) -> None:
+    if settings.RESUME_CACHE_ENABLED:
+        await resume_analysis_cache.set(analysis_key(text, target_role, PROMPT_VERSION), analysis)
+
+
+def _build_prompt(text: str, target_role: str | None) -> str:
+    # 1. Мы явно говорим ИИ, какие ключи нам нужны в JSON
+    return f"""
         Проанализируй резюме на роль: {target_role or 'не указана'}.
         
         Верни JSON строго с этими ключами:
@@ -31,36 +52,230 @@ async def resume_review(
         "recommendations": список строк (конкретные советы по улучшению)
         
         Текст резюме:
-        \"\"\"{text[:4000]}\"\"\"
+        \"\"\"{truncate_to_tokens(text, settings.RESUME_TOKEN_BUDGET)}\"\"\"
         """
-        
-        raw = run_llm(prompt, system=SYSTEM, temperature=0.2)
-
-        if isinstance(raw, dict) and "error" in raw:
-            raise ValueError(f"LLM Error: {raw.get('message', raw['error'])}")
-
-        # 2. Теперь мы точно знаем, какие ключи ожидать
-        score = int(raw.get("score", 70))
-
-        return {
-            "analysis": {
-                "overall_score": score,
-                "structure_score": int(score * 0.9),
-                "experience_score": int(score * 0.95),
-                "skills_score": int(score * 0.92),
-                "grammar_score": int(score * 0.98),
-                
-                # Мапим ключи так, как их ждет фронтенд
-                "recommendations": raw.get("recommendations") or [],
-                "strengths": raw.get("strengths") or [],
-                "weaknesses": raw.get("weaknesses") or raw.get("issues") or []
-            }
+
+
+def _build_analysis(raw: dict) -> dict:
+    # 2. Теперь мы точно знаем, какие ключи ожидать
+    score = int(raw.get("score", 70))
+
+    return {
+        "analysis": {
+            "overall_score": score,
+            "structure_score": int(score * 0.9),
+            "experience_score": int(score * 0.95),
+            "skills_score": int(score * 0.92),
+            "grammar_score": int(score * 0.98),
+            
+            # Мапим ключи так, как их ждет фронтенд
+            "recommendations": raw.get("recommendations") or [],
+            "strengths": raw.get("strengths") or [],
+            "weaknesses": raw.get("weaknesses") or raw.get("issues") or []
         }
+    }
+
+
+async def _final_prompt(text: str, target_role: str | None) -> str:
+    """Короткое резюме — один вызов; длинное — сначала map по кускам, затем reduce."""
+    if not needs_map_reduce(text):
+        return _build_prompt(text, target_role)
+    notes = await map_chunks(text, target_role)
+    return reduce_prompt(text, notes, target_role)
+
+
+async def _analyze(text: str, target_role: str | None) -> dict:
+    cached = await _cached_analysis(text, target_role)
+    if cached is not MISSING:
+        return cached
+
+    try:
+        prompt = await _final_prompt(text, target_role)
+    except LLMOverloaded as e:
+        raise_llm_busy(e.retry_after)
+
+    raw = await run_llm(prompt, system=SYSTEM, temperature=0.2)
+
+    raise_if_rate_limited(raw)
+
+    if isinstance(raw, dict) and "error" in raw:
+        raise ValueError(f"LLM Error: {raw.get('message', raw['error'])}")
+
+    analysis = _build_analysis(raw)
+    await _store_analysis(text, target_role, analysis)
+    return analysis
+
+
+async def _profile_id(text: str) -> str | None:
+    """Профиль извлекается параллельно с анализом; его сбой анализ не ломает."""
+    try:
+        return (await extract_profile(text)).id
+    except Exception as e:
+        print(f"!!! Профиль не извлечён: {str(e)}")
+        return None
+
+
+async def _stream_analysis(text: str, target_role: str | None):
+    """SSE-вариант: из кэша — сразу done, иначе поток от LLM с сохранением итога."""
+    profile_task = asyncio.create_task(_profile_id(text))
+    try:
+        async for event in _stream_analysis_events(text, target_role):
+            yield event
+        yield sse_event("profile", {"profile_id": await profile_task})
+    finally:
+        profile_task.cancel()
 
+
+async def _stream_analysis_events(text: str, target_role: str | None):
+    cached = await _cached_analysis(text, target_role)
+    if cached is not MISSING:
+        yield sse_event("done", cached)
+        return
+
+    if needs_map_reduce(text):
+        # Map-этап не стримится — сообщаем клиенту, что идёт разбор по частям
+        yield sse_event("stage", {"name": "map"})
+    try:
+        prompt = await _final_prompt(text, target_role)
+    except LLMOverloaded as e:
+        yield sse_event("error", {"detail": "LLM is busy, try again later", "retry_after": e.retry_after})
+        return
+    except Exception as e:
+        print(f"!!! ОШИБКА MAP-ЭТАПА: {str(e)}")
+        yield sse_event("error", {"detail": str(e)})
+        return
+
+    result = {}
+
+    def finalize(raw: dict) -> dict:
+        result["analysis"] = _build_analysis(raw)
+        return result["analysis"]
+
+    async for event in sse_json_events(prompt, system=SYSTEM, temperature=0.2, finalize=finalize):
+        yield event
+
+    if "analysis" in result:
+        await _store_analysis(text, target_role, result["analysis"])
+
+
+@router.post("/analyze-resume")
+async def resume_review(
+    file: UploadFile = File(...),
+    target_role: str | None = Form(None),
+    stream: bool = Form(False),
+):
+    """
+    stream=true — ответ в виде SSE: score и элементы strengths/weaknesses/
+    recommendations приходят по мере генерации, итоговый анализ — событием done.
+    Длинное резюме анализируется целиком через map-reduce (событие stage = map).
+    В ответе (или событии profile) — profile_id извлечённого профиля кандидата.
+    """
+    try:
+        # 1. Считываем файл и извлекаем текст
+        data = await read_upload(file, settings.RESUME_MAX_UPLOAD_BYTES)
+        try:
+            text = await extract_resume_text(file.filename, data)
+        except ParseTimeout as e:
+            raise HTTPException(status_code=422, detail=str(e))
+
+        if stream:
+            return StreamingResponse(
+                _stream_analysis(text, target_role),
+                media_type="text/event-stream",
+                headers=SSE_HEADERS,
+            )
+
+        analysis, profile_id = await asyncio.gather(_analyze(text, target_role), _profile_id(text))
+        # profile_id — для /api/jobs/match, /api/cover-letter/generate, /api/interview/start
+        return {**analysis, "profile_id": profile_id}
+
+    except HTTPException:
+        raise
     except Exception as e:
         # Печатаем подробности в консоль для отладки
         print(f"!!! ОШИБКА БЭКЕНДА: {str(e)}")
         raise HTTPException(
             status_code=500, 
             detail=f"Resume analysis failed: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+
+# -----------------------------
+# ПАКЕТНЫЙ АНАЛИЗ
+# -----------------------------
+
+async def _batch_lines(items: list, target_role: str | None):
+    """
+    items — [(index, name, bytes | None, text | None)].
+    Разбор файлов идёт в пуле потоков, LLM-вызовы — параллельно, но не больше
+    RESUME_BATCH_CONCURRENCY одновременно. Строки NDJSON отдаются по мере готовности.
+    """
+    semaphore = asyncio.Semaphore(settings.RESUME_BATCH_CONCURRENCY)
+
+    async def one(index: int, name: str, data: bytes | None, text: str | None) -> dict:
+        started = time.monotonic()
+        line = {"index": index, "name": name}
+        try:
+            if text is None:
+                text = await extract_resume_text(name, data)
+            if not text.strip():
+                raise ValueError("empty resume")
+            async with semaphore:
+                line.update(status="ok", **await _analyze(text, target_role))
+        except HTTPException as e:
+            retry_after = (e.headers or {}).get("Retry-After")
+            line.update(status="error", error="llm_rate_limited" if e.status_code == 503 else str(e.detail))
+            if retry_after:
+                line["retry_after"] = int(retry_after)
+        except Exception as e:
+            print(f"!!! ОШИБКА ПАКЕТНОГО АНАЛИЗА ({name}): {str(e)}")
+            line.update(status="error", error=str(e))
+        line["elapsed"] = round(time.monotonic() - started, 3)
+        return line
+
+    tasks = [asyncio.create_task(one(*item)) for item in items]
+    failed = 0
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            line = await next_done
+            failed += line["status"] != "ok"
+            yield json.dumps(line, ensure_ascii=False) + "\n"
+        yield json.dumps({"done": True, "total": len(tasks), "failed": failed}) + "\n"
+    finally:
+        # Клиент отключился — не тратим лимиты OpenAI на остаток пакета
+        for task in tasks:
+            task.cancel()
+
+
+@router.post("/analyze-resume/batch")
+async def resume_review_batch(
+    files: list[UploadFile] = File(default=[]),
+    texts: list[str] = Form(default=[]),
+    target_role: str | None = Form(None),
+):
+    """
+    Много резюме за один запрос (файлы и/или тексты).
+    Ответ — application/x-ndjson: по строке на резюме в порядке готовности
+    (index — позиция во входе: сначала files, затем texts), в конце {"done": true, ...}.
+    """
+    total = len(files) + len(texts)
+    if total == 0:
+        raise HTTPException(status_code=400, detail="No resumes provided")
+    if total > settings.RESUME_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Too many resumes: {total} > {settings.RESUME_BATCH_MAX_ITEMS}",
+        )
+
+    # Файлы читаем до начала ответа: после выхода из обработчика они закрываются
+    items = []
+    for file in files:
+        items.append((len(items), file.filename, await read_upload(file, settings.RESUME_MAX_UPLOAD_BYTES), None))
+    for i, text in enumerate(texts):
+        items.append((len(items), f"text[{i}]", None, text))
+
+    return StreamingResponse(
+        _batch_lines(items, target_role),
+        media_type="application/x-ndjson",
+        headers={"X-Accel-Buffering": "no"},
+    )
@@ -4,8 +4,146 @@ class Settings(BaseSettings):
     OPENAI_API_KEY: str
     OPENAI_MODEL: str = "gpt-4.1-mini"
 
+    # --- HTTP пул для OpenAI (один на воркер) ---
+    OPENAI_TIMEOUT: float = 60.0
+    OPENAI_CONNECT_TIMEOUT: float = 5.0
+    OPENAI_MAX_CONNECTIONS: int = 200
+    OPENAI_MAX_KEEPALIVE: int = 50
+    OPENAI_KEEPALIVE_EXPIRY: float = 30.0
+    OPENAI_HTTP2: bool = True
+    OPENAI_WARMUP: bool = True
+
+    # --- Лимиты OpenAI (на модель, на воркер) ---
+    LLM_RPM: float = 500
+    LLM_TPM: float = 200_000
+    LLM_INITIAL_CONCURRENCY: int = 16
+    LLM_MIN_CONCURRENCY: int = 2
+    LLM_MAX_CONCURRENCY: int = 128
+    LLM_LATENCY_TARGET: float = 20.0
+    LLM_MAX_QUEUE: int = 500
+    LLM_QUEUE_TIMEOUT: float = 30.0
+    LLM_MAX_RETRIES: int = 3
+    LLM_MAX_TOKENS: int = 800          # длина ответа по умолчанию
+    LLM_MAX_OUTPUT_TOKENS: int = 4000  # потолок для пакетных вызовов
+
+    # --- Кэш ответов LLM ---
+    LLM_CACHE_ENABLED: bool = True
+    LLM_CACHE_MAX_ITEMS: int = 2048
+    LLM_CACHE_TTL: float = 24 * 3600
+    LLM_CACHE_DB_PATH: str | None = None  # например data/llm_cache.sqlite3
+
+    # --- Бюджеты промптов (в токенах) ---
+    LLM_PROMPT_TOKEN_BUDGET: int = 8000
+    LLM_SYSTEM_TOKEN_BUDGET: int = 600
+    RESUME_TOKEN_BUDGET: int = 2500     # длиннее — анализ через map-reduce по кускам
+    RESUME_CHUNK_TOKENS: int = 1500
+    RESUME_MAX_CHUNKS: int = 8
+    RESUME_REDUCE_HEAD_TOKENS: int = 300
+
+    # --- Пакетный анализ резюме ---
+    RESUME_PARSE_WORKERS: int = 4       # процессы для разбора PDF/DOCX
+    RESUME_PARSE_TIMEOUT: float = 20.0
+    RESUME_MAX_CHARS: int = 20000       # ранняя остановка извлечения текста
+    RESUME_MAX_PAGES: int = 10
+    RESUME_MAX_UPLOAD_BYTES: int = 5 * 1024 * 1024
+    REQUEST_MAX_BYTES: int = 64 * 1024 * 1024  # тело любого запроса (пакет файлов)
+
+    # --- Кэш резюме по содержимому: sha256 файла -> текст, текст+роль -> анализ ---
+    RESUME_CACHE_ENABLED: bool = True
+    RESUME_CACHE_MAX_ITEMS: int = 512
+    RESUME_CACHE_TTL: float = 7 * 24 * 3600
+    RESUME_CACHE_DB_PATH: str | None = None  # например data/resume_cache.sqlite3
+    RESUME_CACHE_MAX_ROWS: int = 20000
+    RESUME_BATCH_MAX_ITEMS: int = 50
+    RESUME_BATCH_CONCURRENCY: int = 8   # одновременных LLM-вызовов на один пакет
+
+    # --- Профиль кандидата (извлекается один раз на резюме) ---
+    PROFILE_DB_PATH: str = "data/profiles.sqlite3"
+    PROFILE_SOURCE_TOKENS: int = 4000
+    PROFILE_SUMMARY_TOKENS: int = 100
+
+    # --- Подбор вакансий ---
+    # Сколько кандидатов BM25 рассматривать; в промпт попадает столько,
+    # сколько влезает в бюджет токенов
+    MATCHING_PREFILTER_TOP_N: int = 200
+    MATCHING_RESUME_TOKENS: int = 800
+    MATCHING_DESCRIPTION_TOKENS: int = 100
+    # Ответ LLM тоже ограничен: вакансии делятся на вызовы так, чтобы
+    # оценки (~MATCHING_RESULT_TOKENS на вакансию) влезали в MATCHING_OUTPUT_TOKENS
+    MATCHING_RESULT_TOKENS: int = 70
+    MATCHING_OUTPUT_TOKENS: int = 2000
+
+    # --- Кэш подбора: оценки по вакансиям на кандидата, до-оценка только новых ---
+    MATCH_CACHE_ENABLED: bool = True
+    MATCH_CACHE_MAX_ITEMS: int = 256
+    MATCH_CACHE_TTL: float = 3600.0
+
+    # --- Дедупликация вакансий (MinHash + LSH) ---
+    # 64 перестановки = 16 полос по 4: дубли с J >= ~0.6 почти наверняка
+    # попадают в общую корзину, дальше проверка по DEDUP_THRESHOLD
+    DEDUP_ENABLED: bool = True
+    DEDUP_NUM_PERM: int = 64
+    DEDUP_BANDS: int = 16
+    DEDUP_THRESHOLD: float = 0.8
+
+    # --- Пакетные сопроводительные письма ---
+    COVER_BATCH_MAX_ITEMS: int = 20
+    COVER_BATCH_CONCURRENCY: int = 5
+
+    # --- Сессии интервью ---
+    SESSION_BACKEND: str = "memory"  # memory | sqlite (общая для всех воркеров)
+    SESSION_DB_PATH: str = "data/sessions.sqlite3"
+    SESSION_MAX: int = 10000
+    SESSION_IDLE_TTL: float = 2 * 3600
+    SESSION_MAX_BYTES: int = 64 * 1024 * 1024
+
+    # --- Пулы вопросов интервью: /start отдаёт вопросы из пула без LLM ---
+    QUESTION_POOL_ENABLED: bool = True
+    QUESTION_POOL_DB_PATH: str = "data/question_pool.sqlite3"
+    QUESTION_POOL_SAMPLE: int = 7          # вопросов на одно интервью
+    QUESTION_POOL_MIN_SERVE: int = 20      # меньше — живая генерация (иначе наборы повторяются)
+    QUESTION_POOL_LOW_WATER: int = 40      # ниже — пул пополняется в фоне
+    QUESTION_POOL_MIN_REQUESTS: int = 3    # пополняются только пулы, запрошенные столько раз
+    QUESTION_POOL_HIGH_WATER: int = 80
+    QUESTION_POOL_BATCH: int = 12          # вопросов на один вызов LLM при пополнении
+    QUESTION_POOL_MAX_CALLS: int = 8       # потолок вызовов LLM на одно пополнение
+    QUESTION_POOL_MAX_SERVES: int = 300    # после стольких показов вопрос выбывает
+    QUESTION_POOL_NEAR_DUP: float = 0.8    # Жаккар по словам: выше — дубль
+    QUESTION_POOL_IDLE_TTL: float = 7 * 24 * 3600
+    QUESTION_POOL_REFILL_INTERVAL: float = 60.0
+
+    # --- Пакетная оценка ответов интервью ---
+    INTERVIEW_EVAL_MAX_ITEMS: int = 30
+    INTERVIEW_EVAL_BATCH_ITEMS: int = 10    # ответов на один вызов LLM (потолок)
+    INTERVIEW_EVAL_RESULT_TOKENS: int = 250  # ответ LLM на одну оценку
+    INTERVIEW_EVAL_OUTPUT_TOKENS: int = 2500 # ответ на пакет: делит ответы на вызовы
+    INTERVIEW_EVAL_CONCURRENCY: int = 4
+    INTERVIEW_EVAL_ANSWER_TOKENS: int = 1500
+
+    # --- Память интервью: последние реплики дословно + резюме остального ---
+    INTERVIEW_VERBATIM_MESSAGES: int = 6
+    INTERVIEW_SUMMARY_TRIGGER: int = 10
+    INTERVIEW_SUMMARY_MAX_CHARS: int = 1500
+
+    # --- Вакансии hh.ru ---
+    VACANCY_DB_PATH: str = "data/vacancies.sqlite3"
+    VACANCY_REFRESH_INTERVAL: float = 30.0  # как часто воркер перечитывает снимок
+    HH_API_URL: str = "https://api.hh.ru"
+    HH_USER_AGENT: str = "CareerBoostAI/0.1 (careerboost@example.com)"
+    HH_QUERIES: str = "стажировка,intern"
+    HH_AREA: int = 160
+    HH_MAX_PAGES: int = 20
+    HH_CONCURRENCY: int = 4
+    HH_RPS: float = 5.0
+    HH_INGEST_ENABLED: bool = False
+    HH_INGEST_INTERVAL: float = 1800.0
+    HH_PRUNE_PASSES: int = 3   # нет в поиске столько проходов подряд — вакансия удаляется
+    HH_DETAIL_TTL: float = 7 * 24 * 3600
+    HH_ENRICH_BATCH: int = 500
+    HH_RETRY_BUDGET: int = 50
+
     class Config:
         env_file = ".env"   # <-- важно
         env_file_encoding = "utf-8"
 
-settings = Settings()
\ No newline at end of file
+settings = Settings()
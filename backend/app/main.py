@@ -1,3 +1,4 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -5,10 +6,41 @@ from app.api.routes_resume import router as resume_router
 from app.api.routes_interview import router as interview_router
 from app.api.routes_matching import router as matching_router
 from app.api.routes_coverletter import router as cover_router
+from app.api.routes_profile import router as profile_router
 
-from app.services.openai_client import run_llm
+from app.services.openai_client import run_llm, warmup_llm, close_llm, llm_stats
+from app.services.hh_parser import close_hh_client
+from app.services.vacancy_ingest import start_ingest, start_vacancy_refresh
+from app.services.question_pool import start_question_refill, get_question_pool
+from app.services.session_store import get_session_store
+from app.services.resume_cache import resume_cache_stats
+from app.services.match_cache import match_cache
+from app.core.config import settings
+from app.utils.file_parse import close_parse_pool
+from app.utils.upload import BodySizeLimitMiddleware
 
-app = FastAPI(title="CareerBoostAI Backend", version="0.1.0")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Прогреваем пул соединений к OpenAI до первого запроса
+    await warmup_llm()
+    refresh_task = await start_vacancy_refresh()
+    ingest_task = start_ingest()
+    refill_task = start_question_refill()
+    yield
+    for task in (refresh_task, ingest_task, refill_task):
+        if task is not None:
+            task.cancel()
+    await close_hh_client()
+    await close_llm()
+    close_parse_pool()
+
+
+app = FastAPI(title="CareerBoostAI Backend", version="0.1.0", lifespan=lifespan)
+
+# Слишком большие загрузки отбиваем ещё во время приёма тела
+# (добавлен первым, чтобы CORS-заголовки были и у ответа 413)
+app.add_middleware(BodySizeLimitMiddleware, max_bytes=settings.REQUEST_MAX_BYTES)
 
 # Настройка CORS, чтобы фронтенд мог достучаться до бэкенда
 app.add_middleware(
@@ -26,13 +58,25 @@ app.include_router(resume_router, prefix="/api")
 app.include_router(interview_router)
 app.include_router(matching_router)
 app.include_router(cover_router)
+app.include_router(profile_router)
 
 @app.get("/health")
 def health():
     return {"status": "ok"}
 
 @app.get("/debug/openai")
-def debug_openai():
+async def debug_openai():
     """Проверка связи с OpenAI"""
-    text = run_llm("Say only the word: ok", system="You are a test.", temperature=0)
-    return {"result": text}
\ No newline at end of file
+    text = await run_llm("Say only the word: ok", system="You are a test.", temperature=0)
+    return {"result": text}
+
+@app.get("/debug/llm")
+def debug_llm():
+    """Счётчики кэша и других слоёв вокруг run_llm"""
+    return {**llm_stats(), "resume_cache": resume_cache_stats(), "match_cache": match_cache.stats(),
+            "question_pool": get_question_pool().stats()}
+
+@app.get("/debug/sessions")
+def debug_sessions():
+    """Живые сессии интервью и вытеснения"""
+    return get_session_store().stats()
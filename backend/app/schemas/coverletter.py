@@ -1,12 +1,39 @@
-from pydantic import BaseModel
+from typing import List, Optional
+from pydantic import BaseModel, Field, model_validator
 
 class CoverLetterRequest(BaseModel):
-    resume_text: str
+    # Нужно одно из двух: полный текст резюме или profile_id из /api/profile
+    resume_text: Optional[str] = None
+    profile_id: Optional[str] = None
     job_title: str
     company: str
     job_description: str
     tone: str = "professional"
 
+    @model_validator(mode="after")
+    def _resume_or_profile(self):
+        if not self.resume_text and not self.profile_id:
+            raise ValueError("resume_text or profile_id is required")
+        return self
+
 class CoverLetterResponse(BaseModel):
     letter: str
-    short_email: str
\ No newline at end of file
+    short_email: str
+
+class CoverLetterJob(BaseModel):
+    job_title: str
+    company: str
+    job_description: str
+    tone: str = "professional"
+
+class CoverLetterBatchRequest(BaseModel):
+    # Одно резюме (или профиль) на все вакансии пакета
+    resume_text: Optional[str] = None
+    profile_id: Optional[str] = None
+    jobs: List[CoverLetterJob] = Field(min_length=1)
+
+    @model_validator(mode="after")
+    def _resume_or_profile(self):
+        if not self.resume_text and not self.profile_id:
+            raise ValueError("resume_text or profile_id is required")
+        return self
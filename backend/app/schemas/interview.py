@@ -1,9 +1,12 @@
-from pydantic import BaseModel
+from typing import List
+
+from pydantic import BaseModel, Field
 
 class InterviewStartRequest(BaseModel):
     role: str
     level: str = "intern"
     focus: str | None = None
+    profile_id: str | None = None  # вопросы под опыт кандидата
 
 class InterviewStartResponse(BaseModel):
     session_id: str
@@ -16,4 +19,12 @@ class InterviewTurnRequest(BaseModel):
 class InterviewTurnResponse(BaseModel):
     next_question: str
     feedback: str
-    score: int
\ No newline at end of file
+    score: int
+
+class InterviewAnswer(BaseModel):
+    question: str
+    answer: str
+
+class InterviewEvaluateBatchRequest(BaseModel):
+    position: str
+    answers: List[InterviewAnswer] = Field(min_length=1)
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import List, Literal, Optional
 
 
 class InternshipItem(BaseModel):
@@ -11,18 +11,44 @@ class InternshipItem(BaseModel):
     description: Optional[str] = None
     requirements: Optional[List[str]] = None
     skills: Optional[List[str]] = None
+    # Удалённый формат работы; None — неизвестно (определяется по локации/названию)
+    remote: Optional[bool] = None
+    # id навыков словаря (skill_taxonomy), посчитанные при ингестии; в API не отдаются
+    skill_ids: Optional[List[int]] = Field(default=None, exclude=True)
+
+
+class VacancyFilters(BaseModel):
+    """
+    Фасетные фильтры: внутри списка — ИЛИ, между полями — И.
+    skills требует все перечисленные навыки, any_skills — хотя бы один.
+    """
+    locations: Optional[List[str]] = None
+    companies: Optional[List[str]] = None
+    exclude_companies: Optional[List[str]] = None
+    remote: Optional[bool] = None
+    skills: Optional[List[str]] = None
+    any_skills: Optional[List[str]] = None
 
 
 class MatchingRequest(BaseModel):
     target_role: str
     user_skills: List[str] = Field(default_factory=list)
     resume_text: Optional[str] = None
+    # Профиль из /api/profile/extract: вместо полного резюме в промпт идёт выжимка
+    profile_id: Optional[str] = None
 
     # ВАЖНО: сюда AI engineer потом будет подсовывать JSON из парсинга
     internships: Optional[List[InternshipItem]] = None
 
     top_k: int = 5
 
+    # Сужают набор вакансий до ранжирования и LLM
+    filters: Optional[VacancyFilters] = None
+
+    # fast — локальный скоринг без LLM, hybrid — локальный ранжир + пояснения LLM,
+    # llm — полный подбор через LLM
+    mode: Literal["fast", "hybrid", "llm"] = "llm"
+
 
 class MatchResult(BaseModel):
     id: str
@@ -0,0 +1,17 @@
+from pydantic import BaseModel, Field
+from typing import List
+
+
+class CandidateProfile(BaseModel):
+    """Сжатый профиль кандидата: извлекается один раз на резюме (по хэшу текста)."""
+    id: str
+    skills: List[str] = Field(default_factory=list)
+    years_experience: float = 0.0
+    roles: List[str] = Field(default_factory=list)
+    education: List[str] = Field(default_factory=list)
+    summary: str = ""
+
+
+class ProfileExtractRequest(BaseModel):
+    resume_text: str
+
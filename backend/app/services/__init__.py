@@ -4,4 +4,5 @@ from .interview import start_interview, interview_turn
 from .matching import recommend_internships
 from .resume import review_resume
 from .internship_ai_engine import get_ai_internships
-from .llm_json import parse_llm_json, parse_llm_to_model
\ No newline at end of file
+from .llm_json import parse_llm_json, parse_llm_to_model
+from .candidate_profile import extract_profile, get_profile_store
\ No newline at end of file
@@ -0,0 +1,148 @@
+import asyncio
+import hashlib
+import threading
+import time
+from typing import List, Optional
+
+from app.core.config import settings
+from app.schemas.profile import CandidateProfile
+from app.services.llm_limiter import LLMOverloaded
+from app.services.openai_client import run_llm, llm_rate_limited
+from app.services.prompt_budget import truncate_to_tokens
+from app.utils.cache import MISSING, TTLCache
+from app.utils.sqlite import connect
+
+# Увеличивать при изменении промпта или схемы — профиль получит новый id
+PROFILE_VERSION = 1
+
+SYSTEM = (
+    "Ты извлекаешь структурированные данные из резюме. "
+    "Верни СТРОГО валидный JSON. Никакого лишнего текста."
+)
+
+
+def profile_id(resume_text: str) -> str:
+    """id профиля — хэш нормализованного текста: одно резюме -> один профиль."""
+    normalized = " ".join(resume_text.split()).lower()
+    raw = f"{PROFILE_VERSION}:{normalized}".encode("utf-8")
+    return hashlib.sha256(raw).hexdigest()[:32]
+
+
+class ProfileStore:
+    """Профили в SQLite (WAL) + in-memory LRU перед ним; общий для всех воркеров."""
+
+    def __init__(self, path: str, max_items: int = 1024):
+        self._lock = threading.Lock()
+        self._conn = connect(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS profiles ("
+            "id TEXT PRIMARY KEY, data TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+        self._memory = TTLCache(max_items=max_items)
+
+    def _get(self, pid: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM profiles WHERE id = ?", (pid,)).fetchone()
+        return row[0] if row else None
+
+    def _set(self, pid: str, raw: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO profiles (id, data, created_at) VALUES (?, ?, ?)",
+                (pid, raw, time.time()),
+            )
+            self._conn.commit()
+
+    async def get(self, pid: str) -> Optional[CandidateProfile]:
+        raw = self._memory.get(pid)
+        if raw is MISSING:
+            raw = await asyncio.to_thread(self._get, pid)
+            if raw is None:
+                return None
+            self._memory.set(pid, raw)
+        return CandidateProfile.model_validate_json(raw)
+
+    async def set(self, profile: CandidateProfile) -> None:
+        raw = profile.model_dump_json()
+        self._memory.set(profile.id, raw)
+        await asyncio.to_thread(self._set, profile.id, raw)
+
+
+_store: Optional[ProfileStore] = None
+
+
+def get_profile_store() -> ProfileStore:
+    global _store
+    if _store is None:
+        _store = ProfileStore(settings.PROFILE_DB_PATH)
+    return _store
+
+
+def _str_list(value) -> List[str]:
+    if not isinstance(value, list):
+        return []
+    return [str(v).strip() for v in value if str(v).strip()]
+
+
+async def extract_profile(resume_text: str) -> CandidateProfile:
+    """
+    Профиль по резюме: из хранилища, если уже извлекался, иначе один вызов LLM.
+    Одновременные запросы с тем же резюме склеиваются single-flight в run_llm.
+    """
+    pid = profile_id(resume_text)
+    store = get_profile_store()
+    cached = await store.get(pid)
+    if cached is not None:
+        return cached
+
+    prompt = f"""
+        Извлеки профиль кандидата из резюме.
+
+        Верни JSON строго с этими ключами:
+        "skills": список навыков и технологий (нормализованные названия, без дублей)
+        "years_experience": число лет опыта работы (0, если опыта нет)
+        "roles": список должностей/ролей, которые занимал кандидат
+        "education": список строк "учебное заведение — специальность — год"
+        "summary": 2-3 предложения о кандидате (не больше {settings.PROFILE_SUMMARY_TOKENS} токенов)
+
+        Резюме:
+        \"\"\"{truncate_to_tokens(resume_text, settings.PROFILE_SOURCE_TOKENS)}\"\"\"
+        """
+
+    raw = await run_llm(prompt, system=SYSTEM, temperature=0)
+    retry_after = llm_rate_limited(raw)
+    if retry_after is not None:
+        raise LLMOverloaded("LLM is busy", retry_after=retry_after)
+    if not isinstance(raw, dict) or "error" in raw:
+        raise ValueError(f"Profile extraction failed: {raw}")
+
+    try:
+        years = max(0.0, float(raw.get("years_experience") or 0))
+    except (TypeError, ValueError):
+        years = 0.0
+
+    profile = CandidateProfile(
+        id=pid,
+        skills=_str_list(raw.get("skills")),
+        years_experience=round(years, 1),
+        roles=_str_list(raw.get("roles")),
+        education=_str_list(raw.get("education")),
+        summary=truncate_to_tokens(str(raw.get("summary") or ""), settings.PROFILE_SUMMARY_TOKENS),
+    )
+    await store.set(profile)
+    return profile
+
+
+def render_profile(profile: CandidateProfile) -> str:
+    """Компактное представление профиля для промптов вместо полного резюме."""
+    lines = [f"Опыт: {profile.years_experience:g} лет"]
+    if profile.roles:
+        lines.append("Роли: " + "; ".join(profile.roles))
+    if profile.skills:
+        lines.append("Навыки: " + ", ".join(profile.skills))
+    if profile.education:
+        lines.append("Образование: " + "; ".join(profile.education))
+    if profile.summary:
+        lines.append("О себе: " + profile.summary)
+    return "\n".join(lines)
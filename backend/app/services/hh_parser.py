@@ -1,13 +1,204 @@
+import asyncio
+import random
+import time
+from typing import Any, Dict, List, Optional
+
 import httpx
-from typing import List
+
+from app.core.config import settings
 from app.schemas.matching import InternshipItem
+from app.utils.html_text import html_to_text
+
+# hh.ru не отдаёт глубже 2000 вакансий на один поисковый запрос
+_MAX_DEPTH = 2000
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def get_hh_client() -> httpx.AsyncClient:
+    """Общий клиент к API hh.ru (keep-alive, один на воркер)."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            base_url=settings.HH_API_URL,
+            headers={"HH-User-Agent": settings.HH_USER_AGENT, "User-Agent": settings.HH_USER_AGENT},
+            timeout=httpx.Timeout(15.0, connect=5.0),
+            limits=httpx.Limits(max_connections=settings.HH_CONCURRENCY * 2),
+        )
+    return _client
+
+
+async def close_hh_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+class RateLimiter:
+    """Не чаще rate запросов в секунду на процесс (равномерно, без всплесков)."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def wait(self):
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+
+_limiter = RateLimiter(settings.HH_RPS)
+
+
+class RetryBudget:
+    """Общий лимит повторов на один проход: при массовых сбоях не долбим API."""
+
+    def __init__(self, retries: int):
+        self.left = retries
+
+    def take(self) -> bool:
+        if self.left <= 0:
+            return False
+        self.left -= 1
+        return True
+
+
+def _can_retry(attempt: int, retries: int, budget: Optional[RetryBudget]) -> bool:
+    return attempt < retries and (budget is None or budget.take())
+
+
+async def hh_get(
+    client: httpx.AsyncClient,
+    path: str,
+    params: Optional[Dict[str, Any]] = None,
+    headers: Optional[Dict[str, str]] = None,
+    retries: int = 3,
+    budget: Optional[RetryBudget] = None,
+) -> httpx.Response:
+    """
+    GET с учётом лимитов: общий rate limiter, повтор на 429/5xx
+    с Retry-After или экспоненциальной паузой с джиттером.
+    budget — общий на проход лимит повторов (если исчерпан, ошибка сразу).
+    """
+    for attempt in range(retries + 1):
+        await _limiter.wait()
+        try:
+            response = await client.get(path, params=params, headers=headers)
+        except httpx.TransportError:
+            if not _can_retry(attempt, retries, budget):
+                raise
+            await asyncio.sleep((2 ** attempt) * 0.5 + random.random() * 0.5)
+            continue
+
+        if response.status_code == 429 or response.status_code >= 500:
+            if not _can_retry(attempt, retries, budget):
+                response.raise_for_status()
+            retry_after = response.headers.get("Retry-After")
+            delay = float(retry_after) if retry_after and retry_after.isdigit() else (2 ** attempt) * 0.5
+            await asyncio.sleep(delay + random.random() * 0.5)
+            continue
 
-def fetch_internships_hh(query: str = "стажировка", area: int = 160, per_page: int = 20) -> List[InternshipItem]:
+        return response
+
+    raise RuntimeError("unreachable")
+
+
+def _to_item(item: dict) -> InternshipItem:
+    skills = [s["name"] for s in item.get("key_skills", []) or []]
+    snippet = item.get("snippet") or {}
+    # В сниппете подсветка запроса (<highlighttext>) — без разметки текст
+    # и отпечаток вакансии не зависят от того, каким запросом её нашли
+    requirements = html_to_text(snippet.get("requirement") or "")
+
+    return InternshipItem(
+        id=str(item["id"]),
+        title=item["name"],
+        company=(item.get("employer") or {}).get("name", ""),
+        location=(item.get("area") or {}).get("name", ""),
+        url=item.get("alternate_url", ""),
+        requirements=[requirements] if requirements else [],
+        skills=skills,
+        description=html_to_text(snippet.get("responsibility") or ""),
+        remote=_is_remote(item),
+    )
+
+
+def _is_remote(item: dict) -> Optional[bool]:
+    """Формат работы из поиска hh.ru: schedule (старое поле) или work_format."""
+    formats = {f.get("id") for f in item.get("work_format") or [] if isinstance(f, dict)}
+    schedule = (item.get("schedule") or {}).get("id")
+    if not formats and not schedule:
+        return None
+    return "REMOTE" in formats or schedule == "remote"
+
+
+async def _fetch_page(client, params: dict, page: int, store=None) -> Optional[dict]:
+    """
+    Одна страница поиска. Если передан store, используется условный запрос
+    (If-None-Match / If-Modified-Since); при 304 items = None, а вакансии
+    страницы (id запомнены вместе с валидаторами) отмечаются как увиденные.
     """
-    Парсит вакансии с hh.ru API.
+    page_params = {**params, "page": page}
+    key = "hh:" + "&".join(f"{k}={page_params[k]}" for k in sorted(page_params))
+
+    headers = {}
+    meta = None
+    if store is not None:
+        etag, last_modified, meta = await asyncio.to_thread(store.get_validators, key)
+        # Без списка id страницы 304 не продлит seen_at её вакансиям — качаем заново
+        if meta and "ids" in meta:
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+
+    response = await hh_get(client, "/vacancies", params=page_params, headers=headers)
+    if response.status_code == 304:
+        await asyncio.to_thread(store.mark_seen, meta["ids"])
+        return {"items": None, "pages": meta.get("pages", 0)}
+
+    response.raise_for_status()
+    data = response.json()
+
+    if store is not None:
+        await asyncio.to_thread(
+            store.set_validators,
+            key,
+            response.headers.get("ETag"),
+            response.headers.get("Last-Modified"),
+            {
+                "pages": data.get("pages", 0),
+                "ids": [str(item["id"]) for item in data.get("items") or []],
+            },
+        )
+    return data
+
+
+async def fetch_internships_hh(
+    query: str = "стажировка",
+    area: int = 160,
+    per_page: int = 100,
+    max_pages: Optional[int] = None,
+    client: Optional[httpx.AsyncClient] = None,
+    store=None,
+) -> List[InternshipItem]:
+    """
+    Парсит вакансии с hh.ru API постранично.
     area=160 — Казахстан, area=1 — Москва
+
+    Первая страница даёт число страниц, остальные качаются параллельно
+    (не больше HH_CONCURRENCY одновременно). Страницы, не изменившиеся
+    с прошлого раза (304), пропускаются.
     """
-    url = "https://api.hh.ru/vacancies"
+    client = client or get_hh_client()
+    max_pages = max_pages or settings.HH_MAX_PAGES
     params = {
         "text": query,
         "area": area,
@@ -15,25 +206,20 @@ def fetch_internships_hh(query: str = "стажировка", area: int = 160, p
         "experience": "noExperience",
     }
 
-    response = httpx.get(url, params=params)
-    response.raise_for_status()
-    data = response.json()
+    first = await _fetch_page(client, params, 0, store)
+    pages = min(first.get("pages", 1) or 1, max_pages, _MAX_DEPTH // per_page)
+
+    semaphore = asyncio.Semaphore(settings.HH_CONCURRENCY)
+
+    async def fetch(page: int):
+        async with semaphore:
+            return await _fetch_page(client, params, page, store)
+
+    rest = await asyncio.gather(*(fetch(p) for p in range(1, pages)))
 
     result = []
-    for item in data.get("items", []):
-        skills = [s["name"] for s in item.get("key_skills", [])]
-        snippet = item.get("snippet", {})
-        requirements = snippet.get("requirement", "") or ""
-        
-        result.append(InternshipItem(
-            id=str(item["id"]),
-            title=item["name"],
-            company=item.get("employer", {}).get("name", ""),
-            location=item.get("area", {}).get("name", ""),
-            url=item.get("alternate_url", ""),
-            requirements=[requirements] if requirements else [],
-            skills=skills,
-            description=snippet.get("responsibility", "") or "",
-        ))
-
-    return result
\ No newline at end of file
+    for data in [first, *rest]:
+        for item in data.get("items") or []:
+            result.append(_to_item(item))
+
+    return result
@@ -1,36 +1,48 @@
-import json
-from typing import List, Optional
+import asyncio
+from typing import Hashable, List, Optional, Tuple
 from app.schemas.matching import InternshipItem
+from app.services.vacancy_store import get_vacancy_store
 
-# Здесь можно импортировать функцию твоего парсера, когда он будет готов
-# from app.services.parsers.hh_parser import fetch_hh_internships
+async def get_ai_internships(internships: Optional[List[InternshipItem]] = None) -> List[InternshipItem]:
+    """Только список вакансий, см. get_vacancy_set."""
+    return (await get_vacancy_set(internships))[1]
 
-def get_ai_internships(internships: Optional[List[InternshipItem]] = None) -> List[InternshipItem]:
+
+async def get_vacancy_set(
+    internships: Optional[List[InternshipItem]] = None,
+) -> Tuple[Optional[Hashable], List[InternshipItem]]:
     """
     Возвращает список вакансий. 
     Приоритет: 
     1. Переданный список (например, из БД или кэша).
-    2. Живой поиск через парсер (реальные вакансии).
+    2. Локальное хранилище вакансий, которое наполняет фоновая ингестия hh.ru
+       (см. vacancy_ingest) — сеть на запросе пользователя не трогаем,
+       SQLite тоже: читается снимок в памяти, его обновляет фоновая задача.
     3. Моки (только если всё остальное не сработало).
+
+    Вместе со списком возвращается ключ набора: ("store", version) или
+    ("mock", 0); None — список передан в запросе и каждый раз свой.
     """
     
     # 1. Если данные уже переданы (например, из другого сервиса), возвращаем их
     if internships:
-        return internships
+        return None, internships
 
-    # 2. ПОПЫТКА ПОЛУЧИТЬ РЕАЛЬНЫЕ ДАННЫЕ (Логика парсера)
+    # 2. РЕАЛЬНЫЕ ДАННЫЕ из локального хранилища
     try:
-        # Здесь должна быть логика вызова твоего парсера HH
-        # real_jobs = fetch_hh_internships(query="intern python")
-        # if real_jobs:
-        #     return real_jobs
-        pass
+        store = get_vacancy_store()
+        version, stored = store.snapshot()
+        if version is None:
+            # Снимок ещё не прочитан (например, приложение без lifespan)
+            version, stored = await asyncio.to_thread(store.refresh)
+        if stored:
+            return ("store", version), stored
     except Exception as e:
-        print(f"Ошибка парсинга: {e}")
+        print(f"Ошибка чтения хранилища вакансий: {e}")
 
     # 3. МОК-ДАННЫЕ (Теперь с реальными ссылками на HH для тестов)
     # Это "спасательный круг", чтобы фронтенд не был пустым при показе
-    return [
+    return ("mock", 0), [
         InternshipItem(
             id="hh-101",
             title="Python Developer Intern",
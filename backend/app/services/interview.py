@@ -1,8 +1,11 @@
+import asyncio
 import uuid
-from typing import Dict, List, Any, Optional
-from app.services.openai_client import run_llm
-
-_SESSIONS: Dict[str, Dict[str, Any]] = {}
+import weakref
+from typing import Dict, List, Optional
+from app.core.config import settings
+from app.services.llm_limiter import LLMOverloaded
+from app.services.openai_client import run_llm, llm_rate_limited
+from app.services.session_store import get_session_store
 
 SYSTEM = (
     "Ты интервьюер по найму. "
@@ -10,8 +13,36 @@ SYSTEM = (
     "Верни: FEEDBACK, SCORE, NEXT_QUESTION."
 )
 
+SUMMARY_SYSTEM = (
+    "Ты ведёшь заметки интервьюера. Отвечай по-русски, кратко, без вступлений."
+)
+
+# Сессия меняется и ходом интервью, и фоновой сверткой истории —
+# в пределах воркера их сериализуем
+_session_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
+_background: set = set()
+_folding: set = set()
+
+
+def _session_lock(session_id: str) -> asyncio.Lock:
+    lock = _session_locks.get(session_id)
+    if lock is None:
+        lock = asyncio.Lock()
+        _session_locks[session_id] = lock
+    return lock
+
+
+def _candidate_block(profile: Optional[str]) -> str:
+    return f"Кандидат:\n{profile}\n" if profile else ""
 
-def start_interview(role: str, level: str = "intern", focus: Optional[str] = None):
+
+async def start_interview(
+    role: str,
+    level: str = "intern",
+    focus: Optional[str] = None,
+    profile: Optional[str] = None,
+):
+    """profile — render_profile(...) кандидата; хранится в сессии и идёт в каждый ход."""
 
     session_id = str(uuid.uuid4())
 
@@ -21,21 +52,29 @@ def start_interview(role: str, level: str = "intern", focus: Optional[str] = Non
 Роль: {role}
 Уровень: {level}
 Фокус: {focus or "общий"}
-
+{_candidate_block(profile)}
 Задай первый вопрос (1 строка).
 """
 
-    first_question = run_llm(prompt, system=SYSTEM, temperature=0.3).strip()
+    out = await run_llm(prompt, system=SYSTEM, temperature=0.3, json_mode=False)
+    retry_after = llm_rate_limited(out)
+    if retry_after is not None:
+        raise LLMOverloaded("LLM is busy", retry_after=retry_after)
+    if not isinstance(out, str) or not out.strip():
+        raise ValueError(f"LLM Error: {out}")
+    first_question = out.strip()
 
-    _SESSIONS[session_id] = {
+    await get_session_store().set(session_id, {
         "role": role,
         "level": level,
         "focus": focus,
+        "profile": profile or "",
         "history": [
             {"role": "assistant", "content": first_question}
         ],
+        "summary": "",
         "last_score": 0,
-    }
+    })
 
     return {
         "session_id": session_id,
@@ -43,23 +82,30 @@ def start_interview(role: str, level: str = "intern", focus: Optional[str] = Non
     }
 
 
-def interview_turn(session_id: str, answer: str):
+async def interview_turn(session_id: str, answer: str):
+    """
+    Один ход интервью. В промпт идут краткое резюме ранних ходов и только
+    не свернутые последние сообщения, поэтому размер промпта не растёт
+    с длиной интервью. Свертка старых ходов делается в фоне после ответа.
+    """
+    store = get_session_store()
 
-    if session_id not in _SESSIONS:
-        raise KeyError("Unknown session")
+    async with _session_lock(session_id):
+        s = await store.get(session_id)
+        if s is None:
+            raise KeyError("Unknown session")
 
-    s = _SESSIONS[session_id]
-    history: List[Dict[str, str]] = s["history"]
+        history: List[Dict[str, str]] = s["history"]
 
-    history.append({"role": "user", "content": answer})
+        history.append({"role": "user", "content": answer})
 
-    prompt = f"""
+        prompt = f"""
 Ты проводишь интервью.
 
 Роль: {s['role']}
 Уровень: {s['level']}
 Фокус: {s['focus'] or 'общий'}
-
+{_candidate_block(s.get("profile"))}
 СТРОГО формат:
 
 FEEDBACK: ...
@@ -67,21 +113,31 @@ SCORE: число 0-100
 NEXT_QUESTION: ...
 """
 
-    context = "\n".join(
-        f"{m['role']}: {m['content']}"
-        for m in history[-10:]
-    )
+        context = "\n".join(
+            f"{m['role']}: {m['content']}"
+            for m in history
+        )
+        if s.get("summary"):
+            context = f"Краткое содержание начала интервью:\n{s['summary']}\n\nПоследние реплики:\n{context}"
+
+        out = (await run_llm(
+            f"{context}\n\n{prompt}",
+            system=SYSTEM,
+            temperature=0.2,
+            json_mode=False
+        )).strip()
 
-    out = run_llm(
-        f"{context}\n\n{prompt}",
-        system=SYSTEM,
-        temperature=0.2
-    ).strip()
+        feedback, score, next_q = _parse_output(out)
 
-    feedback, score, next_q = _parse_output(out)
+        history.append({"role": "assistant", "content": next_q})
+        s["last_score"] = score
+        await store.set(session_id, s)
 
-    history.append({"role": "assistant", "content": next_q})
-    s["last_score"] = score
+    if len(history) > settings.INTERVIEW_SUMMARY_TRIGGER and session_id not in _folding:
+        _folding.add(session_id)
+        task = asyncio.create_task(_fold_history(session_id))
+        _background.add(task)
+        task.add_done_callback(_background.discard)
 
     return {
         "next_question": next_q,
@@ -90,6 +146,55 @@ NEXT_QUESTION: ...
     }
 
 
+async def _fold_history(session_id: str):
+    """
+    Сворачивает старые сообщения в текущее резюме, оставляя
+    INTERVIEW_VERBATIM_MESSAGES последних дословно.
+    """
+    try:
+        await _fold_history_once(session_id)
+    except Exception as e:
+        print(f"Interview summary failed: {e}")
+    finally:
+        _folding.discard(session_id)
+
+
+async def _fold_history_once(session_id: str):
+    store = get_session_store()
+    keep = settings.INTERVIEW_VERBATIM_MESSAGES
+
+    s = await store.get(session_id)
+    if s is None or len(s["history"]) <= keep:
+        return
+
+    old = s["history"][:-keep]
+    dialog = "\n".join(f"{m['role']}: {m['content']}" for m in old)
+
+    prompt = f"""
+Текущее резюме интервью:
+{s.get("summary") or "(пусто)"}
+
+Новые реплики:
+{dialog}
+
+Обнови резюме: темы заданных вопросов, суть ответов кандидата, сильные и слабые
+стороны. Не больше 8 коротких пунктов.
+"""
+
+    summary = await run_llm(prompt, system=SUMMARY_SYSTEM, temperature=0.2, json_mode=False)
+    if not isinstance(summary, str) or not summary.strip():
+        return
+
+    async with _session_lock(session_id):
+        s = await store.get(session_id)
+        # Пока шла свертка, история могла только дописываться в конец
+        if s is None or s["history"][:len(old)] != old:
+            return
+        s["summary"] = summary.strip()[:settings.INTERVIEW_SUMMARY_MAX_CHARS]
+        s["history"] = s["history"][len(old):]
+        await store.set(session_id, s)
+
+
 def _parse_output(text: str):
 
     feedback = ""
@@ -0,0 +1,201 @@
+import asyncio
+import json
+from typing import Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.services.llm_limiter import LLMOverloaded
+from app.services.openai_client import run_llm, llm_rate_limited
+from app.services.prompt_budget import count_tokens, prompt_budget, truncate_to_tokens
+
+EVAL_SYSTEM = "Ты строгий HR эксперт. Отвечай ТОЛЬКО JSON."
+
+# (номер вопроса с 1, вопрос, ответ)
+Pair = Tuple[int, str, str]
+
+_EVALUATIONS_OVERHEAD = 30  # {"evaluations": [ ... ]}
+
+
+def evaluate_prompt(position: str, question: str, answer: str) -> str:
+    return f"""
+Оцени ответ кандидата.
+
+Позиция: {position}
+Вопрос: {question}
+Ответ: {answer}
+
+Верни JSON:
+
+{{
+  "evaluation": {{
+    "score": 1-10,
+    "positive": "что было хорошо",
+    "improvements": "что улучшить",
+    "better_answer": "пример сильного ответа"
+  }}
+}}
+"""
+
+
+def _batch_head(position: str) -> str:
+    return f"""
+Оцени КАЖДЫЙ ответ кандидата на собеседовании независимо от остальных.
+
+Позиция: {position}
+
+Вопросы и ответы (index — номер вопроса):
+"""
+
+
+_BATCH_TAIL = """
+
+Верни JSON, по одному элементу на каждый index:
+
+{
+  "evaluations": [
+    {
+      "index": 1,
+      "score": 1-10,
+      "positive": "что было хорошо",
+      "improvements": "что улучшить",
+      "better_answer": "пример сильного ответа"
+    }
+  ]
+}
+"""
+
+
+def _render(pair: Pair) -> dict:
+    index, question, answer = pair
+    return {"index": index, "question": question, "answer": answer}
+
+
+def _batch_items() -> int:
+    """Сколько оценок влезает в бюджет ответа одного вызова."""
+    fits = (settings.INTERVIEW_EVAL_OUTPUT_TOKENS - _EVALUATIONS_OVERHEAD) // settings.INTERVIEW_EVAL_RESULT_TOKENS
+    return max(1, min(settings.INTERVIEW_EVAL_BATCH_ITEMS, fits))
+
+
+def _max_tokens(batch: List[Pair]) -> int:
+    # Оценка размера ответа + запас: обрезанный JSON — это повтор всего пакета
+    expected = _EVALUATIONS_OVERHEAD + len(batch) * settings.INTERVIEW_EVAL_RESULT_TOKENS
+    return min(settings.LLM_MAX_OUTPUT_TOKENS, expected * 3 // 2)
+
+
+def plan_batches(position: str, pairs: List[Pair]) -> List[List[Pair]]:
+    """
+    Жадно режет пары на пакеты по бюджету токенов промпта и по бюджету
+    ответа (длина ответа LLM растёт с каждой оценкой). Всё влезло — один вызов.
+    """
+    budget = prompt_budget() - count_tokens(_batch_head(position)) - count_tokens(_BATCH_TAIL)
+    items = _batch_items()
+    batches: List[List[Pair]] = []
+    current: List[Pair] = []
+    used = 2
+    for pair in pairs:
+        cost = count_tokens(json.dumps(_render(pair), ensure_ascii=False)) + 1
+        if current and (used + cost > budget or len(current) >= items):
+            batches.append(current)
+            current, used = [], 2
+        current.append(pair)
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _normalize(raw) -> Optional[dict]:
+    if not isinstance(raw, dict):
+        return None
+    try:
+        score = max(1, min(10, int(round(float(raw.get("score"))))))
+    except (TypeError, ValueError):
+        return None
+    return {
+        "score": score,
+        "positive": str(raw.get("positive") or ""),
+        "improvements": str(raw.get("improvements") or ""),
+        "better_answer": str(raw.get("better_answer") or ""),
+    }
+
+
+def _check(out) -> Optional[dict]:
+    retry_after = llm_rate_limited(out)
+    if retry_after is not None:
+        raise LLMOverloaded("LLM is busy", retry_after=retry_after)
+    if not isinstance(out, dict) or "error" in out:
+        return None
+    return out
+
+
+async def _evaluate_one(position: str, pair: Pair, sem: asyncio.Semaphore) -> Optional[dict]:
+    _, question, answer = pair
+    async with sem:
+        out = _check(await run_llm(evaluate_prompt(position, question, answer), system=EVAL_SYSTEM, temperature=0.5))
+    return _normalize(out.get("evaluation")) if out else None
+
+
+async def _evaluate_batch(position: str, batch: List[Pair], sem: asyncio.Semaphore) -> Dict[int, Optional[dict]]:
+    if len(batch) == 1:
+        return {batch[0][0]: await _evaluate_one(position, batch[0], sem)}
+
+    payload = json.dumps([_render(p) for p in batch], ensure_ascii=False)
+    async with sem:
+        out = _check(await run_llm(
+            _batch_head(position) + payload + _BATCH_TAIL,
+            system=EVAL_SYSTEM,
+            temperature=0.5,
+            max_tokens=_max_tokens(batch),
+        ))
+
+    found: Dict[int, Optional[dict]] = {}
+    for raw in (out or {}).get("evaluations") or []:
+        if isinstance(raw, dict):
+            try:
+                found[int(raw.get("index"))] = _normalize(raw)
+            except (TypeError, ValueError):
+                continue
+
+    # Что LLM пропустил или вернул битым — добираем поштучно, под тем же лимитом
+    missing = [p for p in batch if found.get(p[0]) is None]
+    if missing:
+        retried = await asyncio.gather(*(_evaluate_one(position, p, sem) for p in missing))
+        found.update({p[0]: ev for p, ev in zip(missing, retried)})
+    return found
+
+
+async def evaluate_answers(position: str, answers: List[Tuple[str, str]]) -> dict:
+    """
+    Оценка всех ответов интервью: один структурированный вызов, если всё
+    влезает в бюджет, иначе несколько пакетов параллельно (не больше
+    INTERVIEW_EVAL_CONCURRENCY одновременно). Плюс сводная оценка.
+    """
+    pairs = [
+        (i, question, truncate_to_tokens(answer or "", settings.INTERVIEW_EVAL_ANSWER_TOKENS))
+        for i, (question, answer) in enumerate(answers, 1)
+    ]
+    batches = plan_batches(position, pairs)
+    # Один лимит на всё: и пакеты, и поштучные повторы
+    sem = asyncio.Semaphore(settings.INTERVIEW_EVAL_CONCURRENCY)
+
+    evaluated: Dict[int, Optional[dict]] = {}
+    for result in await asyncio.gather(*(_evaluate_batch(position, b, sem) for b in batches)):
+        evaluated.update(result)
+
+    items = [
+        {"index": i, "question": question, "evaluation": evaluated.get(i)}
+        for i, question, _ in pairs
+    ]
+    scores = [item["evaluation"]["score"] for item in items if item["evaluation"]]
+    if not scores:
+        raise ValueError("LLM Error: no answer could be evaluated")
+
+    return {
+        "evaluations": items,
+        "summary": {
+            "score": round(sum(scores) / len(scores), 1),
+            "max_score": 10,
+            "evaluated": len(scores),
+            "total": len(items),
+            "llm_batches": len(batches),
+        },
+    }
@@ -0,0 +1,142 @@
+import json
+from typing import Any, List, Optional, Tuple
+
+# (вид события, ключ верхнего уровня, индекс элемента списка или None, значение)
+Event = Tuple[str, str, Optional[int], Any]
+
+
+class JsonFieldStream:
+    """
+    Инкрементальный разбор JSON-объекта, который приходит кусками от LLM.
+
+    feed() возвращает события, как только что-то дописано до конца:
+    - ("field", key, None, value) — значение поля верхнего уровня готово;
+    - ("item", key, index, value) — готов очередной элемент списка,
+      лежащего в поле верхнего уровня (например, strengths[2]).
+
+    Полного парсера нет: отслеживаются только строки, экранирование
+    и глубина вложенности, а готовые куски отдаются в json.loads.
+    """
+
+    def __init__(self):
+        self._buf: List[str] = []
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._started = False
+
+        self._expect = "key"          # key | colon | value | comma
+        self._key: Optional[str] = None
+        self._key_start = 0
+        self._value_start: Optional[int] = None
+
+        self._array_key: Optional[str] = None
+        self._item_start: Optional[int] = None
+        self._item_index = 0
+
+    def feed(self, chunk: str) -> List[Event]:
+        self._buf.append(chunk)
+        text = "".join(self._buf)
+        self._buf = [text]
+
+        events: List[Event] = []
+        i = self._pos
+        while i < len(text):
+            ch = text[i]
+
+            if not self._started:
+                if ch == "{":
+                    self._started = True
+                    self._depth = 1
+                i += 1
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    self._string_closed(text, i, events)
+                i += 1
+                continue
+
+            if ch == '"':
+                self._in_string = True
+                if self._depth == 1 and self._expect == "key":
+                    self._key_start = i
+                elif self._depth == 1 and self._expect == "value":
+                    self._value_start = i
+                elif self._depth == 2 and self._array_key and self._item_start is None:
+                    self._item_start = i
+            elif ch in "{[":
+                if self._depth == 1 and self._expect == "value":
+                    self._value_start = i
+                    if ch == "[":
+                        self._array_key = self._key
+                        self._item_start = None
+                        self._item_index = 0
+                elif self._depth == 2 and self._array_key and self._item_start is None:
+                    self._item_start = i
+                self._depth += 1
+            elif ch in "}]":
+                if self._depth == 2 and self._array_key and ch == "]":
+                    self._emit_item(text[self._item_start:i] if self._item_start is not None else "", events)
+                    self._array_key = None
+                self._depth -= 1
+                if self._depth == 1 and self._value_start is not None:
+                    self._emit_field(text[self._value_start:i + 1], events)
+                elif self._depth == 0:
+                    if self._value_start is not None:
+                        self._emit_field(text[self._value_start:i], events)
+                    self._started = False
+            elif ch == ":" and self._depth == 1 and self._expect == "colon":
+                self._expect = "value"
+            elif ch == ",":
+                if self._depth == 1:
+                    if self._value_start is not None:
+                        self._emit_field(text[self._value_start:i], events)
+                    self._expect = "key"
+                elif self._depth == 2 and self._array_key:
+                    self._emit_item(text[self._item_start:i] if self._item_start is not None else "", events)
+            elif not ch.isspace():
+                # начало числа / true / false / null
+                if self._depth == 1 and self._expect == "value" and self._value_start is None:
+                    self._value_start = i
+                elif self._depth == 2 and self._array_key and self._item_start is None:
+                    self._item_start = i
+            i += 1
+
+        self._pos = i
+        return events
+
+    def _string_closed(self, text: str, i: int, events: List[Event]) -> None:
+        if self._depth != 1:
+            return
+        if self._expect == "key":
+            self._key = json.loads(text[self._key_start:i + 1])
+            self._expect = "colon"
+        elif self._expect == "value" and self._value_start is not None:
+            # строковое значение готово сразу по закрывающей кавычке
+            self._emit_field(text[self._value_start:i + 1], events)
+
+    def _emit_field(self, raw: str, events: List[Event]) -> None:
+        self._value_start = None
+        self._expect = "comma"
+        try:
+            events.append(("field", self._key, None, json.loads(raw.strip())))
+        except ValueError:
+            pass
+
+    def _emit_item(self, raw: str, events: List[Event]) -> None:
+        self._item_start = None
+        raw = raw.strip()
+        if not raw:
+            return
+        try:
+            events.append(("item", self._array_key, self._item_index, json.loads(raw)))
+        except ValueError:
+            return
+        self._item_index += 1
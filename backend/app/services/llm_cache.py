@@ -0,0 +1,135 @@
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from typing import Any, Optional
+
+from app.core.config import settings
+from app.utils.cache import MISSING, TTLCache
+from app.utils.sqlite import connect
+
+
+def make_key(params: dict) -> str:
+    """
+    Ключ кэша — sha256 от нормализованных параметров вызова
+    (модель, сообщения, temperature, формат ответа и т.д.).
+    """
+    normalized = dict(params)
+    normalized["messages"] = [
+        {"role": m["role"], "content": m["content"].strip()}
+        for m in params.get("messages", [])
+    ]
+    raw = json.dumps(normalized, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class _DiskTier:
+    """
+    SQLite-уровень кэша, общий для всех воркеров на машине.
+    max_rows — потолок размера: сверх него удаляются самые давно записанные.
+    """
+
+    def __init__(self, path: str, table: str = "llm_cache", max_rows: Optional[int] = None):
+        self.table = table
+        self.max_rows = max_rows
+        self._lock = threading.Lock()
+        self._conn = connect(path)
+        self._conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {table} ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value, expires FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        value, expires = row
+        if expires and expires < time.time():
+            return None
+        return value
+
+    def set(self, key: str, value: str, ttl: float) -> None:
+        expires = time.time() + ttl if ttl else 0.0
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value, expires) VALUES (?, ?, ?)",
+                (key, value, expires),
+            )
+            self._conn.execute(
+                f"DELETE FROM {self.table} WHERE expires > 0 AND expires < ?", (time.time(),)
+            )
+            if self.max_rows:
+                # INSERT OR REPLACE выдаёт новый rowid — старые записи в начале
+                self._conn.execute(
+                    f"DELETE FROM {self.table} WHERE rowid IN ("
+                    f"SELECT rowid FROM {self.table} ORDER BY rowid DESC LIMIT -1 OFFSET ?)",
+                    (self.max_rows,),
+                )
+            self._conn.commit()
+
+
+class LLMCache:
+    """
+    Кэш точных совпадений для run_llm: in-memory LRU + TTL и опционально
+    SQLite-уровень. Значения хранятся сериализованными, чтобы вызывающий код
+    мог свободно мутировать полученный dict.
+    """
+
+    def __init__(
+        self,
+        max_items: int = 1024,
+        ttl: float = 3600.0,
+        db_path: Optional[str] = None,
+        table: str = "llm_cache",
+        max_rows: Optional[int] = None,
+    ):
+        self.ttl = ttl
+        self._memory = TTLCache(max_items=max_items, ttl=ttl)
+        self._disk = _DiskTier(db_path, table, max_rows) if db_path else None
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    async def get(self, key: str) -> Any:
+        raw = self._memory.get(key)
+        if raw is not MISSING:
+            self.hits += 1
+            return json.loads(raw)
+
+        if self._disk is not None:
+            raw = await asyncio.to_thread(self._disk.get, key)
+            if raw is not None:
+                self.disk_hits += 1
+                self._memory.set(key, raw)
+                return json.loads(raw)
+
+        self.misses += 1
+        return MISSING
+
+    async def set(self, key: str, value: Any) -> None:
+        raw = json.dumps(value, ensure_ascii=False)
+        self._memory.set(key, raw)
+        if self._disk is not None:
+            await asyncio.to_thread(self._disk.set, key, raw, self.ttl)
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "size": len(self._memory),
+            "evictions": self._memory.evictions,
+        }
+
+
+llm_cache = LLMCache(
+    max_items=settings.LLM_CACHE_MAX_ITEMS,
+    ttl=settings.LLM_CACHE_TTL,
+    db_path=settings.LLM_CACHE_DB_PATH,
+)
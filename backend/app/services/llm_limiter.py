@@ -0,0 +1,228 @@
+import asyncio
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import openai
+
+from app.core.config import settings
+
+
+class LLMOverloaded(Exception):
+    """Очередь к OpenAI переполнена или ожидание слота превысило таймаут."""
+
+    def __init__(self, message: str, retry_after: float = 1.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """
+    Token bucket с резервированием: acquire списывает сразу (баланс может
+    уйти в минус) и спит ровно столько, сколько нужно для погашения долга.
+    Так ожидающие обслуживаются по порядку, а lock не держится во время сна.
+    """
+
+    def __init__(self, per_minute: float):
+        self.rate = per_minute / 60.0
+        self.capacity = float(per_minute)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float) -> float:
+        """Списывает amount и возвращает, сколько секунд нужно подождать."""
+        if self.rate <= 0:
+            return 0.0
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+        return max(0.0, -self.tokens / self.rate)
+
+    def refund(self, amount: float) -> None:
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+class ModelGovernor:
+    """
+    Лимиты на одну модель:
+    - token bucket по запросам/мин и токенам/мин;
+    - AIMD-лимит одновременных запросов: +1/limit за каждый быстрый успешный
+      ответ при упёртом лимите, ×0.5 на 429 или на ответ медленнее LLM_LATENCY_TARGET;
+    - ограниченная очередь ожидания с таймаутом;
+    - повторы с джиттером и учётом Retry-After.
+    """
+
+    def __init__(self):
+        self.rpm = TokenBucket(settings.LLM_RPM)
+        self.tpm = TokenBucket(settings.LLM_TPM)
+        self.limit = float(settings.LLM_INITIAL_CONCURRENCY)
+        self.in_flight = 0
+        self.waiting = 0
+        self._cond = asyncio.Condition()
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+
+        self.throttled = 0
+        self.retries = 0
+        self.rejected = 0
+        self.queued = 0
+        self.queue_time_total = 0.0
+        self.queue_time_max = 0.0
+
+    # -----------------------------
+    # ACQUIRE / RELEASE
+    # -----------------------------
+
+    async def _acquire(self, est_tokens: int) -> None:
+        if self.waiting >= settings.LLM_MAX_QUEUE:
+            self.rejected += 1
+            raise LLMOverloaded("LLM queue is full", retry_after=self.retry_hint())
+
+        started = time.monotonic()
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._wait_slot(est_tokens), settings.LLM_QUEUE_TIMEOUT)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise LLMOverloaded("Timed out waiting for LLM slot", retry_after=self.retry_hint())
+        finally:
+            self.waiting -= 1
+
+        waited = time.monotonic() - started
+        self.queued += 1
+        self.queue_time_total += waited
+        self.queue_time_max = max(self.queue_time_max, waited)
+
+    async def _wait_slot(self, est_tokens: int) -> None:
+        pause = self._paused_until - time.monotonic()
+        if pause > 0:
+            await asyncio.sleep(pause)
+
+        delay = max(self.rpm.reserve(1), self.tpm.reserve(est_tokens))
+        acquired = False
+        try:
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            async with self._cond:
+                await self._cond.wait_for(lambda: self.in_flight < int(self.limit))
+                self.in_flight += 1
+                acquired = True
+        finally:
+            # Таймаут очереди или отмена: запрос не ушёл — резерв возвращаем
+            if not acquired:
+                self._refund(est_tokens)
+
+    def _refund(self, est_tokens: int) -> None:
+        self.rpm.refund(1)
+        self.tpm.refund(est_tokens)
+
+    async def _release(self, latency: float, throttled: bool) -> None:
+        async with self._cond:
+            saturated = self.in_flight >= int(self.limit)
+            self.in_flight -= 1
+            now = time.monotonic()
+            if throttled or latency > settings.LLM_LATENCY_TARGET:
+                # Один сбой "видят" сразу все запросы в полёте — уменьшаем
+                # не чаще раза в секунду, иначе лимит схлопнется до минимума
+                if now - self._last_decrease > 1.0:
+                    self.limit = max(settings.LLM_MIN_CONCURRENCY, self.limit * 0.5)
+                    self._last_decrease = now
+            elif saturated and now - self._last_decrease > settings.LLM_LATENCY_TARGET:
+                # Растём, только если лимит реально упирался и после
+                # последнего снижения прошло время
+                self.limit = min(settings.LLM_MAX_CONCURRENCY, self.limit + 1.0 / self.limit)
+            self._cond.notify_all()
+
+    def retry_hint(self) -> float:
+        return round(max(1.0, self._paused_until - time.monotonic()), 1)
+
+    # -----------------------------
+    # RUN
+    # -----------------------------
+
+    async def run(self, call: Callable[[], Awaitable[Any]], est_tokens: int) -> Any:
+        for attempt in range(settings.LLM_MAX_RETRIES + 1):
+            await self._acquire(est_tokens)
+
+            started = time.monotonic()
+            throttled = False
+            try:
+                resp = await call()
+                usage = getattr(resp, "usage", None)
+                if usage is not None and usage.total_tokens:
+                    # Резервировали по оценке — возвращаем/доплачиваем разницу
+                    self.tpm.refund(est_tokens - usage.total_tokens)
+                return resp
+            except openai.RateLimitError as e:
+                throttled = True
+                self.throttled += 1
+                error = e
+                delay = _retry_after(e) or _backoff(attempt)
+                self._paused_until = max(self._paused_until, time.monotonic() + delay)
+            except (openai.APITimeoutError, openai.APIConnectionError, openai.InternalServerError) as e:
+                error = e
+                delay = _backoff(attempt)
+            finally:
+                await self._release(time.monotonic() - started, throttled)
+
+            # Неудачная попытка не должна занимать лимит: повтор резервирует заново
+            self._refund(est_tokens)
+            if attempt == settings.LLM_MAX_RETRIES:
+                raise error
+            self.retries += 1
+            await asyncio.sleep(delay + random.uniform(0, delay * 0.25))
+
+        raise RuntimeError("unreachable")
+
+    def stats(self) -> dict:
+        return {
+            "concurrency_limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "throttled": self.throttled,
+            "retries": self.retries,
+            "rejected": self.rejected,
+            "queue_time_avg": round(self.queue_time_total / self.queued, 4) if self.queued else 0.0,
+            "queue_time_max": round(self.queue_time_max, 4),
+        }
+
+
+def _backoff(attempt: int) -> float:
+    return min(30.0, 0.5 * 2 ** attempt) * random.uniform(0.5, 1.0)
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    response = getattr(error, "response", None)
+    if response is None:
+        return None
+    value = response.headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = response.headers.get("retry-after")
+    try:
+        return float(value) if value else None
+    except ValueError:
+        return None
+
+
+_governors: Dict[str, ModelGovernor] = {}
+
+
+def get_governor(model: str) -> ModelGovernor:
+    governor = _governors.get(model)
+    if governor is None:
+        governor = _governors[model] = ModelGovernor()
+    return governor
+
+
+def limiter_stats() -> dict:
+    return {model: g.stats() for model, g in _governors.items()}
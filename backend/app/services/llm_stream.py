@@ -0,0 +1,53 @@
+import json
+from typing import AsyncIterator, Callable
+
+from app.services.json_stream import JsonFieldStream
+from app.services.llm_limiter import LLMOverloaded
+from app.services.openai_client import stream_llm
+from app.utils.sse import sse_event
+
+
+async def sse_json_events(
+    prompt: str,
+    *,
+    system: str,
+    temperature: float,
+    finalize: Callable[[dict], dict],
+) -> AsyncIterator[str]:
+    """
+    Превращает потоковый JSON-ответ LLM в SSE:
+    - token — сырой кусок текста;
+    - field — готовое поле верхнего уровня (letter, score...);
+    - item  — готовый элемент списка (strengths[i]...);
+    - done  — итоговая провалидированная модель (finalize);
+    - error — если что-то пошло не так.
+    """
+    parser = JsonFieldStream()
+    fields: dict = {}
+    parts = []
+
+    try:
+        async for delta in stream_llm(prompt, system=system, temperature=temperature):
+            parts.append(delta)
+            yield sse_event("token", {"delta": delta})
+            for kind, key, index, value in parser.feed(delta):
+                if kind == "field":
+                    fields[key] = value
+                    yield sse_event("field", {"name": key, "value": value})
+                else:
+                    yield sse_event("item", {"name": key, "index": index, "value": value})
+
+        if not fields:
+            # Модель не закрыла объект — пробуем вытащить JSON из всего текста
+            text = "".join(parts)
+            start, end = text.find("{"), text.rfind("}")
+            if start != -1 and end > start:
+                fields = json.loads(text[start:end + 1])
+
+        yield sse_event("done", finalize(fields))
+
+    except LLMOverloaded as e:
+        yield sse_event("error", {"detail": "LLM is busy, try again later", "retry_after": e.retry_after})
+    except Exception as e:
+        print(f"!!! Streaming error: {e}")
+        yield sse_event("error", {"detail": str(e)})
@@ -0,0 +1,137 @@
+import hashlib
+import json
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from pydantic import BaseModel
+
+from app.core.config import settings
+from app.utils.cache import MISSING, TTLCache
+
+# Поля, которые видит LLM при оценке вакансии: изменилось любое — оценка устарела
+_FIELDS = ("title", "company", "location", "url", "requirements", "skills", "description")
+
+
+def _field(obj: Any, key: str):
+    return obj.get(key) if isinstance(obj, dict) else getattr(obj, key, None)
+
+
+def _fingerprint(item: Any) -> int:
+    return hash(tuple(json.dumps(_field(item, f), ensure_ascii=False) for f in _FIELDS))
+
+
+class MatchCache:
+    """
+    Кэш подбора по кандидату: для каждого (цель, навыки, резюме) хранятся
+    оценки LLM по отдельным вакансиям и ревизия набора вакансий, на которой
+    они посчитаны.
+
+    sync() ведёт ревизии набора: каждая новая/изменённая вакансия получает
+    следующий номер, удаление тоже сдвигает ревизию. Если ревизия не
+    изменилась — ответ отдаётся из кэша без LLM, иначе до-оцениваются только
+    вакансии с ревизией новее закэшированной.
+    """
+
+    def __init__(self, max_items: int = 256, ttl: float = 3600.0):
+        self._entries = TTLCache(max_items=max_items, ttl=ttl)
+        self._revisions: Dict[str, int] = {}
+        self._fingerprints: Dict[str, int] = {}
+        self.revision = 0
+
+        self.hits = 0
+        self.partial = 0
+        self.misses = 0
+
+    # -----------------------------
+    # VACANCY SET
+    # -----------------------------
+
+    def sync(self, items: Iterable[Any]) -> int:
+        keep = set()
+        for item in items:
+            doc_id = str(_field(item, "id"))
+            keep.add(doc_id)
+            fp = _fingerprint(item)
+            if self._fingerprints.get(doc_id) != fp:
+                self.revision += 1
+                self._fingerprints[doc_id] = fp
+                self._revisions[doc_id] = self.revision
+
+        removed = [d for d in self._fingerprints if d not in keep]
+        if removed:
+            self.revision += 1
+            for doc_id in removed:
+                del self._fingerprints[doc_id]
+                del self._revisions[doc_id]
+        return self.revision
+
+    def changed_since(self, revision: int) -> Set[str]:
+        return {doc_id for doc_id, rev in self._revisions.items() if rev > revision}
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._revisions
+
+    # -----------------------------
+    # ENTRIES
+    # -----------------------------
+
+    @staticmethod
+    def candidate_key(
+        target_role: str,
+        user_skills: List[str],
+        resume_text: Optional[str],
+        filters: Optional[BaseModel] = None,
+    ) -> str:
+        skills = sorted({str(s).strip().lower() for s in user_skills or [] if str(s).strip()})
+        # С фильтрами в LLM уходит другой набор вакансий — это отдельная запись
+        facets = filters.model_dump(exclude_none=True) if filters is not None else {}
+        raw = json.dumps(
+            [(target_role or "").strip().lower(), skills, (resume_text or "").strip(), facets],
+            ensure_ascii=False,
+            sort_keys=True,
+        )
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[dict]:
+        """{"revision": int, "scores": {vacancy_id: результат или None}} или None."""
+        entry = self._entries.get(key)
+        if entry is MISSING:
+            self.misses += 1
+            return None
+        if entry["revision"] == self.revision:
+            self.hits += 1
+        else:
+            self.partial += 1
+        return entry
+
+    def set(self, key: str, revision: int, scores: Dict[str, Optional[dict]]) -> None:
+        self._entries.set(key, {"revision": revision, "scores": scores})
+
+    def stats(self) -> dict:
+        return {
+            "hits": self.hits,
+            "partial": self.partial,
+            "misses": self.misses,
+            "size": len(self._entries),
+            "revision": self.revision,
+            "vacancies": len(self._revisions),
+        }
+
+
+def top_matches(
+    scores: Dict[str, Optional[dict]],
+    top_k: int,
+    allowed: Optional[Set[str]] = None,
+) -> List[dict]:
+    """Лучшие top_k по match_score; None — вакансия оценена как неподходящая."""
+    ranked = sorted(
+        (
+            r for doc_id, r in scores.items()
+            if r is not None and (allowed is None or doc_id in allowed)
+        ),
+        key=lambda r: r["match_score"],
+        reverse=True,
+    )
+    return [dict(r) for r in ranked[:top_k]]
+
+
+match_cache = MatchCache(max_items=settings.MATCH_CACHE_MAX_ITEMS, ttl=settings.MATCH_CACHE_TTL)
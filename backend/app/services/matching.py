@@ -1,29 +1,58 @@
+import asyncio
 import json
 import re
-from typing import List, Optional
+from typing import Dict, List, Optional, Tuple
+from app.core.config import settings
 from app.services.openai_client import run_llm
-from app.schemas.matching import InternshipItem, MatchingResponse
+from app.services.vacancy_index import build_query
+from app.services.vacancy_catalog import VacancyCatalog, local_catalog, shared_catalog
+from app.services.match_cache import top_matches
+from app.services.prompt_budget import count_tokens, pack_items, prompt_budget, truncate_to_tokens
+from app.schemas.matching import InternshipItem, MatchingResponse, VacancyFilters
+from app.schemas.profile import CandidateProfile
+from app.services.candidate_profile import render_profile
 
 SYSTEM = (
     "Ты опытный карьерный ассистент и рекрутер. Отвечай строго по-русски. "
     "Верни ТОЛЬКО валидный JSON. Не добавляй никаких пояснений, текста или markdown-разметки (типа ```json) вне структуры JSON."
 )
 
-def recommend_internships(
+_RESULTS_OVERHEAD = 30  # {"results": [ ... ]}
+
+async def recommend_internships(
     target_role: str,
     user_skills: List[str],
     resume_text: Optional[str],
     internships: Optional[List[InternshipItem]],
     top_k: int = 5,
+    mode: str = "llm",
+    profile: Optional[CandidateProfile] = None,
+    filters: Optional[VacancyFilters] = None,
 ) -> MatchingResponse:
     """
-    Анализирует список стажировок через LLM и подбирает лучшие варианты для кандидата.
+    Анализирует список стажировок и подбирает лучшие варианты для кандидата.
+
+    mode:
+    - "fast"   — только локальный скоринг по навыкам, без LLM;
+    - "hybrid" — ранжирует локальный скоринг, LLM пишет пояснения для top_k;
+    - "llm"    — LLM оценивает вакансии (при сбое — локальный скоринг); оценки
+      кэшируются по кандидату, при обновлении набора до-оцениваются только новые.
+
+    profile — если передан, заменяет resume_text компактной выжимкой,
+    а его навыки добавляются к user_skills.
+
+    filters — фасетные фильтры; считаются по битовым индексам до любого
+    ранжирования, индексы при этом строятся по полному набору вакансий.
     """
-    from app.services.internship_ai_engine import get_ai_internships
+    if profile is not None:
+        user_skills = list(dict.fromkeys([*(user_skills or []), *profile.skills]))
+        resume_text = render_profile(profile)
+
+    from app.services.internship_ai_engine import get_vacancy_set
 
     # 1. Получаем список вакансий (из парсера или переданный список)
-    # Используем get_ai_internships, так как она агрегирует данные из HH и моков
-    jobs = get_ai_internships(internships=internships)
+    # Используем get_vacancy_set, так как она агрегирует данные из HH и моков
+    set_key, jobs = await get_vacancy_set(internships=internships)
     
     if not jobs:
         return MatchingResponse(results=[])
@@ -31,79 +60,284 @@ def recommend_internships(
     # 2. Подготовка полезной нагрузки (payload) для LLM
     # Извлекаем список, если пришел словарь, иначе используем как есть
     actual_jobs = jobs.get("internships", []) if isinstance(jobs, dict) else jobs
-    
-    jobs_payload = []
-    # Берем первые 30-40 вакансий, чтобы не превысить лимит токенов контекста
-    for j in actual_jobs[:40]:
-        def get_field(obj, key):
-            """Безопасно извлекает поле из объекта или словаря."""
-            return obj.get(key) if isinstance(obj, dict) else getattr(obj, key, "")
-
-        jobs_payload.append({
-            "id": str(get_field(j, "id")),
-            "title": get_field(j, "title"),
-            "company": get_field(j, "company"),
-            "location": get_field(j, "location"),
-            "url": get_field(j, "url"),
-            "requirements": get_field(j, "requirements") or [],
-            "skills": get_field(j, "skills") or [],
-            "description": str(get_field(j, "description") or "")[:500], # Ограничиваем длину описания
-        })
-
-    # 3. Формирование промпта
     top_k = max(1, min(10, top_k)) # Ограничение от 1 до 10
-    
-    prompt = f"""
-Ты — AI-рекрутер. Найди самые подходящие стажировки из списка ниже.
+
+    # Общие индексы — только для хранилища; список из запроса индексируется
+    # отдельно и не вытесняет их
+    catalog = shared_catalog if set_key is not None else local_catalog()
+    await catalog.sync(set_key, actual_jobs)
+
+    allowed = catalog.facets.allowed(filters)
+    if allowed is not None and not allowed:
+        return MatchingResponse(results=[])
+
+    if mode in ("fast", "hybrid"):
+        ranked = catalog.scorer.rank(target_role, user_skills, resume_text, top_k, allowed=allowed)
+        if mode == "hybrid":
+            ranked = await _explain_matches(ranked, target_role, user_skills, resume_text)
+        return MatchingResponse(results=ranked)
+
+    # Кэш по кандидату: набор вакансий не менялся — ответ без LLM,
+    # иначе LLM оценивает только новые/изменённые вакансии
+    match_cache = catalog.cache
+    revision = catalog.revision
+    cache_key = match_cache.candidate_key(target_role, user_skills, resume_text, filters)
+    entry = match_cache.get(cache_key) if settings.MATCH_CACHE_ENABLED else None
+    if entry is not None and entry["revision"] == revision:
+        results = top_matches(entry["scores"], top_k, allowed)
+        if results:
+            return MatchingResponse(results=results)
+
+    # Локальный BM25-префильтр: в промпт попадают самые релевантные
+    # вакансии, а не первые N из списка
+    candidates = catalog.index.search(
+        build_query(target_role, user_skills, resume_text),
+        top_n=settings.MATCHING_PREFILTER_TOP_N,
+        allowed=allowed,
+    )
+
+    scores = {}
+    if entry is not None:
+        changed = match_cache.changed_since(entry["revision"])
+        candidates = [c for c in candidates if str(_get_field(c, "id")) in changed]
+        # Оценки удалённых и изменённых вакансий выбрасываем
+        scores = {
+            doc_id: result
+            for doc_id, result in entry["scores"].items()
+            if doc_id in match_cache and doc_id not in changed
+        }
+
+    complete = True
+    if candidates:
+        scored, complete = await _score_jobs(candidates, target_role, user_skills, resume_text)
+        if scored is None:
+            # LLM недоступен: отдаём то, что уже было оценено, или локальный скоринг
+            results = top_matches(scores, top_k, allowed)
+            if results:
+                return MatchingResponse(results=results)
+            return _fast_fallback(catalog, target_role, user_skills, resume_text, top_k, allowed)
+        scores.update(scored)
+
+    # Часть вызовов не удалась — неоценённые вакансии не должны выпасть из кэша
+    if settings.MATCH_CACHE_ENABLED and complete:
+        match_cache.set(cache_key, revision, scores)
+
+    results = top_matches(scores, top_k, allowed)
+    if not results:
+        return _fast_fallback(catalog, target_role, user_skills, resume_text, top_k, allowed)
+    return MatchingResponse(results=results)
+
+
+def _get_field(obj, key):
+    """Безопасно извлекает поле из объекта или словаря."""
+    return obj.get(key) if isinstance(obj, dict) else getattr(obj, key, "")
+
+
+def _render_job(j):
+    return {
+        "id": str(_get_field(j, "id")),
+        "title": _get_field(j, "title"),
+        "company": _get_field(j, "company"),
+        "location": _get_field(j, "location"),
+        "url": _get_field(j, "url"),
+        "requirements": _get_field(j, "requirements") or [],
+        "skills": _get_field(j, "skills") or [],
+        # Ограничиваем длину описания в токенах, а не символах
+        "description": truncate_to_tokens(
+            str(_get_field(j, "description") or ""), settings.MATCHING_DESCRIPTION_TOKENS
+        ),
+    }
+
+
+async def _score_jobs(
+    candidates: List,
+    target_role: str,
+    user_skills: List[str],
+    resume_text: Optional[str],
+) -> Tuple[Optional[Dict[str, Optional[dict]]], bool]:
+    """
+    LLM оценивает КАЖДУЮ вакансию из пакета (а не выбирает top_k), чтобы
+    оценки можно было закэшировать и смешать с оценками следующих вакансий.
+
+    Сколько вакансий оценивать, решает бюджет промпта; ответ на все сразу
+    не влез бы в max_tokens, поэтому они делятся на вызовы по бюджету ответа
+    (MATCHING_OUTPUT_TOKENS), которые идут параллельно.
+
+    Возвращает ({id: результат}, все ли вызовы удались); None в значении —
+    вакансия в пакете была, но LLM её не оценил (считается неподходящей).
+    None вместо словаря — не удался ни один вызов.
+    """
+    # 1. Формирование промпта
+    resume = truncate_to_tokens(resume_text or "", settings.MATCHING_RESUME_TOKENS)
+    head = f"""
+Ты — AI-рекрутер. Оцени, насколько каждая стажировка из списка ниже подходит кандидату.
 
 Кандидат:
 - Цель: {target_role}
 - Навыки: {", ".join(user_skills) if isinstance(user_skills, list) else user_skills}
-- Резюме: {resume_text or "Информация отсутствует"}
+- Резюме: {resume or "Информация отсутствует"}
 
 Список стажировок:
-{json.dumps(jobs_payload, ensure_ascii=False)}
+"""
+    tail = """
 
 ЗАДАЧА:
-Выбери ТОП-{top_k} вакансий. Отсортируй их по убыванию соответствия (match_score).
+Для КАЖДОЙ вакансии из списка поставь match_score (0-100), 1-2 коротких причины
+и недостающие навыки.
 
 Верни СТРОГО JSON в формате:
-{{
+{
   "results": [
-    {{
+    {
       "id": "string",
-      "title": "string",
-      "company": "string",
-      "url": "string",
       "match_score": 0-100,
       "why_match": ["причина 1", "причина 2"],
       "missing_skills": ["навык 1"]
-    }}
+    }
   ]
-}}
+}
 """
 
-    # 4. Вызов LLM
+    # В промпт идёт столько вакансий (в порядке BM25), сколько влезает в бюджет
+    jobs_budget = prompt_budget() - count_tokens(head) - count_tokens(tail)
+    jobs_payload = pack_items(candidates, jobs_budget, render=_render_job)
+    if not jobs_payload:
+        return {}, True
+
+    per_call = max(
+        1, (settings.MATCHING_OUTPUT_TOKENS - _RESULTS_OVERHEAD) // settings.MATCHING_RESULT_TOKENS
+    )
+    # Поровну между вызовами: 60 при лимите 28 — это 20+20+20, а не 28+28+4
+    calls = -(-len(jobs_payload) // per_call)
+    size = -(-len(jobs_payload) // calls)
+    chunks = [jobs_payload[i:i + size] for i in range(0, len(jobs_payload), size)]
+
+    # 2. Вызовы LLM
+    parts = await asyncio.gather(*(_score_chunk(head, tail, chunk) for chunk in chunks))
+    scored: Dict[str, Optional[dict]] = {}
+    for part in parts:
+        if part is not None:
+            scored.update(part)
+    if all(part is None for part in parts):
+        return None, False
+    return scored, all(part is not None for part in parts)
+
+
+async def _score_chunk(head: str, tail: str, jobs_payload: List[dict]) -> Optional[Dict[str, Optional[dict]]]:
+    prompt = head + json.dumps(jobs_payload, ensure_ascii=False) + tail
+    # Оценка размера ответа + запас: обрезанный JSON — это сбой всего вызова
+    expected = _RESULTS_OVERHEAD + len(jobs_payload) * settings.MATCHING_RESULT_TOKENS
+    max_tokens = min(settings.LLM_MAX_OUTPUT_TOKENS, expected * 3 // 2)
+
     try:
-        response_text = run_llm(prompt, system=SYSTEM, temperature=0.2)
-        
-        # 5. Надежный парсинг JSON из ответа ИИ
+        response_text = await run_llm(prompt, system=SYSTEM, temperature=0.2, max_tokens=max_tokens)
+
+        # 3. Надежный парсинг JSON из ответа ИИ
         if isinstance(response_text, dict):
             data = response_text
         else:
             # Ищем JSON внутри строки (на случай, если ИИ прислал markdown ```json ... ```)
             json_match = re.search(r"\{.*\}", str(response_text), re.DOTALL)
-            if json_match:
-                data = json.loads(json_match.group())
-            else:
+            if not json_match:
                 print("!!! ERROR: LLM returned no valid JSON")
-                return MatchingResponse(results=[])
-
-        # 6. Валидация и возврат результата
-        results = data.get("results", [])
-        return MatchingResponse(results=results)
-
+                return None
+            data = json.loads(json_match.group())
     except Exception as e:
         print(f"!!! MATCHING SERVICE ERROR: {str(e)}")
-        # Возвращаем пустой результат вместо падения сервера
-        return MatchingResponse(results=[])
\ No newline at end of file
+        return None
+
+    if "error" in data or not isinstance(data.get("results"), list):
+        print(f"!!! MATCHING SERVICE ERROR: {data.get('message') or data.get('error')}")
+        return None
+
+    # 4. Сборка результата: title/company/url — из самой вакансии, не из ответа LLM
+    by_id = {job["id"]: job for job in jobs_payload}
+    scored: Dict[str, Optional[dict]] = {job_id: None for job_id in by_id}
+    for r in data["results"]:
+        if not isinstance(r, dict) or str(r.get("id")) not in by_id:
+            continue
+        job = by_id[str(r["id"])]
+        try:
+            score = max(0, min(100, int(r.get("match_score") or 0)))
+        except (TypeError, ValueError):
+            continue
+        why = r.get("why_match")
+        missing = r.get("missing_skills")
+        scored[job["id"]] = {
+            "id": job["id"],
+            "title": job["title"] or "",
+            "company": job["company"] or "",
+            "url": job["url"] or None,
+            "match_score": score,
+            "why_match": [str(w) for w in why] if isinstance(why, list) else [],
+            "missing_skills": [str(m) for m in missing] if isinstance(missing, list) else [],
+        }
+    return scored
+
+
+def _fast_fallback(
+    catalog: VacancyCatalog, target_role, user_skills, resume_text, top_k, allowed=None
+) -> MatchingResponse:
+    return MatchingResponse(
+        results=catalog.scorer.rank(target_role, user_skills, resume_text, top_k, allowed=allowed)
+    )
+
+
+async def _explain_matches(
+    ranked: List[dict],
+    target_role: str,
+    user_skills: List[str],
+    resume_text: Optional[str],
+) -> List[dict]:
+    """
+    Гибридный режим: порядок и match_score уже посчитаны локально,
+    LLM только формулирует why_match для финального top_k.
+    """
+    if not ranked:
+        return ranked
+
+    payload = [
+        {
+            "id": r["id"],
+            "title": r["title"],
+            "company": r["company"],
+            "match_score": r["match_score"],
+            "missing_skills": r["missing_skills"],
+        }
+        for r in ranked
+    ]
+
+    prompt = f"""
+Кандидат:
+- Цель: {target_role}
+- Навыки: {", ".join(user_skills) if isinstance(user_skills, list) else user_skills}
+- Резюме: {truncate_to_tokens(resume_text or "", 400) or "Информация отсутствует"}
+
+Вакансии уже отобраны и отсортированы:
+{json.dumps(payload, ensure_ascii=False)}
+
+Для КАЖДОЙ вакансии напиши 2-3 коротких причины, почему она подходит кандидату.
+
+Верни СТРОГО JSON:
+{{
+  "results": [
+    {{"id": "string", "why_match": ["причина 1", "причина 2"]}}
+  ]
+}}
+"""
+
+    data = await run_llm(prompt, system=SYSTEM, temperature=0.2)
+    if not isinstance(data, dict) or "error" in data:
+        return ranked
+
+    reasons = {
+        str(r.get("id")): r.get("why_match")
+        for r in data.get("results", [])
+        if isinstance(r, dict)
+    }
+    for r in ranked:
+        why = reasons.get(r["id"])
+        if isinstance(why, list) and why:
+            r["why_match"] = [str(w) for w in why]
+
+    return ranked
\ No newline at end of file
@@ -1,22 +1,60 @@
 import re
 import json
-from openai import OpenAI
+from typing import AsyncIterator, Optional
+import httpx
+import openai
+from openai import AsyncOpenAI
 from app.core.config import settings
+from app.services.llm_cache import llm_cache, make_key
+from app.services.prompt_budget import count_tokens, prompt_budget, truncate_middle, truncate_to_tokens
+from app.services.llm_limiter import LLMOverloaded, _retry_after, get_governor, limiter_stats
+from app.services.single_flight import SingleFlight
+from app.utils.cache import MISSING
 
-client = OpenAI(api_key=settings.OPENAI_API_KEY)
 
-
-def run_llm(
-    prompt: str,
-    *,
-    system: str,
-    temperature: float = 0.2,
-    json_mode: bool = True
-):
+def _build_http_client() -> httpx.AsyncClient:
     """
-    Production-safe LLM caller
+    Общий httpx-пул на весь воркер: keep-alive соединения переиспользуются
+    между запросами, HTTP/2 мультиплексирует параллельные вызовы.
     """
+    http2 = settings.OPENAI_HTTP2
+    if http2:
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            http2 = False
+
+    return httpx.AsyncClient(
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=settings.OPENAI_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.OPENAI_MAX_KEEPALIVE,
+            keepalive_expiry=settings.OPENAI_KEEPALIVE_EXPIRY,
+        ),
+        timeout=httpx.Timeout(
+            settings.OPENAI_TIMEOUT,
+            connect=settings.OPENAI_CONNECT_TIMEOUT,
+        ),
+    )
+
 
+client = AsyncOpenAI(
+    api_key=settings.OPENAI_API_KEY,
+    http_client=_build_http_client(),
+    # Повторы и 429 обрабатывает llm_limiter
+    max_retries=0,
+)
+
+_single_flight = SingleFlight()
+
+
+def _build_params(
+    prompt: str,
+    system: str,
+    temperature: float,
+    json_mode: bool,
+    max_tokens: Optional[int] = None,
+) -> dict:
     # 🔐 Prompt injection cleanup
     prompt = re.sub(
         r"(ignore previous instructions|developer mode|system prompt)",
@@ -25,53 +63,208 @@ def run_llm(
         flags=re.IGNORECASE
     )
 
-    # Token safety
-    prompt = prompt[:10000]
-    system = system[:2000]
+    # Token safety: страховка на случай, если вызывающий не уложился в бюджет.
+    # Режем середину, чтобы не потерять инструкции формата в конце промпта
+    prompt = truncate_middle(prompt, prompt_budget())
+    system = truncate_to_tokens(system, settings.LLM_SYSTEM_TOKEN_BUDGET)
+
+    params = {
+        "model": settings.OPENAI_MODEL,
+        "messages": [
+            {"role": "system", "content": system},
+            {"role": "user", "content": prompt}
+        ],
+        "temperature": temperature,
+        "max_tokens": max_tokens or settings.LLM_MAX_TOKENS
+    }
+
+    if json_mode:
+        params["response_format"] = {"type": "json_object"}
+
+    return params
+
+
+def _parse_text(text: str, json_mode: bool):
+    if not json_mode:
+        return text
 
     try:
-        params = {
-            "model": settings.OPENAI_MODEL,
-            "messages": [
-                {"role": "system", "content": system},
-                {"role": "user", "content": prompt}
-            ],
-            "temperature": temperature,
-            "max_tokens": 800
+        return json.loads(text)
+    except json.JSONDecodeError:
+        # fallback extraction
+        start = text.find("{")
+        end = text.rfind("}")
+        if start != -1 and end != -1:
+            return json.loads(text[start:end + 1])
+
+        return {
+            "error": "invalid_json_from_llm",
+            "raw": text
         }
 
-        if json_mode:
-            params["response_format"] = {"type": "json_object"}
 
-        resp = client.chat.completions.create(**params)
+async def _call_llm(params: dict, json_mode: bool, key: str, use_cache: bool):
+    est_tokens = params["max_tokens"] + sum(
+        count_tokens(m["content"]) for m in params["messages"]
+    )
+    resp = await get_governor(params["model"]).run(
+        lambda: client.chat.completions.create(**params),
+        est_tokens,
+    )
 
-        text = resp.choices[0].message.content or ""
+    text = resp.choices[0].message.content or ""
 
-        if json_mode:
-            try:
-                return json.loads(text)
-            except json.JSONDecodeError:
-                # fallback extraction
-                start = text.find("{")
-                end = text.rfind("}")
-                if start != -1 and end != -1:
-                    return json.loads(text[start:end + 1])
+    result = _parse_text(text, json_mode)
 
-                return {
-                    "error": "invalid_json_from_llm",
-                    "raw": text
-                }
+    # Ошибки разбора не кэшируем — следующий вызов должен попробовать снова
+    if use_cache and not (isinstance(result, dict) and "error" in result):
+        await llm_cache.set(key, result)
 
-        return text
+    return result
+
+
+async def run_llm(
+    prompt: str,
+    *,
+    system: str,
+    temperature: float = 0.2,
+    json_mode: bool = True,
+    cache: bool = True,
+    max_tokens: Optional[int] = None,
+):
+    """
+    Production-safe LLM caller (async, не занимает поток и не блокирует event loop)
+
+    cache=False — отключить кэш для "творческих" вызовов с высокой temperature,
+    где каждый ответ должен быть новым. Одинаковые одновременные вызовы
+    склеиваются в один запрос к OpenAI независимо от cache.
+
+    max_tokens — потолок длины ответа (по умолчанию LLM_MAX_TOKENS); вызовы
+    с большим структурированным ответом задают его под размер запроса.
+    """
+    try:
+        params = _build_params(prompt, system, temperature, json_mode, max_tokens)
+        key = make_key(params)
+
+        use_cache = cache and settings.LLM_CACHE_ENABLED
+        if use_cache:
+            cached = await llm_cache.get(key)
+            if cached is not MISSING:
+                return cached
+
+        return await _single_flight.do(
+            key, lambda: _call_llm(params, json_mode, key, use_cache)
+        )
 
+    except LLMOverloaded as e:
+        return {
+            "error": "llm_rate_limited",
+            "message": str(e),
+            "retry_after": e.retry_after,
+        }
+    except openai.RateLimitError as e:
+        # Retry-After от OpenAI, без заголовка — пауза, которую держит governor
+        retry_after = _retry_after(e)
+        if retry_after is None:
+            retry_after = get_governor(params["model"]).retry_hint()
+        return {
+            "error": "llm_rate_limited",
+            "message": str(e),
+            "retry_after": retry_after,
+        }
     except Exception as e:
         return {
             "error": "llm_call_failed",
             "message": str(e)
         }
+
+
+async def stream_llm(
+    prompt: str,
+    *,
+    system: str,
+    temperature: float = 0.2,
+    json_mode: bool = True,
+    cache: bool = True,
+    max_tokens: Optional[int] = None,
+) -> AsyncIterator[str]:
+    """
+    Потоковый вариант run_llm: отдаёт куски текста по мере генерации.
+
+    Слот governor'а занят до получения заголовков ответа (повторы 429
+    возможны только до первого токена). При попадании в кэш весь ответ
+    отдаётся одним куском; готовый ответ кладётся в кэш как у run_llm.
+    """
+    params = _build_params(prompt, system, temperature, json_mode, max_tokens)
+    key = make_key(params)
+
+    use_cache = cache and settings.LLM_CACHE_ENABLED
+    if use_cache:
+        cached = await llm_cache.get(key)
+        if cached is not MISSING:
+            yield cached if isinstance(cached, str) else json.dumps(cached, ensure_ascii=False)
+            return
+
+    est_tokens = params["max_tokens"] + sum(
+        count_tokens(m["content"]) for m in params["messages"]
+    )
+    stream = await get_governor(params["model"]).run(
+        lambda: client.chat.completions.create(**params, stream=True),
+        est_tokens,
+    )
+
+    parts = []
+    async for chunk in stream:
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if delta:
+            parts.append(delta)
+            yield delta
+
+    if use_cache:
+        result = _parse_text("".join(parts), json_mode)
+        if not (isinstance(result, dict) and "error" in result):
+            await llm_cache.set(key, result)
+
+
+def llm_rate_limited(result) -> Optional[float]:
+    """Если run_llm упёрся в лимиты OpenAI — через сколько секунд повторить."""
+    if isinstance(result, dict) and result.get("error") == "llm_rate_limited":
+        return float(result.get("retry_after") or 1.0)
+    return None
+
+
+async def warmup_llm():
+    """
+    Прогрев пула при старте: TLS-рукопожатие и DNS делаются заранее,
+    а не на первом пользовательском запросе.
+    """
+    if not settings.OPENAI_WARMUP:
+        return
+    try:
+        await client.models.list()
+    except Exception as e:
+        print(f"OpenAI warmup failed: {e}")
+
+
+async def close_llm():
+    """Закрывает общий HTTP пул при остановке приложения."""
+    await client.close()
+
+
+def llm_stats() -> dict:
+    """Счётчики слоя LLM для /debug/llm."""
+    return {
+        "cache": llm_cache.stats(),
+        "single_flight": _single_flight.stats(),
+        "limiter": limiter_stats(),
+    }
+
+
 def get_openai_client():
     """
-    Возвращает инициализированный объект клиента OpenAI.
+    Возвращает инициализированный объект клиента OpenAI (AsyncOpenAI).
     Используется там, где нужен прямой доступ к методам SDK.
     """
-    return client
\ No newline at end of file
+    return client
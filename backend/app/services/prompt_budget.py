@@ -0,0 +1,166 @@
+import json
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional
+
+from app.core.config import settings
+
+# Окна контекста известных моделей (токены); бюджет промпта берётся
+# как min(окно - ответ, LLM_PROMPT_TOKEN_BUDGET)
+MODEL_CONTEXT = {
+    "gpt-4.1": 1_000_000,
+    "gpt-4.1-mini": 1_000_000,
+    "gpt-4.1-nano": 1_000_000,
+    "gpt-4o": 128_000,
+    "gpt-4o-mini": 128_000,
+}
+
+# Калибровка оценщика (токенов на символ) для o200k/cl100k:
+# английский ~4 символа на токен, кириллица ~2.5, числа бьются по 2-3 цифры
+_LATIN = 0.25
+_CYRILLIC = 0.4
+_DIGIT = 0.4
+_OTHER = 0.7
+
+
+@lru_cache(maxsize=None)
+def _encoding(model: str):
+    """tiktoken — опционально; без него (или без сети для словаря) работает оценщик."""
+    try:
+        import tiktoken
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception:
+        return None
+
+
+def _char_cost(ch: str) -> float:
+    if ch.isspace():
+        return 0.0
+    if ch.isascii():
+        return _LATIN if ch.isalpha() else _DIGIT if ch.isdigit() else _OTHER
+    if "Ѐ" <= ch <= "ӿ":
+        return _CYRILLIC
+    return _OTHER
+
+
+def _estimate(text: str) -> int:
+    return int(sum(map(_char_cost, text))) + 1
+
+
+def _cut_index(text: str, max_tokens: int) -> int:
+    """Длина самого длинного префикса, который укладывается в max_tokens."""
+    tokens = 1.0
+    for i, ch in enumerate(text):
+        tokens += _char_cost(ch)
+        if tokens > max_tokens:
+            return i
+    return len(text)
+
+
+def count_tokens(text: str, model: Optional[str] = None) -> int:
+    if not text:
+        return 0
+    enc = _encoding(model or settings.OPENAI_MODEL)
+    if enc is not None:
+        return len(enc.encode(text))
+    return _estimate(text)
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model: Optional[str] = None) -> str:
+    """Обрезает текст по токенам (а не символам), стараясь резать по границе слова."""
+    if max_tokens <= 0 or not text:
+        return ""
+    # Токенов не больше, чем символов — короткий текст не считаем
+    if len(text) <= max_tokens or count_tokens(text, model) <= max_tokens:
+        return text
+
+    enc = _encoding(model or settings.OPENAI_MODEL)
+    if enc is not None:
+        return enc.decode(enc.encode(text)[:max_tokens])
+
+    lo = _cut_index(text, max_tokens)
+    cut = text[:lo]
+    space = cut.rfind(" ")
+    return cut[:space] if space > lo * 0.8 else cut
+
+
+def truncate_middle(text: str, max_tokens: int, model: Optional[str] = None) -> str:
+    """Оставляет начало и конец — инструкции формата в хвосте промпта не теряются."""
+    if len(text) <= max_tokens or count_tokens(text, model) <= max_tokens:
+        return text
+    head = truncate_to_tokens(text, max_tokens * 2 // 3, model)
+    tail_budget = max_tokens - count_tokens(head, model) - 2
+    tail = truncate_to_tokens(text[::-1], tail_budget, model)[::-1] if tail_budget > 0 else ""
+    return f"{head}\n...\n{tail}"
+
+
+def prompt_budget(model: Optional[str] = None, reserve_output: int = 800) -> int:
+    model = model or settings.OPENAI_MODEL
+    window = MODEL_CONTEXT.get(model, 128_000)
+    return min(window - reserve_output, settings.LLM_PROMPT_TOKEN_BUDGET)
+
+
+@dataclass
+class Section:
+    """
+    Именованный кусок промпта. Сначала каждая секция получает min_tokens
+    (в порядке priority), затем остаток бюджета раздаётся по убыванию priority.
+    min_tokens=None — секцию нельзя обрезать (инструкции, формат ответа).
+    """
+    name: str
+    text: str
+    priority: int = 0
+    min_tokens: Optional[int] = 0
+
+
+def fit_sections(
+    sections: List[Section],
+    budget: int,
+    model: Optional[str] = None,
+) -> Dict[str, str]:
+    sizes = {s.name: count_tokens(s.text, model) for s in sections}
+    by_priority = sorted(sections, key=lambda s: -s.priority)
+
+    alloc: Dict[str, int] = {}
+    left = budget
+    for s in by_priority:
+        want = sizes[s.name] if s.min_tokens is None else min(s.min_tokens, sizes[s.name])
+        alloc[s.name] = max(0, min(want, left)) if s.min_tokens is not None else want
+        left -= alloc[s.name]
+
+    for s in by_priority:
+        if left <= 0:
+            break
+        extra = min(sizes[s.name] - alloc[s.name], left)
+        alloc[s.name] += extra
+        left -= extra
+
+    return {
+        s.name: s.text if alloc[s.name] >= sizes[s.name] else truncate_to_tokens(s.text, alloc[s.name], model)
+        for s in sections
+    }
+
+
+def pack_items(
+    items: List[Any],
+    budget: int,
+    render: Callable[[Any], Any] = lambda x: x,
+    model: Optional[str] = None,
+) -> List[Any]:
+    """
+    Жадно берёт элементы по порядку (уже отсортированы по релевантности),
+    пока их JSON помещается в бюджет. Возвращает отрендеренные элементы.
+    """
+    packed = []
+    used = 2  # скобки массива
+    for item in items:
+        rendered = render(item)
+        cost = count_tokens(json.dumps(rendered, ensure_ascii=False), model) + 1
+        if used + cost > budget:
+            break
+        packed.append(rendered)
+        used += cost
+    return packed
@@ -0,0 +1,337 @@
+import asyncio
+import json
+import os
+import random
+import re
+import socket
+import threading
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+from app.core.config import settings
+from app.services.openai_client import run_llm
+from app.utils.sqlite import connect
+
+QUESTIONS_SYSTEM = "Ты HR эксперт. Отвечай ТОЛЬКО валидным JSON, без лишнего текста."
+
+_OWNER = f"{socket.gethostname()}:{os.getpid()}"
+_WORD_RE = re.compile(r"\w+")
+
+
+def questions_prompt(role: str, level: str, focus: Optional[str], count: str, candidate: str = "") -> str:
+    return f"""
+Сгенерируй {count} вопросов для собеседования.
+
+Позиция: {role}
+Уровень: {level}
+Фокус: {focus or "общий"}
+{candidate}
+Верни ТОЛЬКО JSON:
+
+{{
+  "questions": [
+    {{"type": "general", "question": "вопрос"}},
+    {{"type": "technical", "question": "вопрос"}}
+  ]
+}}
+"""
+
+
+def _norm(text: Optional[str]) -> str:
+    return " ".join(_WORD_RE.findall((text or "").lower().replace("ё", "е")))
+
+
+def pool_key(role: str, level: str, focus: Optional[str]) -> str:
+    """"Python  Developer", "Intern", None -> "python developer|intern|общий"."""
+    return "|".join([_norm(role), _norm(level), _norm(focus) or "общий"])
+
+
+def _similar(a: Set[str], b: Set[str]) -> bool:
+    union = a | b
+    return bool(union) and len(a & b) / len(union) >= settings.QUESTION_POOL_NEAR_DUP
+
+
+class QuestionPool:
+    """
+    Пулы заранее сгенерированных вопросов по (роль, уровень, фокус) в SQLite,
+    общие для всех воркеров.
+
+    Выдаются наименее показанные вопросы (случайно среди них); вопрос,
+    показанный QUESTION_POOL_MAX_SERVES раз, выбывает, и пул пополняется
+    свежими. Дубли отсекаются по нормализованному тексту и по близости
+    множеств слов.
+    """
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = connect(path)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS question_pools (
+                key TEXT PRIMARY KEY,
+                role TEXT NOT NULL,
+                level TEXT NOT NULL,
+                focus TEXT,
+                requested INTEGER NOT NULL DEFAULT 0,
+                last_requested REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS pool_questions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                key TEXT NOT NULL,
+                type TEXT NOT NULL,
+                question TEXT NOT NULL,
+                norm TEXT NOT NULL,
+                served INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                UNIQUE (key, norm)
+            );
+            CREATE INDEX IF NOT EXISTS pool_questions_served ON pool_questions (key, served);
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+            """
+        )
+        self._conn.commit()
+
+    # -----------------------------
+    # POOLS
+    # -----------------------------
+
+    def touch(self, key: str, role: str, level: str, focus: Optional[str]) -> int:
+        """Учитывает спрос: пополняются только пулы, которые запрашивают. Возвращает число запросов."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO question_pools (key, role, level, focus, requested, last_requested) "
+                "VALUES (?, ?, ?, ?, 1, ?) "
+                "ON CONFLICT(key) DO UPDATE SET requested = requested + 1, "
+                "last_requested = excluded.last_requested",
+                (key, role, level, focus, time.time()),
+            )
+            self._conn.commit()
+            return self._conn.execute(
+                "SELECT requested FROM question_pools WHERE key = ?", (key,)
+            ).fetchone()[0]
+
+    def size(self, key: str) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM pool_questions WHERE key = ?", (key,)
+            ).fetchone()[0]
+
+    def sample(self, key: str, n: int) -> Tuple[Optional[List[dict]], int]:
+        """(n вопросов или None, если пул ещё слишком мал; размер пула)."""
+        with self._lock:
+            size = self._conn.execute(
+                "SELECT COUNT(*) FROM pool_questions WHERE key = ?", (key,)
+            ).fetchone()[0]
+            if size < max(n, settings.QUESTION_POOL_MIN_SERVE):
+                return None, size
+
+            rows = self._conn.execute(
+                "SELECT id, type, question FROM pool_questions WHERE key = ? "
+                "ORDER BY served, random() LIMIT ?",
+                (key, n * 3),
+            ).fetchall()
+            chosen = random.sample(rows, n)
+            ids = [row[0] for row in chosen]
+            marks = ",".join("?" * len(ids))
+            self._conn.execute(
+                f"UPDATE pool_questions SET served = served + 1 WHERE id IN ({marks})", ids
+            )
+            retired = self._conn.execute(
+                "DELETE FROM pool_questions WHERE key = ? AND served >= ?",
+                (key, settings.QUESTION_POOL_MAX_SERVES),
+            ).rowcount
+            self._conn.commit()
+
+        questions = [{"type": qtype, "question": text} for _, qtype, text in chosen]
+        # Как у живой генерации: сначала общие, потом остальные
+        questions.sort(key=lambda q: q["type"] != "general")
+        return questions, size - retired
+
+    def add(self, key: str, questions: List[dict]) -> int:
+        """Добавляет новые вопросы, пропуская дубли; возвращает число добавленных."""
+        with self._lock:
+            existing = [
+                set(norm.split())
+                for (norm,) in self._conn.execute(
+                    "SELECT norm FROM pool_questions WHERE key = ?", (key,)
+                )
+            ]
+            added = 0
+            now = time.time()
+            for q in questions:
+                if not isinstance(q, dict):
+                    continue
+                text = str(q.get("question") or "").strip()
+                norm = _norm(text)
+                if not norm:
+                    continue
+                words = set(norm.split())
+                if any(_similar(words, other) for other in existing):
+                    continue
+                self._conn.execute(
+                    "INSERT OR IGNORE INTO pool_questions (key, type, question, norm, created_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, str(q.get("type") or "general"), text, norm, now),
+                )
+                existing.append(words)
+                added += 1
+            self._conn.commit()
+        return added
+
+    def needs_refill(self, limit: int = 20) -> List[Tuple[str, str, str, Optional[str]]]:
+        """
+        Востребованные пулы ниже нижнего порога, самые популярные первыми.
+        Разовые (чаще всего свободный текст в фокусе) не пополняются.
+        """
+        since = time.time() - settings.QUESTION_POOL_IDLE_TTL
+        with self._lock:
+            return self._conn.execute(
+                "SELECT p.key, p.role, p.level, p.focus FROM question_pools p "
+                "LEFT JOIN pool_questions q ON q.key = p.key "
+                "WHERE p.last_requested > ? AND p.requested >= ? "
+                "GROUP BY p.key HAVING COUNT(q.id) < ? "
+                "ORDER BY p.requested DESC LIMIT ?",
+                (since, settings.QUESTION_POOL_MIN_REQUESTS, settings.QUESTION_POOL_LOW_WATER, limit),
+            ).fetchall()
+
+    def stats(self) -> dict:
+        with self._lock:
+            pools, questions = self._conn.execute(
+                "SELECT COUNT(DISTINCT key), COUNT(*) FROM pool_questions"
+            ).fetchone()
+        return {"pools": pools, "questions": questions}
+
+    # -----------------------------
+    # CROSS-WORKER LEASE
+    # -----------------------------
+
+    def try_lease(self, name: str, owner: str, ttl: float) -> bool:
+        """Фоновое пополнение выполняет только воркер, держащий аренду."""
+        now = time.time()
+        key = f"lease:{name}"
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+                if row:
+                    holder, expires = json.loads(row[0])
+                    if holder != owner and expires > now:
+                        self._conn.execute("ROLLBACK")
+                        return False
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                    (key, json.dumps([owner, now + ttl])),
+                )
+                self._conn.execute("COMMIT")
+                return True
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+
+_pool: Optional[QuestionPool] = None
+
+
+def get_question_pool() -> QuestionPool:
+    global _pool
+    if _pool is None:
+        _pool = QuestionPool(settings.QUESTION_POOL_DB_PATH)
+    return _pool
+
+
+# -----------------------------
+# REFILL
+# -----------------------------
+
+async def refill_pool(key: str, role: str, level: str, focus: Optional[str]) -> int:
+    """Догенерирует вопросы до верхнего порога; останавливается, если LLM повторяется."""
+    pool = get_question_pool()
+    added_total = 0
+    for _ in range(settings.QUESTION_POOL_MAX_CALLS):
+        if await asyncio.to_thread(pool.size, key) >= settings.QUESTION_POOL_HIGH_WATER:
+            break
+        prompt = questions_prompt(role, level, focus, str(settings.QUESTION_POOL_BATCH))
+        # Высокая temperature и без кэша — нужны новые вопросы, а не те же
+        out = await run_llm(prompt, system=QUESTIONS_SYSTEM, temperature=0.9, cache=False)
+        if not isinstance(out, dict) or "error" in out:
+            print(f"!!! Question pool refill failed ({key}): {out}")
+            break
+        added = await asyncio.to_thread(pool.add, key, out.get("questions") or [])
+        added_total += added
+        if not added:
+            break
+    return added_total
+
+
+_refilling: Dict[str, asyncio.Task] = {}
+
+
+def _lease_ttl() -> float:
+    return settings.QUESTION_POOL_REFILL_INTERVAL * 1.5
+
+
+async def _refill_leased(key: str, role: str, level: str, focus: Optional[str]) -> None:
+    # Та же аренда, что у фонового цикла: пополняет один воркер на все
+    pool = get_question_pool()
+    if not await asyncio.to_thread(pool.try_lease, "question_refill", _OWNER, _lease_ttl()):
+        return
+    await refill_pool(key, role, level, focus)
+
+
+def schedule_refill(key: str, role: str, level: str, focus: Optional[str]) -> None:
+    """Пополнение в фоне текущего воркера, не более одного на пул."""
+    if key in _refilling:
+        return
+    task = asyncio.create_task(_refill_leased(key, role, level, focus))
+    _refilling[key] = task
+    task.add_done_callback(lambda _: _refilling.pop(key, None))
+
+
+async def sample_questions(role: str, level: str, focus: Optional[str]) -> Optional[List[dict]]:
+    """
+    Вопросы из пула за один запрос к SQLite; None — пул ещё мал (неизвестная
+    роль), нужна живая генерация. Пул ниже порога пополняется в фоне, но
+    только если его запрашивают повторно: разовые сочетания не стоят
+    QUESTION_POOL_MAX_CALLS вызовов LLM.
+    """
+    key = pool_key(role, level, focus)
+    pool = get_question_pool()
+    requested = await asyncio.to_thread(pool.touch, key, role, level, focus)
+    questions, size = await asyncio.to_thread(pool.sample, key, settings.QUESTION_POOL_SAMPLE)
+    if size < settings.QUESTION_POOL_LOW_WATER and requested >= settings.QUESTION_POOL_MIN_REQUESTS:
+        schedule_refill(key, role, level, focus)
+    return questions
+
+
+async def seed_questions(role: str, level: str, focus: Optional[str], questions: List[dict]) -> None:
+    """Вопросы живой генерации тоже идут в пул."""
+    await asyncio.to_thread(get_question_pool().add, pool_key(role, level, focus), questions)
+
+
+async def _refill_loop():
+    pool = get_question_pool()
+    interval = settings.QUESTION_POOL_REFILL_INTERVAL
+    while True:
+        try:
+            if await asyncio.to_thread(pool.try_lease, "question_refill", _OWNER, _lease_ttl()):
+                for key, role, level, focus in await asyncio.to_thread(pool.needs_refill):
+                    # Проход может быть дольше TTL аренды — продлеваем перед каждым
+                    # пулом; если её уже перехватил другой воркер, остаток пропускаем
+                    if not await asyncio.to_thread(pool.try_lease, "question_refill", _OWNER, _lease_ttl()):
+                        break
+                    added = await refill_pool(key, role, level, focus)
+                    if added:
+                        print(f"question pool refilled: {key} +{added}")
+        except Exception as e:
+            print(f"question pool refill loop error: {e}")
+        await asyncio.sleep(interval)
+
+
+def start_question_refill() -> Optional[asyncio.Task]:
+    """Запускает фоновое пополнение пулов, если пулы включены."""
+    if not settings.QUESTION_POOL_ENABLED:
+        return None
+    return asyncio.create_task(_refill_loop())
@@ -1,7 +1,9 @@
 import json
+from app.core.config import settings
 from app.services.openai_client import run_llm
+from app.services.prompt_budget import truncate_to_tokens
 
-def review_resume(resume_text: str, target_role: str | None = None) -> dict:
+async def review_resume(resume_text: str, target_role: str | None = None) -> dict:
     role_line = f"Target role: {target_role}" if target_role else "Target role: not specified"
 
     system = (
@@ -25,14 +27,14 @@ Be specific and actionable. Focus on measurable improvements.
 Return ONLY valid JSON with EXACT keys: score, strengths, issues, improved_bullets, keywords, summary.
 
 Resume:
-{resume_text}
+{truncate_to_tokens(resume_text, settings.RESUME_TOKEN_BUDGET)}
 """.strip()
 
-    raw = run_llm(prompt, system=system, temperature=0.2)
+    raw = await run_llm(prompt, system=system, temperature=0.2)
 
     # parse JSON
     try:
-        data = json.loads(raw)
+        data = raw if isinstance(raw, dict) and "error" not in raw else json.loads(raw)
     except Exception:
         # fallback if model didn't return valid JSON
         data = {
@@ -41,7 +43,7 @@ Resume:
             "issues": ["Model response was not valid JSON"],
             "improved_bullets": [],
             "keywords": [],
-            "summary": raw[:600],
+            "summary": str(raw)[:600],
         }
 
     # normalize
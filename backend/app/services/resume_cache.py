@@ -0,0 +1,69 @@
+import hashlib
+import json
+import os
+from typing import Optional
+
+from app.core.config import settings
+from app.services.llm_cache import LLMCache
+from app.utils.cache import MISSING
+from app.utils.file_parse import PARSER_VERSION, extract_text_async
+
+# Два уровня по содержимому:
+# - sha256 байтов файла (+ расширение, параметры и версия парсера) -> текст;
+# - sha256 текста + target_role + версия промпта -> нормализованный анализ.
+# Повторная загрузка того же файла не разбирает PDF и не ходит в LLM.
+
+resume_text_cache = LLMCache(
+    max_items=settings.RESUME_CACHE_MAX_ITEMS,
+    ttl=settings.RESUME_CACHE_TTL,
+    db_path=settings.RESUME_CACHE_DB_PATH,
+    table="resume_text",
+    max_rows=settings.RESUME_CACHE_MAX_ROWS,
+)
+
+resume_analysis_cache = LLMCache(
+    max_items=settings.RESUME_CACHE_MAX_ITEMS,
+    ttl=settings.RESUME_CACHE_TTL,
+    db_path=settings.RESUME_CACHE_DB_PATH,
+    table="resume_analysis",
+    max_rows=settings.RESUME_CACHE_MAX_ROWS,
+)
+
+
+def _sha256(*parts) -> str:
+    raw = json.dumps(parts, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def file_key(filename: str, data: bytes, max_chars: Optional[int], max_pages: Optional[int]) -> str:
+    # Ранняя остановка, выбор парсера по расширению и его версия меняют результат
+    ext = os.path.splitext(filename or "")[1].lower()
+    return _sha256(hashlib.sha256(data).hexdigest(), ext, max_chars, max_pages, PARSER_VERSION)
+
+
+def analysis_key(text: str, target_role: Optional[str], prompt_version: int) -> str:
+    role = (target_role or "").strip().lower()
+    return _sha256(hashlib.sha256(text.encode("utf-8")).hexdigest(), role, prompt_version)
+
+
+async def extract_resume_text(filename: str, data: bytes) -> str:
+    """extract_text с ранней остановкой и кэшем по sha256 файла."""
+    key = file_key(filename, data, settings.RESUME_MAX_CHARS, settings.RESUME_MAX_PAGES)
+    if settings.RESUME_CACHE_ENABLED:
+        cached = await resume_text_cache.get(key)
+        if cached is not MISSING:
+            return cached
+
+    text = await extract_text_async(
+        filename, data, max_chars=settings.RESUME_MAX_CHARS, max_pages=settings.RESUME_MAX_PAGES
+    )
+    if settings.RESUME_CACHE_ENABLED:
+        await resume_text_cache.set(key, text)
+    return text
+
+
+def resume_cache_stats() -> dict:
+    return {
+        "text": resume_text_cache.stats(),
+        "analysis": resume_analysis_cache.stats(),
+    }
@@ -0,0 +1,141 @@
+import asyncio
+import json
+import re
+from typing import List, Optional
+
+from app.core.config import settings
+from app.services.llm_limiter import LLMOverloaded
+from app.services.openai_client import run_llm, llm_rate_limited
+from app.services.prompt_budget import count_tokens, truncate_to_tokens
+
+# Длинное резюме не режем, а разбиваем: каждый кусок (map) параллельно
+# превращается в короткую выжимку, затем один вызов (reduce) по выжимкам
+# даёт итоговую оценку. Задержка ≈ два коротких вызова, а не один огромный.
+
+MAP_SYSTEM = (
+    "Ты карьерный ассистент. Извлекаешь факты из фрагмента резюме. "
+    "Верни СТРОГО валидный JSON. Никакого лишнего текста."
+)
+
+_HEADING = re.compile(
+    r"^\s*(опыт|образование|навыки|проекты|о себе|курсы|сертификат|языки|достижения|"
+    r"контакты|стажировк|experience|education|skills|projects|summary|about|"
+    r"certifications|languages|achievements|work history|internships?)\b",
+    re.IGNORECASE,
+)
+
+
+def needs_map_reduce(text: str) -> bool:
+    return count_tokens(text) > settings.RESUME_TOKEN_BUDGET
+
+
+def _is_heading(line: str) -> bool:
+    line = line.strip()
+    if not line or len(line) > 40:
+        return False
+    return bool(_HEADING.match(line)) or (line.isupper() and any(ch.isalpha() for ch in line))
+
+
+def split_sections(text: str) -> List[str]:
+    """Делит резюме по заголовкам разделов (Опыт, Образование, SKILLS ...)."""
+    sections: List[List[str]] = [[]]
+    for line in text.splitlines():
+        if _is_heading(line) and any(l.strip() for l in sections[-1]):
+            sections.append([])
+        sections[-1].append(line)
+    return ["\n".join(s).strip() for s in sections if any(l.strip() for l in s)]
+
+
+def _split_long(section: str, max_tokens: int) -> List[str]:
+    """Раздел больше бюджета — режем по строкам, а слишком длинную строку — по токенам."""
+    pieces = []
+    for line in section.splitlines():
+        while count_tokens(line) > max_tokens:
+            head = truncate_to_tokens(line, max_tokens)
+            if not head:
+                break
+            pieces.append(head)
+            line = line[len(head):]
+        if line.strip():
+            pieces.append(line)
+    return pieces
+
+
+def chunk_resume(text: str, max_tokens: int) -> List[str]:
+    """Жадно склеивает соседние разделы в куски не больше max_tokens."""
+    chunks: List[str] = []
+    current: List[str] = []
+    used = 0
+    for section in split_sections(text):
+        parts = [section] if count_tokens(section) <= max_tokens else _split_long(section, max_tokens)
+        for part in parts:
+            cost = count_tokens(part) + 1
+            if current and used + cost > max_tokens:
+                chunks.append("\n".join(current))
+                current, used = [], 0
+            current.append(part)
+            used += cost
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+def _map_prompt(chunk: str, index: int, total: int, target_role: Optional[str]) -> str:
+    return f"""
+        Фрагмент {index + 1} из {total} резюме кандидата на роль: {target_role or 'не указана'}.
+
+        Верни JSON строго с этими ключами (коротко, без воды):
+        "skills": список навыков и технологий
+        "experience": список строк "роль — компания — срок — главный результат"
+        "achievements": список измеримых достижений
+        "issues": список проблем этого фрагмента (размытые формулировки, нет цифр, ошибки)
+
+        Фрагмент:
+        \"\"\"{chunk}\"\"\"
+        """
+
+
+async def map_chunks(text: str, target_role: Optional[str]) -> List[dict]:
+    """Параллельно извлекает выжимки из всех кусков резюме."""
+    chunks = chunk_resume(text, settings.RESUME_CHUNK_TOKENS)
+    if len(chunks) > settings.RESUME_MAX_CHUNKS:
+        print(f"!!! Резюме слишком длинное: {len(chunks)} кусков, берём {settings.RESUME_MAX_CHUNKS}")
+        chunks = chunks[:settings.RESUME_MAX_CHUNKS]
+
+    results = await asyncio.gather(*(
+        run_llm(_map_prompt(chunk, i, len(chunks), target_role), system=MAP_SYSTEM, temperature=0)
+        for i, chunk in enumerate(chunks)
+    ))
+
+    notes = []
+    for result in results:
+        retry_after = llm_rate_limited(result)
+        if retry_after is not None:
+            raise LLMOverloaded("LLM is busy", retry_after=retry_after)
+        if isinstance(result, dict) and "error" not in result:
+            notes.append({k: result.get(k) or [] for k in ("skills", "experience", "achievements", "issues")})
+
+    if not notes:
+        raise ValueError("LLM Error: no chunk of the resume could be analyzed")
+    return notes
+
+
+def reduce_prompt(text: str, notes: List[dict], target_role: Optional[str]) -> str:
+    # Начало резюме дословно — по выжимкам не оценить оформление и грамотность
+    head = truncate_to_tokens(text, settings.RESUME_REDUCE_HEAD_TOKENS)
+    return f"""
+        Проанализируй резюме на роль: {target_role or 'не указана'}.
+        Резюме длинное, поэтому ниже выжимки по его частям (JSON) и дословное начало.
+
+        Верни JSON строго с этими ключами:
+        "score": число от 0 до 100
+        "strengths": список строк (сильные стороны)
+        "weaknesses": список строк (что плохо)
+        "recommendations": список строк (конкретные советы по улучшению)
+
+        Выжимки по частям:
+        {json.dumps(notes, ensure_ascii=False)}
+
+        Начало резюме:
+        \"\"\"{head}\"\"\"
+        """
@@ -0,0 +1,200 @@
+import asyncio
+import json
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+from app.utils.sqlite import connect
+
+
+class SessionStore(ABC):
+    """Хранилище сессий интервью. Сессия — JSON-сериализуемый dict."""
+
+    @abstractmethod
+    async def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    async def set(self, session_id: str, data: Dict[str, Any]) -> None:
+        ...
+
+    @abstractmethod
+    async def delete(self, session_id: str) -> None:
+        ...
+
+    @abstractmethod
+    def stats(self) -> dict:
+        ...
+
+
+class MemorySessionStore(SessionStore):
+    """
+    In-memory LRU с вытеснением по простою (idle TTL), по числу сессий
+    и по приблизительному объёму (длина сериализованного JSON).
+    Подходит для одного воркера.
+    """
+
+    def __init__(self, max_sessions: int, idle_ttl: float, max_bytes: int):
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.max_bytes = max_bytes
+        # session_id -> (last_access, size, json)
+        self._data: "OrderedDict[str, tuple[float, int, str]]" = OrderedDict()
+        self._bytes = 0
+        self.evictions = {"idle": 0, "lru": 0, "memory": 0}
+
+    async def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        self._expire()
+        item = self._data.get(session_id)
+        if item is None:
+            return None
+        _, size, raw = item
+        self._data[session_id] = (time.monotonic(), size, raw)
+        self._data.move_to_end(session_id)
+        return json.loads(raw)
+
+    async def set(self, session_id: str, data: Dict[str, Any]) -> None:
+        raw = json.dumps(data, ensure_ascii=False)
+        self._drop(session_id)
+        self._data[session_id] = (time.monotonic(), len(raw), raw)
+        self._bytes += len(raw)
+        self._expire()
+
+        while len(self._data) > self.max_sessions:
+            self._drop(next(iter(self._data)))
+            self.evictions["lru"] += 1
+        while self._bytes > self.max_bytes and len(self._data) > 1:
+            self._drop(next(iter(self._data)))
+            self.evictions["memory"] += 1
+
+    async def delete(self, session_id: str) -> None:
+        self._drop(session_id)
+
+    def _drop(self, session_id: str) -> None:
+        item = self._data.pop(session_id, None)
+        if item is not None:
+            self._bytes -= item[1]
+
+    def _expire(self) -> None:
+        # Самые давно использованные — в начале OrderedDict
+        deadline = time.monotonic() - self.idle_ttl
+        while self._data:
+            session_id, (last_access, _, _) = next(iter(self._data.items()))
+            if last_access >= deadline:
+                break
+            self._drop(session_id)
+            self.evictions["idle"] += 1
+
+    def stats(self) -> dict:
+        return {
+            "backend": "memory",
+            "live_sessions": len(self._data),
+            "bytes": self._bytes,
+            "evictions": dict(self.evictions),
+        }
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    Сессии в SQLite (WAL): одну базу видят все воркеры uvicorn,
+    поэтому /api/interview/turn работает независимо от балансировки.
+    """
+
+    def __init__(self, path: str, max_sessions: int, idle_ttl: float):
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self._lock = threading.Lock()
+        self._conn = connect(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "id TEXT PRIMARY KEY, data TEXT NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS sessions_last_access ON sessions (last_access)"
+        )
+        self._conn.commit()
+        self.evictions = {"idle": 0, "lru": 0}
+
+    def _get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data, last_access FROM sessions WHERE id = ?", (session_id,)
+            ).fetchone()
+            if row is None or row[1] < now - self.idle_ttl:
+                return None
+            self._conn.execute(
+                "UPDATE sessions SET last_access = ? WHERE id = ?", (now, session_id)
+            )
+            self._conn.commit()
+        return json.loads(row[0])
+
+    def _set(self, session_id: str, data: Dict[str, Any]) -> None:
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sessions (id, data, last_access) VALUES (?, ?, ?)",
+                (session_id, json.dumps(data, ensure_ascii=False), now),
+            )
+            cur = self._conn.execute(
+                "DELETE FROM sessions WHERE last_access < ?", (now - self.idle_ttl,)
+            )
+            self.evictions["idle"] += cur.rowcount
+            cur = self._conn.execute(
+                "DELETE FROM sessions WHERE id IN ("
+                "SELECT id FROM sessions ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (self.max_sessions,),
+            )
+            self.evictions["lru"] += cur.rowcount
+            self._conn.commit()
+
+    def _delete(self, session_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+            self._conn.commit()
+
+    async def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self._get, session_id)
+
+    async def set(self, session_id: str, data: Dict[str, Any]) -> None:
+        await asyncio.to_thread(self._set, session_id, data)
+
+    async def delete(self, session_id: str) -> None:
+        await asyncio.to_thread(self._delete, session_id)
+
+    def stats(self) -> dict:
+        with self._lock:
+            live = self._conn.execute(
+                "SELECT COUNT(*) FROM sessions WHERE last_access >= ?",
+                (time.time() - self.idle_ttl,),
+            ).fetchone()[0]
+        # evictions — счётчик этого воркера, live_sessions — по всей базе
+        return {
+            "backend": "sqlite",
+            "live_sessions": live,
+            "evictions": dict(self.evictions),
+        }
+
+
+_store: Optional[SessionStore] = None
+
+
+def get_session_store() -> SessionStore:
+    global _store
+    if _store is None:
+        if settings.SESSION_BACKEND == "sqlite":
+            _store = SQLiteSessionStore(
+                settings.SESSION_DB_PATH,
+                max_sessions=settings.SESSION_MAX,
+                idle_ttl=settings.SESSION_IDLE_TTL,
+            )
+        else:
+            _store = MemorySessionStore(
+                max_sessions=settings.SESSION_MAX,
+                idle_ttl=settings.SESSION_IDLE_TTL,
+                max_bytes=settings.SESSION_MAX_BYTES,
+            )
+    return _store
@@ -0,0 +1,249 @@
+import heapq
+import re
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from app.services.skill_taxonomy import skill_taxonomy
+from app.services.vacancy_index import tokenize
+
+# Слова-"шум" вокруг названия навыка: "Базовый Python", "знание SQL", "опыт с Git"
+_FILLER = {
+    "базовый", "базовое", "базовые", "базовая", "знание", "знания", "опыт", "с",
+    "уверенное", "понимание", "владение", "умение", "навыки", "основы",
+    "basic", "knowledge", "of", "experience", "with", "strong", "good",
+}
+_VERSION_RE = re.compile(r"\b\d+(\.\d+)*\+?")
+
+REQUIREMENT_WEIGHT = 2
+SKILL_WEIGHT = 1
+ROLE_SHARE = 0.2
+# Требование, где словарь не нашёл навыка, длиннее этого — фраза, а не навык
+MAX_UNKNOWN_WORDS = 3
+
+
+def normalize_skill(value: str) -> str:
+    """'Python 3.10+' -> 'python', 'Базовый Python' -> 'python', 'REST API' -> 'rest api'."""
+    text = _VERSION_RE.sub(" ", (value or "").lower())
+    words = [w for w in re.split(r"[\s,;:()]+", text) if w and w not in _FILLER]
+    return " ".join(words)
+
+
+def _field(obj: Any, key: str):
+    return obj.get(key) if isinstance(obj, dict) else getattr(obj, key, None)
+
+
+class _Vocab:
+    """Отображение строка -> номер бита, общий для всех вакансий."""
+
+    def __init__(self, seed: List[str] = ()):
+        # Первые биты — канонические навыки словаря (бит i == id навыка i)
+        self.ids: Dict[str, int] = {key: i for i, key in enumerate(seed)}
+
+    def bit(self, value: str) -> int:
+        idx = self.ids.get(value)
+        if idx is None:
+            idx = self.ids[value] = len(self.ids)
+        return 1 << idx
+
+    def mask(self, values) -> int:
+        m = 0
+        for v in values:
+            m |= self.bit(v)
+        return m
+
+    def lookup(self, values) -> int:
+        """Маска только по уже известным значениям (словарь не растёт)."""
+        m = 0
+        for v in values:
+            idx = self.ids.get(v)
+            if idx is not None:
+                m |= 1 << idx
+        return m
+
+
+class _Row:
+    __slots__ = ("item", "fingerprint", "req_mask", "skill_mask", "title_mask",
+                 "req_names", "skill_names", "req_weight")
+
+    def __init__(self, item, fingerprint, req_mask, skill_mask, title_mask, req_names, skill_names):
+        self.item = item
+        self.fingerprint = fingerprint
+        self.req_mask = req_mask
+        self.skill_mask = skill_mask
+        self.title_mask = title_mask
+        self.req_names = req_names
+        self.skill_names = skill_names
+        self.req_weight = (
+            REQUIREMENT_WEIGHT * req_mask.bit_count() + SKILL_WEIGHT * skill_mask.bit_count()
+        )
+
+
+class SkillScorer:
+    """
+    Детерминированный скоринг без LLM. Навыки каждой вакансии заранее
+    сведены в битовые маски, поэтому оценка всех вакансий — это пара
+    AND + popcount на вакансию.
+    """
+
+    def __init__(self):
+        self._skills = _Vocab(skill_taxonomy.keys)
+        self._tokens = _Vocab()
+        self._rows: Dict[str, _Row] = {}
+        self._order: List[str] = []
+
+    def sync(self, items) -> None:
+        """Инкрементально: пересчитываются только новые и изменённые вакансии."""
+        order = []
+        rows: Dict[str, _Row] = {}
+        for item in items:
+            doc_id = str(_field(item, "id"))
+            fp = hash((
+                _field(item, "title"),
+                tuple(_field(item, "requirements") or ()),
+                tuple(_field(item, "skills") or ()),
+                _field(item, "description"),
+                tuple(_field(item, "skill_ids") or ()),
+            ))
+            row = self._rows.get(doc_id)
+            if row is None or row.fingerprint != fp:
+                row = self._build_row(item, fp)
+            else:
+                row.item = item
+            rows[doc_id] = row
+            order.append(doc_id)
+
+        self._rows = rows
+        self._order = order
+
+    def _build_row(self, item, fingerprint) -> _Row:
+        req_names = _named(_field(item, "requirements"))
+        skill_names = {
+            k: v for k, v in _named(_field(item, "skills")).items() if k not in req_names
+        }
+        # Навыки из описания: посчитаны при ингестии (skill_ids) или сканируем сейчас
+        described = _field(item, "skill_ids")
+        if described is None:
+            described = skill_taxonomy.extract(_field(item, "description") or "")
+        for skill_id in sorted(described):
+            key = skill_taxonomy.keys[skill_id]
+            if key not in req_names:
+                skill_names.setdefault(key, skill_taxonomy.names[skill_id])
+        return _Row(
+            item,
+            fingerprint,
+            self._skills.mask(req_names),
+            self._skills.mask(skill_names),
+            self._tokens.mask(tokenize(_field(item, "title") or "")),
+            req_names,
+            skill_names,
+        )
+
+    def candidate_mask(self, user_skills: List[str], resume_text: Optional[str]) -> int:
+        """
+        Навыки кандидата: явные + найденные в резюме. Словарные навыки ищет
+        автомат за один проход; прочие строки вакансий — по n-граммам слов.
+        """
+        mask = self._skills.lookup(_named(user_skills or []))
+
+        if resume_text:
+            for skill_id in skill_taxonomy.extract(resume_text):
+                mask |= 1 << skill_id
+            mask |= self._skills.lookup(_ngrams(normalize_skill(resume_text).split(), 3))
+
+        return mask
+
+    def rank(
+        self,
+        target_role: str,
+        user_skills: List[str],
+        resume_text: Optional[str],
+        top_k: int,
+        allowed: Optional[Set[str]] = None,
+    ) -> List[dict]:
+        """allowed — id вакансий, прошедших фасетные фильтры (None — все)."""
+        cand = self.candidate_mask(user_skills, resume_text)
+        role = self._tokens.lookup(tokenize(target_role))
+        role_size = role.bit_count() or 1
+
+        scored: List[Tuple[float, int, _Row]] = []
+        for pos, doc_id in enumerate(self._order):
+            if allowed is not None and doc_id not in allowed:
+                continue
+            row = self._rows[doc_id]
+            if row.req_weight:
+                overlap = (
+                    REQUIREMENT_WEIGHT * (row.req_mask & cand).bit_count()
+                    + SKILL_WEIGHT * (row.skill_mask & cand).bit_count()
+                ) / row.req_weight
+            else:
+                overlap = 0.0
+            role_match = (row.title_mask & role).bit_count() / role_size
+            score = (1 - ROLE_SHARE) * overlap + ROLE_SHARE * role_match
+            scored.append((score, -pos, row))
+
+        best = heapq.nlargest(top_k, scored, key=lambda x: (x[0], x[1]))
+        return [self._result(row, score, cand, role) for score, _, row in best]
+
+    def _result(self, row: _Row, score: float, cand: int, role: int) -> dict:
+        matched, missing = [], []
+        for names in (row.req_names, row.skill_names):
+            for norm, display in names.items():
+                bit = 1 << self._skills.ids[norm]
+                (matched if cand & bit else missing).append(display)
+
+        why = []
+        if matched:
+            why.append(f"Совпадают навыки: {', '.join(matched[:5])}")
+        if row.title_mask & role:
+            why.append(f"Название вакансии соответствует цели: {_field(row.item, 'title')}")
+        if not why:
+            why.append("Минимальное пересечение по навыкам")
+
+        return {
+            "id": str(_field(row.item, "id")),
+            "title": _field(row.item, "title") or "",
+            "company": _field(row.item, "company") or "",
+            "url": _field(row.item, "url"),
+            "match_score": int(round(score * 100)),
+            "why_match": why,
+            "missing_skills": missing[:10],
+        }
+
+
+def _ngrams(words: List[str], n: int):
+    for size in range(1, n + 1):
+        for i in range(len(words) - size + 1):
+            yield " ".join(words[i:i + size])
+
+
+@lru_cache(maxsize=65536)
+def _resolve(value: str) -> Tuple[Tuple[str, str], ...]:
+    """
+    Строка требования -> ((ключ, имя для показа), ...).
+    "Знание Python и SQL" -> python, sql; неизвестный короткий навык
+    остаётся нормализованной строкой, длинная фраза без навыков отбрасывается.
+    """
+    ids = skill_taxonomy.extract(value)
+    if ids:
+        return tuple((skill_taxonomy.keys[i], skill_taxonomy.names[i]) for i in sorted(ids))
+    norm = normalize_skill(value)
+    if norm and len(norm.split()) <= MAX_UNKNOWN_WORDS:
+        return ((norm, value.strip()),)
+    return ()
+
+
+def _named(values) -> Dict[str, str]:
+    """ключ навыка -> имя для показа пользователю."""
+    out: Dict[str, str] = {}
+    for v in values or []:
+        for key, display in _resolve(str(v)):
+            out.setdefault(key, display)
+    return out
+
+
+def skill_keys(values) -> Set[str]:
+    """Ключи навыков (словарные или нормализованные строки) — как их видит скорер."""
+    return set(_named(values))
+
+
+skill_scorer = SkillScorer()
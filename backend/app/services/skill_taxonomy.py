@@ -0,0 +1,229 @@
+import hashlib
+import json
+from collections import deque
+from typing import Dict, FrozenSet, Iterable, List, Tuple
+
+# Словарь навыков: каноническое имя -> синонимы (русские и английские варианты).
+# id навыка — позиция в списке; при любом изменении списка меняется
+# TAXONOMY_VERSION, и закэшированные у вакансий id пересчитываются.
+# "*" в конце синонима — совпадение по основе слова ("английск*" -> "английского").
+# Синонимы — только однозначные: голые "node", "shell", "dart" — обычные слова.
+# Каноническое имя в тексте не ищется (голое "go" — "ready to go"), только
+# по синонимам; если имя однозначно, оно должно быть и среди синонимов.
+SKILLS: List[Tuple[str, List[str]]] = [
+    # Языки программирования
+    ("Python", ["python", "питон", "пайтон", "python3"]),
+    ("Java", ["java", "джава"]),
+    ("JavaScript", ["javascript", "js", "java script", "ecmascript", "es6"]),
+    ("TypeScript", ["typescript"]),
+    ("Go", ["golang", "go lang", "язык go"]),
+    ("C++", ["c++", "с++", "cpp"]),
+    ("C#", ["c#", "с#", "csharp"]),
+    (".NET", [".net", "dotnet", "asp.net"]),
+    ("PHP", ["php"]),
+    ("Ruby", ["ruby", "ruby on rails", "rails"]),
+    ("Kotlin", ["kotlin", "котлин"]),
+    ("Swift", ["swift"]),
+    ("Rust", ["rust"]),
+    ("Scala", ["scala"]),
+    ("1С", ["1с", "1c", "1с:предприятие", "1c:enterprise"]),
+    # Базы данных
+    ("SQL", ["sql", "язык sql", "t-sql", "pl/sql"]),
+    ("PostgreSQL", ["postgresql", "postgres", "постгрес", "postgre"]),
+    ("MySQL", ["mysql"]),
+    ("MS SQL Server", ["ms sql", "mssql", "sql server"]),
+    ("Oracle", ["oracle"]),
+    ("SQLite", ["sqlite"]),
+    ("MongoDB", ["mongodb", "mongo"]),
+    ("Redis", ["redis"]),
+    ("ClickHouse", ["clickhouse"]),
+    ("Elasticsearch", ["elasticsearch", "elastic search"]),
+    # Веб
+    ("HTML", ["html", "html5"]),
+    ("CSS", ["css", "css3", "scss", "sass"]),
+    ("React", ["react", "react.js", "reactjs"]),
+    ("Vue.js", ["vue", "vue.js", "vuejs"]),
+    ("Angular", ["angular"]),
+    ("Node.js", ["node.js", "nodejs", "node js"]),
+    ("Django", ["django", "джанго"]),
+    ("Flask", ["flask"]),
+    ("FastAPI", ["fastapi", "fast api"]),
+    ("Spring", ["spring", "spring boot", "springboot"]),
+    ("Laravel", ["laravel"]),
+    ("REST API", ["rest api", "restful", "rest-api", "rest апи"]),
+    ("GraphQL", ["graphql"]),
+    # Инфраструктура
+    ("Git", ["git", "гит", "github", "gitlab"]),
+    ("Docker", ["docker", "докер"]),
+    ("Kubernetes", ["kubernetes", "k8s", "кубернетес"]),
+    ("Linux", ["linux", "линукс", "unix"]),
+    ("Bash", ["bash", "shell-скрипт*", "shell script*", "bash/shell"]),
+    ("CI/CD", ["ci/cd", "ci cd", "gitlab ci", "github actions"]),
+    ("Jenkins", ["jenkins"]),
+    ("Nginx", ["nginx"]),
+    ("Ansible", ["ansible"]),
+    ("Terraform", ["terraform"]),
+    ("AWS", ["aws", "amazon web services"]),
+    ("Azure", ["azure"]),
+    ("Google Cloud", ["gcp", "google cloud"]),
+    ("Kafka", ["kafka", "apache kafka"]),
+    ("RabbitMQ", ["rabbitmq", "rabbit mq"]),
+    ("Microservices", ["микросервис*", "microservice*"]),
+    # Данные и ML
+    ("Machine Learning", ["machine learning", "ml", "машинное обучение", "машинного обучения", "машинному обучению"]),
+    ("Deep Learning", ["deep learning", "глубокое обучение", "глубокого обучения", "нейронн* сет*", "neural network*"]),
+    ("NLP", ["nlp", "natural language processing", "обработка естественного языка"]),
+    ("Computer Vision", ["computer vision", "компьютерное зрение", "компьютерного зрения", "opencv"]),
+    ("Pandas", ["pandas"]),
+    ("NumPy", ["numpy"]),
+    ("scikit-learn", ["scikit-learn", "sklearn", "scikit learn"]),
+    ("PyTorch", ["pytorch", "torch"]),
+    ("TensorFlow", ["tensorflow", "keras"]),
+    ("Spark", ["spark", "apache spark", "pyspark"]),
+    ("Hadoop", ["hadoop"]),
+    ("Airflow", ["airflow", "apache airflow"]),
+    ("ETL", ["etl", "elt"]),
+    ("Data Analysis", ["анализ данных", "анализа данных", "data analysis", "аналитика данных", "data analytics"]),
+    ("Statistics", ["статистик*", "statistics", "statistical"]),
+    ("A/B Testing", ["a/b тест*", "ab тест*", "a/b-тест*", "a/b testing", "ab testing", "а/б тест*"]),
+    ("Excel", ["excel", "эксель", "ms excel", "google sheets", "гугл таблиц*"]),
+    ("Power BI", ["power bi", "powerbi"]),
+    ("Tableau", ["tableau"]),
+    # Мобильная разработка
+    ("Android", ["android", "андроид"]),
+    ("iOS", ["ios"]),
+    ("Flutter", ["flutter"]),
+    ("React Native", ["react native"]),
+    # Тестирование
+    ("Testing", ["тестировани*", "testing", "qa", "тестировщик*"]),
+    ("Test Automation", ["автотест*", "автоматизированн* тестировани*", "test automation", "pytest", "selenium"]),
+    ("Postman", ["postman"]),
+    # Дизайн и процессы
+    ("Figma", ["figma", "фигма"]),
+    ("Photoshop", ["photoshop", "фотошоп"]),
+    ("UX/UI", ["ux/ui", "ui/ux", "ux", "ui", "юзабилити"]),
+    ("Jira", ["jira", "джира"]),
+    ("Confluence", ["confluence"]),
+    ("Agile", ["agile", "аджайл", "scrum", "скрам", "kanban", "канбан"]),
+    # Фундамент
+    ("OOP", ["ооп", "oop", "объектно-ориентированн*", "object-oriented"]),
+    ("Algorithms", ["алгоритм*", "algorithm*", "структуры данных", "структур данных", "data structures"]),
+    ("Networking", ["tcp/ip", "компьютерные сети", "компьютерных сетей", "networking"]),
+    ("Information Security", ["информационная безопасность", "информационной безопасности", "кибербезопасност*", "cybersecurity", "information security"]),
+    # Языки
+    ("English", ["английск*", "english"]),
+    ("Kazakh", ["казахск*", "kazakh"]),
+]
+
+# Версия правил сопоставления: меняется вместе с логикой extract(), не только SKILLS
+_MATCH_RULES = 2
+
+TAXONOMY_VERSION = hashlib.sha1(
+    json.dumps([_MATCH_RULES, SKILLS], ensure_ascii=False).encode("utf-8")
+).hexdigest()[:12]
+
+
+def _normalize(text: str) -> str:
+    """Регистр, ё->е и схлопывание пробелов — одинаково для шаблонов и текста."""
+    return " ".join(text.lower().replace("ё", "е").split())
+
+
+def _is_letter(ch: str) -> bool:
+    return ch.isalpha()
+
+
+class SkillTaxonomy:
+    """
+    Канонические навыки + автомат Ахо-Корасик по всем синонимам.
+    extract() находит все навыки за один линейный проход по тексту.
+
+    Границы слова: слева от совпадения не должно быть буквы/цифры,
+    справа — буквы (цифры допустимы: "Python3", "html5").
+    """
+
+    def __init__(self, skills: List[Tuple[str, List[str]]]):
+        self.names: List[str] = [name for name, _ in skills]
+        self.keys: List[str] = [_normalize(name) for name in self.names]
+        self._by_key: Dict[str, int] = {}
+
+        # Состояния автомата: переходы, fail-ссылки, выходы (id, длина, по основе)
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[int, int, bool]]] = [[]]
+
+        for skill_id, (name, synonyms) in enumerate(skills):
+            # Имя навыка — только для точного поиска (skill_id("Go")), не для текста
+            self._by_key.setdefault(_normalize(name), skill_id)
+            for pattern in synonyms:
+                prefix = pattern.endswith("*")
+                pattern = _normalize(pattern.rstrip("*"))
+                if pattern:
+                    self._add(pattern, skill_id, prefix)
+                    self._by_key.setdefault(pattern, skill_id)
+        self._build()
+
+    def _add(self, pattern: str, skill_id: int, prefix: bool) -> None:
+        state = 0
+        for ch in pattern:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append([])
+                self._goto[state][ch] = nxt
+            state = nxt
+        self._out[state].append((skill_id, len(pattern), prefix))
+
+    def _build(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                f = self._fail[state]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                target = self._goto[f].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def extract(self, text: str) -> FrozenSet[int]:
+        """id всех навыков, упомянутых в тексте."""
+        if not text:
+            return frozenset()
+        text = _normalize(text)
+        goto, fail, out = self._goto, self._fail, self._out
+        found = set()
+        state = 0
+        for end, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for skill_id, length, prefix in out[state]:
+                if skill_id in found:
+                    continue
+                start = end - length + 1
+                if start > 0 and text[start - 1].isalnum() and text[start].isalnum():
+                    continue
+                if (not prefix and end + 1 < len(text)
+                        and _is_letter(text[end + 1]) and text[end].isalnum()):
+                    continue
+                found.add(skill_id)
+        return frozenset(found)
+
+    def extract_all(self, texts: Iterable[str]) -> FrozenSet[int]:
+        found = set()
+        for text in texts:
+            found |= self.extract(text)
+        return frozenset(found)
+
+    def lookup(self, value: str) -> int:
+        """id навыка по точному имени/синониму, -1 если неизвестен."""
+        return self._by_key.get(_normalize(value), -1)
+
+
+skill_taxonomy = SkillTaxonomy(SKILLS)
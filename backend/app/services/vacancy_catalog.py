@@ -0,0 +1,111 @@
+import asyncio
+from typing import Any, Hashable, List, Optional
+
+from app.core.config import settings
+from app.services.match_cache import MatchCache, match_cache
+from app.services.skill_scoring import SkillScorer, skill_scorer
+from app.services.vacancy_dedup import VacancyDeduper, vacancy_deduper
+from app.services.vacancy_facets import FacetIndex, vacancy_facets
+from app.services.vacancy_index import VacancyIndex, vacancy_index
+
+
+class VacancyCatalog:
+    """
+    Набор вакансий для подбора и индексы по нему: дедупликация, фасеты,
+    ревизии кэша подбора, BM25 и скоринг навыков.
+
+    sync(key, jobs) ничего не делает, пока key не меняется; дедупликация
+    идёт в потоке, остальные индексы досинхронизируются лениво — при первом
+    обращении после смены набора.
+    """
+
+    def __init__(
+        self,
+        deduper: VacancyDeduper,
+        facets: FacetIndex,
+        scorer: SkillScorer,
+        index: VacancyIndex,
+        cache: MatchCache,
+    ):
+        self._deduper = deduper
+        self._facets = facets
+        self._scorer = scorer
+        self._index = index
+        self._cache = cache
+
+        self.jobs: List[Any] = []
+        self._key: Optional[Hashable] = None
+        # Какие индексы уже синхронизированы с jobs: имя -> результат sync()
+        self._fresh: dict = {}
+        self._lock = asyncio.Lock()
+
+    def _current(self, key: Optional[Hashable]) -> bool:
+        if key is None or self._key is None:
+            return False
+        if key == self._key:
+            return True
+        # Запрос со снимком старее уже загруженного не откатывает каталог назад
+        return key[0] == self._key[0] == "store" and key[1] < self._key[1]
+
+    async def sync(self, key: Optional[Hashable], jobs: List[Any]) -> None:
+        """key None — набор каждый раз новый (список из запроса)."""
+        if self._current(key):
+            return
+        async with self._lock:
+            if self._current(key):
+                return
+            jobs = list(jobs)
+            # Перепосты и пересечения источников не должны занимать места в выдаче.
+            # Дедупликатор трогает только sync, поэтому его можно вести в потоке
+            if settings.DEDUP_ENABLED:
+                jobs = await asyncio.to_thread(self._deduper.dedupe, jobs)
+            self.jobs = jobs
+            self._key = key
+            self._fresh = {}
+
+    def _synced(self, name: str, index):
+        if name not in self._fresh:
+            self._fresh[name] = index.sync(self.jobs)
+        return index
+
+    @property
+    def facets(self) -> FacetIndex:
+        return self._synced("facets", self._facets)
+
+    @property
+    def scorer(self) -> SkillScorer:
+        return self._synced("scorer", self._scorer)
+
+    @property
+    def index(self) -> VacancyIndex:
+        return self._synced("index", self._index)
+
+    @property
+    def cache(self) -> MatchCache:
+        return self._synced("cache", self._cache)
+
+    @property
+    def revision(self) -> int:
+        """Ревизия набора в кэше подбора (см. MatchCache.sync)."""
+        self._synced("cache", self._cache)
+        return self._fresh["cache"]
+
+
+# Индексы процесса — только для вакансий из хранилища (и моков), ключ —
+# version хранилища: запросы без изменений в наборе ничего не пересчитывают
+shared_catalog = VacancyCatalog(vacancy_deduper, vacancy_facets, skill_scorer, vacancy_index, match_cache)
+
+
+def local_catalog() -> VacancyCatalog:
+    """Одноразовый каталог для списка из запроса: общие индексы он не вытесняет."""
+    return VacancyCatalog(
+        VacancyDeduper(
+            num_perm=settings.DEDUP_NUM_PERM,
+            bands=settings.DEDUP_BANDS,
+            threshold=settings.DEDUP_THRESHOLD,
+        ),
+        FacetIndex(),
+        SkillScorer(),
+        VacancyIndex(),
+        MatchCache(max_items=1, ttl=settings.MATCH_CACHE_TTL),
+    )
@@ -0,0 +1,281 @@
+import hashlib
+import math
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from app.core.config import settings
+from app.services.vacancy_index import tokenize
+
+_SHINGLE = 3
+_OFFSET = 1 << 60
+
+
+def _field(obj: Any, key: str):
+    return obj.get(key) if isinstance(obj, dict) else getattr(obj, key, None)
+
+
+def _hash64(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def _shingles(item: Any) -> Set[str]:
+    """Словесные 3-граммы по названию, компании и описанию (со стеммингом tokenize)."""
+    text = " ".join(str(_field(item, k) or "") for k in ("title", "company", "description"))
+    tokens = tokenize(text)
+    if len(tokens) < _SHINGLE:
+        return set(tokens)
+    return {" ".join(tokens[i:i + _SHINGLE]) for i in range(len(tokens) - _SHINGLE + 1)}
+
+
+def _fingerprint(item: Any) -> int:
+    return hash((_field(item, "title"), _field(item, "company"), _field(item, "description")))
+
+
+class _Doc:
+    __slots__ = ("fingerprint", "signature", "title", "seq")
+
+    def __init__(self, fingerprint, signature, title, seq):
+        self.fingerprint = fingerprint
+        self.signature = signature
+        self.title = title
+        self.seq = seq
+
+
+class VacancyDeduper:
+    """
+    Поиск почти-дубликатов вакансий (перепосты, пересечение источников):
+    MinHash-сигнатура по шинглам + LSH-бандинг, чтобы кандидатов в дубли
+    искать по корзинам, а не попарно.
+
+    Инкрементально: новая вакансия сравнивается только с соседями по своим
+    корзинам и вливается в их кластеры; удаление пересобирает только свой
+    кластер. Каноническая вакансия кластера — самая ранняя из увиденных,
+    поэтому id в результатах подбора не "прыгает" при появлении перепостов.
+    """
+
+    def __init__(self, num_perm: int = 64, bands: int = 16, threshold: float = 0.8, title_min: float = 0.6):
+        self.bands = bands
+        self.rows = max(1, num_perm // bands)
+        self.num_perm = self.bands * self.rows
+        self.threshold = threshold
+        self.title_min = title_min
+
+        self._docs: Dict[str, _Doc] = {}
+        self._buckets: Dict[Tuple[int, Tuple[int, ...]], Set[str]] = defaultdict(set)
+        # Слово названия -> вакансии: отсев по названию до сравнения сигнатур
+        self._titles: Dict[str, Set[str]] = defaultdict(set)
+        self._seq = 0
+
+        # Кластеры: вакансия -> номер кластера, состав, каноническая вакансия
+        self._cluster: Dict[str, int] = {}
+        self._members: Dict[int, Set[str]] = {}
+        self._head: Dict[int, str] = {}
+        self._next_cluster = 0
+
+    # -----------------------------
+    # SYNC
+    # -----------------------------
+
+    def _signature(self, item: Any) -> Optional[Tuple[int, ...]]:
+        """
+        One-permutation MinHash: один хэш на шингл, минимум внутри каждой из
+        num_perm корзин — O(шинглов), а не O(шинглов * num_perm). Пустые
+        корзины заполняются из следующей непустой (densification по кругу).
+        """
+        k = self.num_perm
+        bins: List[Optional[int]] = [None] * k
+        for shingle in _shingles(item):
+            h = _hash64(shingle)
+            b = h % k
+            v = h // k
+            if bins[b] is None or v < bins[b]:
+                bins[b] = v
+        if all(v is None for v in bins):
+            return None
+
+        signature = []
+        for i in range(k):
+            step = 0
+            while bins[(i + step) % k] is None:
+                step += 1
+            # Смещение по расстоянию: заимствованные значения не совпадают с "родными"
+            signature.append(bins[(i + step) % k] + step * _OFFSET)
+        return tuple(signature)
+
+    def _band_keys(self, signature: Tuple[int, ...]):
+        for band in range(self.bands):
+            yield band, signature[band * self.rows:(band + 1) * self.rows]
+
+    def _remove(self, doc_id: str) -> Optional[int]:
+        """Убирает вакансию; возвращает её кластер, если в нём кто-то остался."""
+        doc = self._docs.pop(doc_id)
+        if doc.signature is not None:
+            for key in self._band_keys(doc.signature):
+                bucket = self._buckets.get(key)
+                if bucket is not None:
+                    bucket.discard(doc_id)
+                    if not bucket:
+                        del self._buckets[key]
+        for token in doc.title or ("",):
+            posting = self._titles[token]
+            posting.discard(doc_id)
+            if not posting:
+                del self._titles[token]
+
+        cluster = self._cluster.pop(doc_id)
+        members = self._members[cluster]
+        members.discard(doc_id)
+        if members:
+            return cluster
+        del self._members[cluster]
+        del self._head[cluster]
+        return None
+
+    def _add(self, doc_id: str, item: Any, fingerprint: int, seq: int) -> None:
+        signature = self._signature(item)
+        doc = _Doc(fingerprint, signature, set(tokenize(_field(item, "title") or "")), seq)
+        self._docs[doc_id] = doc
+        if signature is not None:
+            for key in self._band_keys(signature):
+                self._buckets[key].add(doc_id)
+        # Пустое название — тоже "слово": такие сравниваются только между собой
+        for token in doc.title or ("",):
+            self._titles[token].add(doc_id)
+        self._link(doc_id)
+
+    def sync(self, items: Iterable[Any]) -> None:
+        keep = set()
+        changed = []
+        for item in items:
+            doc_id = str(_field(item, "id"))
+            keep.add(doc_id)
+            fp = _fingerprint(item)
+            doc = self._docs.get(doc_id)
+            if doc is None or doc.fingerprint != fp:
+                changed.append((doc_id, item, fp))
+
+        # Сначала удаления (и старые версии изменённых), потом добавления
+        seqs = {}
+        broken = set()
+        for doc_id in [d for d in self._docs if d not in keep]:
+            broken.add(self._remove(doc_id))
+        for doc_id, _, _ in changed:
+            if doc_id in self._docs:
+                seqs[doc_id] = self._docs[doc_id].seq
+                broken.add(self._remove(doc_id))
+        for cluster in broken:
+            # Кластер мог опустеть целиком уже после того, как его задели
+            if cluster in self._members:
+                self._recluster(cluster)
+
+        for doc_id, item, fp in changed:
+            seq = seqs.get(doc_id)
+            if seq is None:
+                seq = self._seq
+                self._seq += 1
+            self._add(doc_id, item, fp, seq)
+
+    # -----------------------------
+    # CLUSTERS
+    # -----------------------------
+
+    def _similar(self, a: _Doc, b: _Doc) -> bool:
+        # Одинаковый шаблон описания у разных вакансий компании — не дубль.
+        # Названия сравниваются первыми: это дешевле сигнатур
+        union = a.title | b.title
+        if union and len(a.title & b.title) / len(union) < self.title_min:
+            return False
+        same = sum(x == y for x, y in zip(a.signature, b.signature))
+        return same >= self.threshold * len(a.signature)
+
+    def _new_cluster(self, doc_id: str) -> int:
+        cluster = self._next_cluster
+        self._next_cluster += 1
+        self._cluster[doc_id] = cluster
+        self._members[cluster] = {doc_id}
+        self._head[cluster] = doc_id
+        return cluster
+
+    def _merge(self, a: int, b: int) -> int:
+        """Меньший кластер вливается в больший; канонической остаётся самая ранняя."""
+        if len(self._members[a]) < len(self._members[b]):
+            a, b = b, a
+        for doc_id in self._members.pop(b):
+            self._cluster[doc_id] = a
+            self._members[a].add(doc_id)
+        head = self._head.pop(b)
+        if self._docs[head].seq < self._docs[self._head[a]].seq:
+            self._head[a] = head
+        return a
+
+    def _title_pool(self, doc: _Doc) -> Set[str]:
+        """
+        Вакансии, чьё название может пройти title_min. При сходстве J >= t
+        общих слов не меньше ceil(t * |A|), значит среди любых
+        |A| - ceil(t * |A|) + 1 слов A есть общее — берутся самые редкие.
+        """
+        if not doc.title:
+            return self._titles.get("", set())
+        need = len(doc.title) - math.ceil(self.title_min * len(doc.title)) + 1
+        rare = sorted(doc.title, key=lambda token: len(self._titles.get(token, ())))
+        return set().union(*(self._titles.get(token, ()) for token in rare[:max(1, need)]))
+
+    def _link(self, doc_id: str, within: Optional[Set[str]] = None) -> None:
+        """Кластер для вакансии: проверяются только соседи по её корзинам."""
+        doc = self._docs[doc_id]
+        cluster = self._new_cluster(doc_id)
+        if doc.signature is None:
+            return
+        mates = set().union(*(self._buckets.get(key, ()) for key in self._band_keys(doc.signature)))
+        mates &= self._title_pool(doc)
+        if within is not None:
+            mates &= within
+        for other in mates:
+            other_cluster = self._cluster.get(other)
+            # Ещё не размещённые (при пересборке) сами проверят эту вакансию
+            if other_cluster is None or other_cluster == cluster:
+                continue
+            if self._similar(doc, self._docs[other]):
+                cluster = self._merge(cluster, other_cluster)
+
+    def _recluster(self, cluster: int) -> None:
+        """
+        После удаления кластер мог распасться: пересобирается только он сам —
+        с остальными вакансиями его участники уже были сравнены.
+        """
+        members = self._members.pop(cluster)
+        del self._head[cluster]
+        for doc_id in members:
+            del self._cluster[doc_id]
+        for doc_id in sorted(members, key=lambda d: self._docs[d].seq):
+            self._link(doc_id, within=members)
+
+    def canonical_id(self, doc_id: str) -> str:
+        cluster = self._cluster.get(doc_id)
+        return self._head[cluster] if cluster is not None else doc_id
+
+    def dedupe(self, items: List[Any]) -> List[Any]:
+        """Оставляет по одной (канонической) вакансии из каждой группы дублей."""
+        self.sync(items)
+        by_id = {}
+        for item in items:
+            by_id.setdefault(str(_field(item, "id")), item)
+        result = []
+        emitted = set()
+        for item in items:
+            canonical = self.canonical_id(str(_field(item, "id")))
+            if canonical in emitted:
+                continue
+            emitted.add(canonical)
+            result.append(by_id.get(canonical, item))
+        return result
+
+    def duplicates(self) -> int:
+        return len(self._docs) - len(self._members)
+
+
+vacancy_deduper = VacancyDeduper(
+    num_perm=settings.DEDUP_NUM_PERM,
+    bands=settings.DEDUP_BANDS,
+    threshold=settings.DEDUP_THRESHOLD,
+)
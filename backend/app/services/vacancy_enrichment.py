@@ -0,0 +1,64 @@
+import asyncio
+from typing import List, Optional
+
+from app.core.config import settings
+from app.services.hh_parser import RetryBudget, get_hh_client, hh_get
+from app.services.vacancy_store import get_vacancy_store
+from app.utils.html_text import html_to_text
+
+
+async def enrich_vacancies(
+    ids: Optional[List[str]] = None,
+    client=None,
+    store=None,
+) -> dict:
+    """
+    Догружает полные карточки вакансий (/vacancies/{id}): описание и key_skills.
+
+    HTML описания чистится здесь, один раз при ингестии — код на запросе
+    пользователя получает готовый текст из хранилища и в сеть не ходит.
+    Вакансии со свежими деталями (моложе HH_DETAIL_TTL) пропускаются.
+    Закрытые (404/410) удаляются из хранилища, иначе их запрашивали бы вечно.
+    """
+    store = store or get_vacancy_store()
+    client = client or get_hh_client()
+
+    if ids is None:
+        ids = await asyncio.to_thread(
+            store.stale_detail_ids, settings.HH_DETAIL_TTL, settings.HH_ENRICH_BATCH
+        )
+    if not ids:
+        return {"requested": 0, "enriched": 0, "gone": 0, "failed": 0}
+
+    semaphore = asyncio.Semaphore(settings.HH_CONCURRENCY)
+    budget = RetryBudget(settings.HH_RETRY_BUDGET)
+    gone: List[str] = []
+
+    async def fetch(vacancy_id: str):
+        async with semaphore:
+            try:
+                response = await hh_get(client, f"/vacancies/{vacancy_id}", budget=budget)
+                if response.status_code in (404, 410):
+                    gone.append(vacancy_id)
+                    return None
+                response.raise_for_status()
+            except Exception as e:
+                print(f"Не удалось загрузить вакансию {vacancy_id}: {e}")
+                return None
+
+        data = response.json()
+        description = html_to_text(data.get("description") or "")
+        key_skills = [s["name"] for s in data.get("key_skills") or [] if s.get("name")]
+        return vacancy_id, description, key_skills
+
+    results = [r for r in await asyncio.gather(*(fetch(i) for i in ids)) if r]
+    saved = await asyncio.to_thread(store.save_details, results)
+    if gone:
+        await asyncio.to_thread(store.delete, gone)
+
+    return {
+        "requested": len(ids),
+        "enriched": saved,
+        "gone": len(gone),
+        "failed": len(ids) - saved - len(gone),
+    }
@@ -0,0 +1,166 @@
+import re
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from app.schemas.matching import VacancyFilters
+from app.services.skill_scoring import skill_keys
+from app.services.skill_taxonomy import skill_taxonomy
+
+_REMOTE_RE = re.compile(r"удал[её]нн|дистанцион|remote|home office", re.IGNORECASE)
+_SPLIT_RE = re.compile(r"\s*[/,;|]\s*")
+
+Facet = Tuple[str, str]
+
+
+def _field(obj: Any, key: str):
+    return obj.get(key) if isinstance(obj, dict) else getattr(obj, key, None)
+
+
+def _norm(value: str) -> str:
+    return " ".join(str(value or "").lower().replace("ё", "е").split())
+
+
+def _locations(value: Optional[str]) -> Set[str]:
+    """"Астана / Удаленно" -> {"астана", "удаленно"}."""
+    return {_norm(part) for part in _SPLIT_RE.split(value or "") if _norm(part)}
+
+
+def _is_remote(item: Any) -> bool:
+    remote = _field(item, "remote")
+    if remote is not None:
+        return bool(remote)
+    return bool(_REMOTE_RE.search(f"{_field(item, 'location') or ''} {_field(item, 'title') or ''}"))
+
+
+def _facets(item: Any) -> Set[Facet]:
+    values: Set[Facet] = {("location", loc) for loc in _locations(_field(item, "location"))}
+    company = _norm(_field(item, "company"))
+    if company:
+        values.add(("company", company))
+    values.add(("remote", "1" if _is_remote(item) else "0"))
+
+    skills = skill_keys([*(_field(item, "requirements") or []), *(_field(item, "skills") or [])])
+    described = _field(item, "skill_ids")
+    if described is None:
+        described = skill_taxonomy.extract(_field(item, "description") or "")
+    skills.update(skill_taxonomy.keys[i] for i in described)
+    values.update(("skill", key) for key in skills)
+    return values
+
+
+class FacetIndex:
+    """
+    Битовые индексы по локации, компании, формату работы и навыкам:
+    (фасет, значение) -> int, где бит i — вакансия в слоте i.
+    Фильтр считается как OR/AND/AND NOT масок, без обхода самих вакансий.
+
+    sync() инкрементальный: фасеты пересчитываются только для новых и
+    изменённых вакансий, слоты удалённых переиспользуются.
+    """
+
+    def __init__(self):
+        self._postings: Dict[Facet, int] = defaultdict(int)
+        self._slots: Dict[str, int] = {}
+        self._ids: Dict[int, str] = {}
+        self._facets: Dict[str, Set[Facet]] = {}
+        self._fingerprints: Dict[str, int] = {}
+        self._free: List[int] = []
+        self._all = 0
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    # -----------------------------
+    # SYNC
+    # -----------------------------
+
+    def _remove(self, doc_id: str) -> None:
+        slot = self._slots.pop(doc_id)
+        bit = 1 << slot
+        for facet in self._facets.pop(doc_id):
+            mask = self._postings[facet] & ~bit
+            if mask:
+                self._postings[facet] = mask
+            else:
+                del self._postings[facet]
+        del self._ids[slot]
+        del self._fingerprints[doc_id]
+        self._all &= ~bit
+        self._free.append(slot)
+
+    def _add(self, doc_id: str, item: Any, fingerprint: int) -> None:
+        slot = self._free.pop() if self._free else len(self._slots)
+        bit = 1 << slot
+        facets = _facets(item)
+        for facet in facets:
+            self._postings[facet] |= bit
+        self._slots[doc_id] = slot
+        self._ids[slot] = doc_id
+        self._facets[doc_id] = facets
+        self._fingerprints[doc_id] = fingerprint
+        self._all |= bit
+
+    def sync(self, items: Iterable[Any]) -> None:
+        keep = set()
+        for item in items:
+            doc_id = str(_field(item, "id"))
+            keep.add(doc_id)
+            fp = hash((
+                _field(item, "location"),
+                _field(item, "company"),
+                _field(item, "title"),
+                _field(item, "remote"),
+                tuple(_field(item, "requirements") or ()),
+                tuple(_field(item, "skills") or ()),
+                tuple(_field(item, "skill_ids") or ()),
+                _field(item, "description"),
+            ))
+            if self._fingerprints.get(doc_id) != fp:
+                if doc_id in self._slots:
+                    self._remove(doc_id)
+                self._add(doc_id, item, fp)
+
+        for doc_id in [d for d in self._slots if d not in keep]:
+            self._remove(doc_id)
+
+    # -----------------------------
+    # FILTER
+    # -----------------------------
+
+    def _any(self, facet: str, values: Iterable[str]) -> int:
+        mask = 0
+        for value in values:
+            mask |= self._postings.get((facet, value), 0)
+        return mask
+
+    def mask(self, filters: VacancyFilters) -> int:
+        result = self._all
+        if filters.locations:
+            result &= self._any("location", {l for v in filters.locations for l in _locations(v)})
+        if filters.companies:
+            result &= self._any("company", map(_norm, filters.companies))
+        if filters.exclude_companies:
+            result &= ~self._any("company", map(_norm, filters.exclude_companies))
+        if filters.remote is not None:
+            result &= self._postings.get(("remote", "1" if filters.remote else "0"), 0)
+        if filters.skills:
+            for key in skill_keys(filters.skills) or {""}:
+                result &= self._postings.get(("skill", key), 0)
+        if filters.any_skills:
+            result &= self._any("skill", skill_keys(filters.any_skills))
+        return result
+
+    def allowed(self, filters: Optional[VacancyFilters]) -> Optional[Set[str]]:
+        """id вакансий, прошедших фильтры; None — фильтров нет."""
+        if filters is None or not filters.model_dump(exclude_none=True):
+            return None
+        mask = self.mask(filters)
+        ids = set()
+        while mask:
+            low = mask & -mask
+            ids.add(self._ids[low.bit_length() - 1])
+            mask ^= low
+        return ids
+
+
+vacancy_facets = FacetIndex()
@@ -0,0 +1,180 @@
+import math
+import re
+from collections import Counter, defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+# Вес полей вакансии при индексации (BM25F-lite: tf умножается на вес поля)
+FIELD_WEIGHTS = {
+    "title": 3.0,
+    "skills": 2.0,
+    "requirements": 2.0,
+    "description": 1.0,
+}
+
+_TOKEN_RE = re.compile(r"[a-zа-яё0-9]+[+#]*", re.IGNORECASE)
+
+# Грубый стемминг: "разработчика" и "разработчик" дают один терм
+_STEM_LEN = 7
+
+
+def tokenize(text: str) -> List[str]:
+    return [t[:_STEM_LEN] for t in _TOKEN_RE.findall((text or "").lower())]
+
+
+def _field(obj: Any, key: str):
+    """Безопасно извлекает поле из объекта или словаря."""
+    return obj.get(key) if isinstance(obj, dict) else getattr(obj, key, None)
+
+
+def _field_text(obj: Any, key: str) -> str:
+    value = _field(obj, key)
+    if isinstance(value, (list, tuple)):
+        return " ".join(str(v) for v in value)
+    return str(value or "")
+
+
+def _fingerprint(obj: Any) -> int:
+    return hash(tuple(_field_text(obj, f) for f in ("company", "location", "url", *FIELD_WEIGHTS)))
+
+
+class VacancyIndex:
+    """
+    In-process инвертированный индекс по вакансиям с ранжированием BM25.
+    sync() переиндексирует только новые и изменившиеся вакансии.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[str, float]] = defaultdict(dict)
+        self._doc_terms: Dict[str, Dict[str, float]] = {}
+        self._doc_len: Dict[str, float] = {}
+        self._fingerprints: Dict[str, int] = {}
+        self._items: Dict[str, Any] = {}
+        self._order: List[str] = []
+        self._total_len = 0.0
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    # -----------------------------
+    # INDEXING
+    # -----------------------------
+
+    def add(self, item: Any) -> None:
+        doc_id = str(_field(item, "id"))
+        if doc_id in self._items:
+            self.remove(doc_id)
+
+        terms: Dict[str, float] = defaultdict(float)
+        for field, weight in FIELD_WEIGHTS.items():
+            for token in tokenize(_field_text(item, field)):
+                terms[token] += weight
+
+        for term, tf in terms.items():
+            self._postings[term][doc_id] = tf
+
+        length = sum(terms.values())
+        self._doc_terms[doc_id] = terms
+        self._doc_len[doc_id] = length
+        self._fingerprints[doc_id] = _fingerprint(item)
+        self._items[doc_id] = item
+        self._total_len += length
+
+    def remove(self, doc_id: str) -> None:
+        if doc_id not in self._items:
+            return
+
+        for term in self._doc_terms.pop(doc_id):
+            posting = self._postings[term]
+            posting.pop(doc_id, None)
+            if not posting:
+                del self._postings[term]
+
+        self._total_len -= self._doc_len.pop(doc_id)
+        self._fingerprints.pop(doc_id)
+        self._items.pop(doc_id)
+
+    def sync(self, items: Iterable[Any]) -> None:
+        """Приводит индекс к заданному набору вакансий инкрементально."""
+        seen = []
+        for item in items:
+            doc_id = str(_field(item, "id"))
+            seen.append(doc_id)
+            if self._fingerprints.get(doc_id) != _fingerprint(item):
+                self.add(item)
+            else:
+                self._items[doc_id] = item
+
+        keep = set(seen)
+        for doc_id in [d for d in self._items if d not in keep]:
+            self.remove(doc_id)
+
+        self._order = list(dict.fromkeys(seen))
+
+    # -----------------------------
+    # SEARCH
+    # -----------------------------
+
+    def search(self, query: Dict[str, float], top_n: int, allowed: Optional[Set[str]] = None) -> List[Any]:
+        """
+        query — терм -> вес (см. build_query). Возвращает top_n вакансий по BM25;
+        если совпадений меньше, добивает оставшимися в исходном порядке.
+        allowed — ограничить выдачу этими id (фасетные фильтры).
+        """
+        n_docs = len(self._items)
+        if not n_docs:
+            return []
+
+        avgdl = self._total_len / n_docs or 1.0
+        scores: Dict[str, float] = defaultdict(float)
+
+        for term, q_weight in query.items():
+            posting = self._postings.get(term)
+            if not posting:
+                continue
+            idf = math.log(1 + (n_docs - len(posting) + 0.5) / (len(posting) + 0.5))
+            for doc_id, tf in posting.items():
+                if allowed is not None and doc_id not in allowed:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * self._doc_len[doc_id] / avgdl)
+                scores[doc_id] += q_weight * idf * tf * (self.k1 + 1) / (tf + norm)
+
+        ranked = sorted(scores, key=scores.get, reverse=True)[:top_n]
+        if len(ranked) < top_n:
+            chosen = set(ranked)
+            ranked += [
+                d for d in self._order
+                if d not in chosen and (allowed is None or d in allowed)
+            ][:top_n - len(ranked)]
+
+        return [self._items[d] for d in ranked]
+
+
+def build_query(
+    target_role: str,
+    user_skills: Optional[List[str]],
+    resume_text: Optional[str],
+    resume_terms: int = 60,
+) -> Dict[str, float]:
+    """
+    Запрос для BM25: роль и навыки весят больше, из резюме берём
+    только самые частые термы, чтобы длинный текст не размывал ранжирование.
+    """
+    query: Dict[str, float] = defaultdict(float)
+
+    for token in tokenize(target_role):
+        query[token] += 2.0
+
+    for skill in user_skills or []:
+        for token in tokenize(skill):
+            query[token] += 2.0
+
+    counts = Counter(t for t in tokenize(resume_text or "") if len(t) > 2)
+    for token, _ in counts.most_common(resume_terms):
+        query[token] += 0.5
+
+    return query
+
+
+vacancy_index = VacancyIndex()
@@ -0,0 +1,102 @@
+import asyncio
+import os
+import socket
+import time
+from typing import List, Optional
+
+from app.core.config import settings
+from app.services.hh_parser import fetch_internships_hh
+from app.services.vacancy_enrichment import enrich_vacancies
+from app.services.vacancy_store import get_vacancy_store
+
+_OWNER = f"{socket.gethostname()}:{os.getpid()}"
+
+
+async def ingest_hh(
+    queries: Optional[List[str]] = None,
+    area: Optional[int] = None,
+    client=None,
+    store=None,
+) -> dict:
+    """
+    Один проход ингестии: все поисковые запросы -> upsert в локальное хранилище.
+    client/store можно подменить (например, на httpx.MockTransport в тестах).
+    """
+    store = store or get_vacancy_store()
+    # Чистить можно только после полного прохода по штатным запросам
+    full_pass = queries is None and area is None
+    queries = queries or [q.strip() for q in settings.HH_QUERIES.split(",") if q.strip()]
+    area = area if area is not None else settings.HH_AREA
+
+    fetched = 0
+    changed = 0
+    failed = 0
+    for query in queries:
+        try:
+            items = await fetch_internships_hh(query=query, area=area, client=client, store=store)
+        except Exception as e:
+            print(f"Ошибка ингестии hh.ru ({query}): {e}")
+            failed += 1
+            continue
+        fetched += len(items)
+        changed += await asyncio.to_thread(store.upsert, items, "hh")
+
+    # Снятые с публикации вакансии пропадают из поиска: удаляем те, что не
+    # встречались HH_PRUNE_PASSES проходов. После сбойного прохода не чистим —
+    # вакансии упавшего запроса не "увидены" не потому, что закрыты
+    pruned = 0
+    if full_pass and not failed:
+        before = time.time() - settings.HH_INGEST_INTERVAL * settings.HH_PRUNE_PASSES
+        pruned = await asyncio.to_thread(store.prune_unseen, before)
+
+    return {"fetched": fetched, "changed": changed, "pruned": pruned, "total": store.count()}
+
+
+async def _ingest_loop():
+    store = get_vacancy_store()
+    interval = settings.HH_INGEST_INTERVAL
+    while True:
+        try:
+            # Качает только воркер, державший аренду; остальные читают ту же базу
+            if await asyncio.to_thread(store.try_lease, "hh_ingest", _OWNER, interval * 1.5):
+                stats = await ingest_hh(store=store)
+                print(f"hh.ru ingest: {stats}")
+                details = await enrich_vacancies(store=store)
+                print(f"hh.ru enrichment: {details}")
+                retagged = await asyncio.to_thread(store.retag_stale)
+                if retagged:
+                    print(f"vacancy skills retagged: {retagged}")
+                await asyncio.to_thread(store.refresh)
+        except Exception as e:
+            print(f"hh.ru ingest loop error: {e}")
+        await asyncio.sleep(interval)
+
+
+def _refresh_snapshot() -> None:
+    try:
+        get_vacancy_store().refresh()
+    except Exception as e:
+        print(f"vacancy snapshot refresh error: {e}")
+
+
+async def _refresh_loop():
+    # Ингестию ведёт один воркер, а снимок в памяти нужен каждому
+    while True:
+        await asyncio.sleep(settings.VACANCY_REFRESH_INTERVAL)
+        await asyncio.to_thread(_refresh_snapshot)
+
+
+async def start_vacancy_refresh() -> asyncio.Task:
+    """
+    Первое чтение снимка вакансий — до приёма запросов, дальше фоновое
+    обновление: запросы читают только память и не ждут SQLite.
+    """
+    await asyncio.to_thread(_refresh_snapshot)
+    return asyncio.create_task(_refresh_loop())
+
+
+def start_ingest() -> Optional[asyncio.Task]:
+    """Запускает фоновую ингестию, если она включена в настройках."""
+    if not settings.HH_INGEST_ENABLED:
+        return None
+    return asyncio.create_task(_ingest_loop())
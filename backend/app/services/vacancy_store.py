@@ -0,0 +1,344 @@
+import hashlib
+import json
+import threading
+import time
+from typing import Iterable, List, Optional, Tuple
+
+from app.core.config import settings
+from app.schemas.matching import InternshipItem
+from app.services.skill_taxonomy import skill_taxonomy, TAXONOMY_VERSION
+from app.utils.sqlite import connect
+
+
+class VacancyStore:
+    """
+    Локальное хранилище вакансий (SQLite, WAL), общее для всех воркеров.
+
+    version увеличивается при каждом реальном изменении набора вакансий —
+    по нему читатели понимают, что in-memory снимок устарел.
+
+    Запросы читают только снимок в памяти (snapshot()); с диска его
+    перечитывает refresh() — из фонового обновления, в потоке.
+    """
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = connect(path)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS vacancies (
+                id TEXT PRIMARY KEY,
+                source TEXT NOT NULL,
+                data TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                updated_at REAL NOT NULL,
+                seen_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS vacancy_details (
+                id TEXT PRIMARY KEY,
+                description TEXT NOT NULL,
+                key_skills TEXT NOT NULL,
+                fetched_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS vacancy_skills (
+                id TEXT PRIMARY KEY,
+                skill_ids TEXT NOT NULL,
+                taxonomy TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS http_validators (
+                key TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                meta TEXT
+            );
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            );
+            INSERT OR IGNORE INTO meta (key, value) VALUES ('version', '0');
+            """
+        )
+        self._conn.commit()
+
+        # (version, вакансии) — одна ссылка, чтобы читатель не увидел
+        # версию от одного снимка, а список от другого
+        self._snapshot: Tuple[Optional[int], List[InternshipItem]] = (None, [])
+
+    # -----------------------------
+    # VACANCIES
+    # -----------------------------
+
+    def _bump_version(self) -> None:
+        self._conn.execute(
+            "UPDATE meta SET value = CAST(value AS INTEGER) + 1 WHERE key = 'version'"
+        )
+
+    def upsert(self, items: Iterable[InternshipItem], source: str = "hh") -> int:
+        """Вставляет/обновляет вакансии по id. Возвращает число изменённых записей."""
+        now = time.time()
+        changed = 0
+        with self._lock:
+            for item in items:
+                data = item.model_dump_json()
+                fp = hashlib.sha1(data.encode("utf-8")).hexdigest()
+                row = self._conn.execute(
+                    "SELECT fingerprint FROM vacancies WHERE id = ?", (item.id,)
+                ).fetchone()
+
+                if row and row[0] == fp:
+                    self._conn.execute(
+                        "UPDATE vacancies SET seen_at = ? WHERE id = ?", (now, item.id)
+                    )
+                    continue
+
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO vacancies "
+                    "(id, source, data, fingerprint, updated_at, seen_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (item.id, source, data, fp, now, now),
+                )
+                # Детали (полное описание, key_skills) переживают обновление
+                # сниппета — навыки считаются по тому, что увидит подбор
+                full = self._conn.execute(self._SELECT + " WHERE v.id = ?", (item.id,)).fetchone()
+                self._tag(item.id, self._row_to_item(full), None)
+                changed += 1
+
+            if changed:
+                self._bump_version()
+            self._conn.commit()
+        return changed
+
+    @property
+    def version(self) -> int:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM meta WHERE key = 'version'"
+            ).fetchone()
+        return int(row[0])
+
+    _SELECT = (
+        "SELECT v.data, d.description, d.key_skills, s.skill_ids, s.taxonomy FROM vacancies v "
+        "LEFT JOIN vacancy_details d ON d.id = v.id "
+        "LEFT JOIN vacancy_skills s ON s.id = v.id"
+    )
+
+    @staticmethod
+    def _row_to_item(row) -> InternshipItem:
+        """Данные поиска + (если есть) обогащённые детали и навыки вакансии."""
+        item = InternshipItem.model_validate_json(row[0])
+        update = {}
+        if row[1] is not None:
+            update["description"] = row[1]
+            key_skills = json.loads(row[2])
+            if key_skills:
+                update["skills"] = key_skills
+        # Навыки от другой версии словаря не используем — скорер пересчитает сам
+        if row[3] is not None and row[4] == TAXONOMY_VERSION:
+            update["skill_ids"] = json.loads(row[3])
+        return item.model_copy(update=update) if update else item
+
+    def refresh(self) -> Tuple[int, List[InternshipItem]]:
+        """Перечитывает снимок с диска, если сменилась version. Блокирующий."""
+        version = self.version
+        if version != self._snapshot[0]:
+            with self._lock:
+                rows = self._conn.execute(
+                    self._SELECT + " ORDER BY v.updated_at DESC, v.id"
+                ).fetchall()
+            self._snapshot = (version, [self._row_to_item(r) for r in rows])
+        return self._snapshot
+
+    def snapshot(self) -> Tuple[Optional[int], List[InternshipItem]]:
+        """(version, вакансии) из памяти, без SQLite; version None — ещё не читали."""
+        return self._snapshot
+
+    def all(self) -> List[InternshipItem]:
+        """Актуальный снимок всех вакансий (блокирующий, для фоновых задач)."""
+        return self.refresh()[1]
+
+    def get(self, vacancy_id: str) -> Optional[InternshipItem]:
+        with self._lock:
+            row = self._conn.execute(
+                self._SELECT + " WHERE v.id = ?", (vacancy_id,)
+            ).fetchone()
+        return self._row_to_item(row) if row else None
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM vacancies").fetchone()[0]
+
+    def mark_seen(self, ids: Iterable[str]) -> None:
+        """Вакансии всё ещё в выдаче (страница поиска не изменилась, 304)."""
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE vacancies SET seen_at = ? WHERE id = ?", [(now, i) for i in ids]
+            )
+            self._conn.commit()
+
+    def _delete(self, ids: List[str]) -> None:
+        rows = [(i,) for i in ids]
+        for table in ("vacancies", "vacancy_details", "vacancy_skills"):
+            self._conn.executemany(f"DELETE FROM {table} WHERE id = ?", rows)
+
+    def delete(self, ids: Iterable[str]) -> int:
+        """Удаляет вакансии (например, закрытые на hh.ru) вместе с деталями и навыками."""
+        ids = list(ids)
+        with self._lock:
+            if ids:
+                self._delete(ids)
+                self._bump_version()
+            self._conn.commit()
+        return len(ids)
+
+    def prune_unseen(self, before: float) -> int:
+        """Удаляет вакансии, которых нет в поиске с момента before (сняты с публикации)."""
+        with self._lock:
+            ids = [
+                r[0] for r in self._conn.execute(
+                    "SELECT id FROM vacancies WHERE seen_at < ?", (before,)
+                )
+            ]
+            if ids:
+                self._delete(ids)
+                self._bump_version()
+            self._conn.commit()
+        return len(ids)
+
+    # -----------------------------
+    # DETAILS (ENRICHMENT)
+    # -----------------------------
+
+    def stale_detail_ids(self, max_age: float, limit: int) -> List[str]:
+        """Вакансии без деталей или с деталями старше max_age секунд."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT v.id FROM vacancies v LEFT JOIN vacancy_details d ON d.id = v.id "
+                "WHERE d.id IS NULL OR d.fetched_at < ? "
+                "ORDER BY d.fetched_at IS NOT NULL, v.updated_at DESC LIMIT ?",
+                (time.time() - max_age, limit),
+            ).fetchall()
+        return [r[0] for r in rows]
+
+    def save_details(self, details: Iterable[Tuple[str, str, List[str]]]) -> int:
+        """details — (id, текст описания без HTML, key_skills)."""
+        now = time.time()
+        saved = 0
+        with self._lock:
+            for vacancy_id, description, key_skills in details:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO vacancy_details (id, description, key_skills, fetched_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    (vacancy_id, description, json.dumps(key_skills, ensure_ascii=False), now),
+                )
+                row = self._conn.execute(
+                    "SELECT data FROM vacancies WHERE id = ?", (vacancy_id,)
+                ).fetchone()
+                if row:
+                    item = InternshipItem.model_validate_json(row[0])
+                    self._tag(vacancy_id, item, (description, key_skills))
+                saved += 1
+            if saved:
+                self._bump_version()
+            self._conn.commit()
+        return saved
+
+    # -----------------------------
+    # SKILLS
+    # -----------------------------
+
+    def _tag(self, vacancy_id: str, item: InternshipItem, details) -> None:
+        """Навыки вакансии по словарю — один раз при записи, а не на каждый подбор."""
+        description, key_skills = details or (item.description, item.skills)
+        texts = [item.title, description or "", *(item.requirements or []), *(key_skills or [])]
+        ids = sorted(skill_taxonomy.extract_all(texts))
+        self._conn.execute(
+            "INSERT OR REPLACE INTO vacancy_skills (id, skill_ids, taxonomy) VALUES (?, ?, ?)",
+            (vacancy_id, json.dumps(ids), TAXONOMY_VERSION),
+        )
+
+    def retag_stale(self, limit: int = 5000) -> int:
+        """Пересчитывает навыки вакансий, размеченных другой версией словаря."""
+        with self._lock:
+            rows = self._conn.execute(
+                self._SELECT + " WHERE s.id IS NULL OR s.taxonomy != ? LIMIT ?",
+                (TAXONOMY_VERSION, limit),
+            ).fetchall()
+            for row in rows:
+                item = self._row_to_item(row)
+                self._tag(item.id, item, None)
+            if rows:
+                self._bump_version()
+            self._conn.commit()
+        return len(rows)
+
+    # -----------------------------
+    # CONDITIONAL REQUESTS
+    # -----------------------------
+
+    def get_validators(self, key: str) -> Tuple[Optional[str], Optional[str], Optional[dict]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified, meta FROM http_validators WHERE key = ?", (key,)
+            ).fetchone()
+        if not row:
+            return None, None, None
+        return row[0], row[1], json.loads(row[2]) if row[2] else None
+
+    def set_validators(
+        self,
+        key: str,
+        etag: Optional[str],
+        last_modified: Optional[str],
+        meta: Optional[dict] = None,
+    ) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO http_validators (key, etag, last_modified, meta) "
+                "VALUES (?, ?, ?, ?)",
+                (key, etag, last_modified, json.dumps(meta) if meta is not None else None),
+            )
+            self._conn.commit()
+
+    # -----------------------------
+    # CROSS-WORKER LEASE
+    # -----------------------------
+
+    def try_lease(self, name: str, owner: str, ttl: float) -> bool:
+        """
+        Простая аренда через SQLite: фоновую задачу выполняет только тот воркер,
+        который держит аренду, остальные пропускают цикл.
+        """
+        now = time.time()
+        key = f"lease:{name}"
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT value FROM meta WHERE key = ?", (key,)
+                ).fetchone()
+                if row:
+                    holder, expires = json.loads(row[0])
+                    if holder != owner and expires > now:
+                        self._conn.execute("ROLLBACK")
+                        return False
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                    (key, json.dumps([owner, now + ttl])),
+                )
+                self._conn.execute("COMMIT")
+                return True
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+
+_store: Optional[VacancyStore] = None
+
+
+def get_vacancy_store() -> VacancyStore:
+    """Ленивая инициализация: база создаётся при первом обращении."""
+    global _store
+    if _store is None:
+        _store = VacancyStore(settings.VACANCY_DB_PATH)
+    return _store
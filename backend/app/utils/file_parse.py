@@ -1,22 +1,237 @@
+import asyncio
+import multiprocessing
+import zipfile
 from io import BytesIO
+from typing import List, Optional, Set
+from xml.etree import ElementTree
 
-def parse_pdf(data: bytes) -> str:
+from app.core.config import settings
+
+# Увеличивать при любом изменении результата извлечения (2 — ячейки таблиц DOCX):
+# входит в ключ кэша текста резюме, старые записи перестают совпадать
+PARSER_VERSION = 2
+
+
+class ParseTimeout(Exception):
+    """Разбор файла не уложился в RESUME_PARSE_TIMEOUT."""
+
+
+def _enough(collected: int, max_chars: Optional[int]) -> bool:
+    return max_chars is not None and collected >= max_chars
+
+
+def parse_pdf(data: bytes, max_chars: Optional[int] = None, max_pages: Optional[int] = None) -> str:
     from pypdf import PdfReader
     reader = PdfReader(BytesIO(data))
     parts = []
-    for page in reader.pages:
-        parts.append(page.extract_text() or "")
+    collected = 0
+    # Страницы извлекаются лениво — останавливаемся, как только текста хватает
+    for i, page in enumerate(reader.pages):
+        if max_pages is not None and i >= max_pages:
+            break
+        text = page.extract_text() or ""
+        parts.append(text)
+        collected += len(text)
+        if _enough(collected, max_chars):
+            break
     return "\n".join(parts).strip()
 
-def parse_docx(data: bytes) -> str:
-    from docx import Document
-    doc = Document(BytesIO(data))
-    return "\n".join([p.text for p in doc.paragraphs]).strip()
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+
+def parse_docx(data: bytes, max_chars: Optional[int] = None) -> str:
+    """
+    Потоковый разбор word/document.xml через iterparse, без объектной модели
+    python-docx: память не растёт с размером документа (картинки вообще
+    не читаются), а текст из таблиц — частый макет резюме — не теряется.
+    Строка таблицы выводится как "ячейка | ячейка".
+    """
+    lines: List[str] = []
+    collected = 0
+    paragraphs: List[List[str]] = []   # стек: в текстовых полях w:p вложены в w:p
+    cells: List[List[str]] = []        # стек ячеек (вложенные таблицы)
+    rows: List[List[str]] = []
 
-def extract_text(filename: str, data: bytes) -> str:
+    def emit(text: str) -> None:
+        nonlocal collected
+        if cells:
+            cells[-1].append(text)
+        elif text:
+            lines.append(text)
+            collected += len(text) + 1
+
+    with zipfile.ZipFile(BytesIO(data)) as archive:
+        with archive.open("word/document.xml") as xml:
+            for event, elem in ElementTree.iterparse(xml, events=("start", "end")):
+                tag = elem.tag
+                if event == "start":
+                    if tag == _W + "p":
+                        paragraphs.append([])
+                    elif tag == _W + "tr":
+                        rows.append([])
+                    elif tag == _W + "tc":
+                        cells.append([])
+                    continue
+
+                if tag == _W + "t":
+                    if paragraphs:
+                        paragraphs[-1].append(elem.text or "")
+                elif tag == _W + "tab":
+                    if paragraphs:
+                        paragraphs[-1].append("\t")
+                elif tag in (_W + "br", _W + "cr"):
+                    if paragraphs:
+                        paragraphs[-1].append("\n")
+                elif tag == _W + "p":
+                    emit("".join(paragraphs.pop()).strip())
+                    elem.clear()
+                elif tag == _W + "tc":
+                    text = " ".join(p for p in cells.pop() if p)
+                    if rows and text:
+                        rows[-1].append(text)
+                elif tag == _W + "tr":
+                    emit(" | ".join(rows.pop()))
+                    elem.clear()
+
+                if _enough(collected, max_chars):
+                    break
+
+    return "\n".join(lines).strip()
+
+def extract_text(
+    filename: str,
+    data: bytes,
+    max_chars: Optional[int] = None,
+    max_pages: Optional[int] = None,
+) -> str:
+    """
+    max_chars / max_pages — ранняя остановка: дальше текст всё равно
+    обрежется бюджетом промпта, так что лишние страницы не разбираем.
+    """
     lower = filename.lower()
     if lower.endswith(".pdf"):
-        return parse_pdf(data)
-    if lower.endswith(".docx"):
-        return parse_docx(data)
-    return data.decode("utf-8", errors="ignore").strip()
\ No newline at end of file
+        text = parse_pdf(data, max_chars, max_pages)
+    elif lower.endswith(".docx"):
+        text = parse_docx(data, max_chars)
+    else:
+        text = data.decode("utf-8", errors="ignore").strip()
+    return text[:max_chars] if max_chars is not None else text
+
+
+# -----------------------------
+# ПУЛ ПРОЦЕССОВ
+# -----------------------------
+
+# pypdf / python-docx — чистый Python и держат GIL, поэтому разбор идёт
+# в отдельных процессах, а не потоках. Пул свой, а не ProcessPoolExecutor:
+# там смерть одного воркера ломает весь пул и чужие задачи вместе с ним,
+# а здесь при таймауте убивается только зависший процесс.
+
+
+class ParseWorkerDied(Exception):
+    """Процесс разбора упал (например, OOM на кривом PDF)."""
+
+
+def _worker_main(conn) -> None:
+    while True:
+        try:
+            args = conn.recv()
+        except EOFError:
+            return
+        try:
+            conn.send((True, extract_text(*args)))
+        except Exception as e:
+            # Исключения парсеров не всегда pickle-совместимы — передаём текстом
+            conn.send((False, f"{type(e).__name__}: {e}"))
+
+
+class _Worker:
+    def __init__(self, ctx):
+        self.conn, child = ctx.Pipe()
+        self.process = ctx.Process(target=_worker_main, args=(child,), daemon=True)
+        self.process.start()
+        child.close()
+
+    def call(self, args: tuple):
+        # Файл до 5 МБ не влезает в буфер pipe — отправка тоже вне event loop
+        self.conn.send(args)
+        return self.conn.recv()
+
+    def kill(self) -> None:
+        # Поток, ждущий conn.recv(), получит EOFError и завершится сам
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join(timeout=1)
+
+
+class _ParsePool:
+    def __init__(self, size: int):
+        # spawn — fork процесса с потоками (uvicorn, httpx) небезопасен
+        self._ctx = multiprocessing.get_context("spawn")
+        self._slots = asyncio.Semaphore(size)
+        self._idle: List[_Worker] = []
+        self._all: Set[_Worker] = set()
+
+    async def run(self, args: tuple, timeout: float):
+        async with self._slots:
+            worker = None
+            while self._idle:
+                worker = self._idle.pop()
+                if worker.process.is_alive():
+                    break
+                # Простаивающий процесс мог умереть (OOM killer и т.п.)
+                self._all.discard(worker)
+                worker.kill()
+                worker = None
+            if worker is None:
+                worker = _Worker(self._ctx)
+                self._all.add(worker)
+            healthy = False
+            try:
+                ok, result = await asyncio.wait_for(asyncio.to_thread(worker.call, args), timeout)
+                healthy = True
+            except asyncio.TimeoutError:
+                raise
+            except (EOFError, OSError):
+                raise ParseWorkerDied("Parse worker died")
+            finally:
+                if healthy:
+                    self._idle.append(worker)
+                else:
+                    # Таймаут, падение или отмена — убиваем только этот процесс
+                    self._all.discard(worker)
+                    worker.kill()
+        if not ok:
+            raise ValueError(result)
+        return result
+
+    def close(self) -> None:
+        for worker in list(self._all):
+            worker.kill()
+        self._all.clear()
+        self._idle.clear()
+
+
+_pool: Optional[_ParsePool] = None
+
+
+def close_parse_pool() -> None:
+    global _pool
+    if _pool is not None:
+        _pool.close()
+        _pool = None
+
+
+async def extract_text_async(
+    filename: str,
+    data: bytes,
+    max_chars: Optional[int] = None,
+    max_pages: Optional[int] = None,
+) -> str:
+    global _pool
+    if _pool is None:
+        _pool = _ParsePool(settings.RESUME_PARSE_WORKERS)
+    try:
+        return await _pool.run((filename, data, max_chars, max_pages), settings.RESUME_PARSE_TIMEOUT)
+    except asyncio.TimeoutError:
+        raise ParseTimeout(f"Parsing {filename} took longer than {settings.RESUME_PARSE_TIMEOUT}s")
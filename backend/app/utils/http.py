@@ -0,0 +1,27 @@
+import math
+from typing import NoReturn
+
+from fastapi import HTTPException
+
+from app.services.openai_client import llm_rate_limited
+
+
+def retry_after_seconds(retry_after: float) -> int:
+    """Retry-After — целые секунды, округление вверх (не раньше, чем можно)."""
+    return max(1, math.ceil(retry_after))
+
+
+def raise_llm_busy(retry_after: float) -> NoReturn:
+    """Лимиты OpenAI — это 503 с Retry-After, а не 500."""
+    raise HTTPException(
+        status_code=503,
+        detail="LLM is busy, try again later",
+        headers={"Retry-After": str(retry_after_seconds(retry_after))},
+    )
+
+
+def raise_if_rate_limited(out) -> None:
+    """503, если run_llm вернул llm_rate_limited."""
+    retry_after = llm_rate_limited(out)
+    if retry_after is not None:
+        raise_llm_busy(retry_after)
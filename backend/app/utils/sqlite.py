@@ -0,0 +1,17 @@
+import sqlite3
+from pathlib import Path
+
+
+def connect(path: str) -> sqlite3.Connection:
+    """
+    Открывает SQLite базу в WAL-режиме: читатели не блокируют писателя,
+    и одну базу могут делить несколько процессов uvicorn.
+    """
+    if path != ":memory:":
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+
+    conn = sqlite3.connect(path, timeout=5.0, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=5000")
+    return conn
@@ -0,0 +1,14 @@
+import json
+from typing import Any
+
+
+def sse_event(event: str, data: Any) -> str:
+    """Одно событие Server-Sent Events с JSON в data."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    # nginx не должен буферизовать поток
+    "X-Accel-Buffering": "no",
+}
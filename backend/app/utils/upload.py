@@ -0,0 +1,65 @@
+import json
+
+from fastapi import HTTPException, UploadFile
+
+_CHUNK = 64 * 1024
+
+
+async def read_upload(file: UploadFile, max_bytes: int) -> bytes:
+    """Читает файл кусками и прерывается, как только превышен лимит."""
+    if file.size is not None and file.size > max_bytes:
+        raise HTTPException(status_code=413, detail=f"File {file.filename} is larger than {max_bytes} bytes")
+
+    chunks = []
+    total = 0
+    while chunk := await file.read(_CHUNK):
+        total += len(chunk)
+        if total > max_bytes:
+            raise HTTPException(status_code=413, detail=f"File {file.filename} is larger than {max_bytes} bytes")
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+class BodySizeLimitMiddleware:
+    """
+    Лимит на тело запроса, который срабатывает во время приёма:
+    по Content-Length — сразу, без него — как только пришло больше max_bytes.
+    Multipart разбирается до вызова обработчика, так что проверять размер
+    внутри роутов уже поздно — файл к тому моменту целиком лежит на диске.
+    """
+
+    def __init__(self, app, max_bytes: int):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        headers = dict(scope.get("headers") or [])
+        length = headers.get(b"content-length")
+        if length is not None and length.isdigit() and int(length) > self.max_bytes:
+            return await self._reject(send)
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    # Ловится обработчиком исключений FastAPI -> 413
+                    raise HTTPException(status_code=413, detail="Request body too large")
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+    async def _reject(self, send):
+        body = json.dumps({"detail": "Request body too large"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,142 @@
+"""
+Сравнение извлечения текста из DOCX: python-docx (Document) против
+потокового parse_docx (iterparse по word/document.xml).
+
+    cd backend
+    python -m scripts.bench_docx                 # синтетический корпус
+    python -m scripts.bench_docx --corpus ~/cv   # свои *.docx
+    python -m scripts.bench_docx --max-chars 20000
+
+Печатает время, пик памяти (tracemalloc) и сколько текста нашёл каждый способ.
+Нужен установленный python-docx.
+"""
+import argparse
+import io
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+# Settings требует ключ, хотя OpenAI здесь не вызывается
+os.environ.setdefault("OPENAI_API_KEY", "unused")
+
+from app.utils.file_parse import parse_docx  # noqa: E402
+
+
+def python_docx_text(data: bytes, max_chars=None) -> str:
+    """Старый путь: только абзацы верхнего уровня, таблицы не видны."""
+    from docx import Document
+    doc = Document(io.BytesIO(data))
+    return "\n".join(p.text for p in doc.paragraphs).strip()
+
+
+def _synthetic_corpus() -> list:
+    """Резюме трёх видов: обычный текст, макет таблицей, тяжёлое с картинкой."""
+    from docx import Document
+    from docx.shared import Inches
+
+    def save(doc) -> bytes:
+        buf = io.BytesIO()
+        doc.save(buf)
+        return buf.getvalue()
+
+    corpus = []
+
+    doc = Document()
+    doc.add_heading("Иван Петров — Python разработчик", 0)
+    for i in range(60):
+        doc.add_paragraph(f"Опыт {i}: разработка сервисов на FastAPI, PostgreSQL, Docker, Kubernetes.")
+    corpus.append(("plain", save(doc)))
+
+    doc = Document()
+    table = doc.add_table(rows=0, cols=2)
+    for i in range(80):
+        row = table.add_row().cells
+        row[0].text = f"2020-{i}"
+        row[1].text = f"Компания {i}: backend, Python, SQL, микросервисы, CI/CD"
+    corpus.append(("table_layout", save(doc)))
+
+    doc = Document()
+    image = io.BytesIO()
+    _write_png(image, 1200, 1200)
+    for i in range(5):
+        image.seek(0)
+        doc.add_picture(image, width=Inches(2))
+        for j in range(40):
+            doc.add_paragraph(f"Проект {i}.{j}: аналитика данных, pandas, ML-модели, A/B-тесты.")
+    corpus.append(("with_images", save(doc)))
+
+    big = Document()
+    for i in range(5000):
+        big.add_paragraph(f"Строка {i}: очень длинное резюме с историей проектов и навыков.")
+    corpus.append(("huge", save(big)))
+    return corpus
+
+
+def _write_png(out, width: int, height: int) -> None:
+    """Несжимаемая PNG без Pillow — чтобы DOCX был «тяжёлым»."""
+    import struct
+    import zlib
+
+    def chunk(kind: bytes, body: bytes) -> bytes:
+        return struct.pack(">I", len(body)) + kind + body + struct.pack(">I", zlib.crc32(kind + body) & 0xFFFFFFFF)
+
+    raw = b"".join(b"\x00" + os.urandom(width * 3) for _ in range(height))
+    out.write(b"\x89PNG\r\n\x1a\n")
+    out.write(chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)))
+    out.write(chunk(b"IDAT", zlib.compress(raw, 1)))
+    out.write(chunk(b"IEND", b""))
+
+
+def _measure(fn, data: bytes, max_chars, repeat: int):
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        text = fn(data, max_chars)
+        times.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    fn(data, max_chars)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(times), peak, len(text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", help="каталог с *.docx (по умолчанию — синтетический корпус)")
+    parser.add_argument("--max-chars", type=int, default=None, help="ранняя остановка для parse_docx")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.corpus:
+        corpus = [(p.name, p.read_bytes()) for p in sorted(Path(args.corpus).expanduser().glob("*.docx"))]
+    else:
+        corpus = _synthetic_corpus()
+    if not corpus:
+        sys.exit("no .docx files found")
+
+    header = f"{'file':<24}{'size KB':>9}  {'python-docx ms':>15}{'peak KB':>9}{'chars':>8}  {'iterparse ms':>13}{'peak KB':>9}{'chars':>8}"
+    print(header)
+    print("-" * len(header))
+    totals = [0.0, 0.0]
+    for name, data in corpus:
+        old_t, old_mem, old_len = _measure(python_docx_text, data, None, args.repeat)
+        new_t, new_mem, new_len = _measure(parse_docx, data, args.max_chars, args.repeat)
+        totals[0] += old_t
+        totals[1] += new_t
+        print(
+            f"{name[:23]:<24}{len(data) // 1024:>9}  "
+            f"{old_t * 1000:>15.1f}{old_mem // 1024:>9}{old_len:>8}  "
+            f"{new_t * 1000:>13.1f}{new_mem // 1024:>9}{new_len:>8}"
+        )
+    print("-" * len(header))
+    print(f"total: python-docx {totals[0] * 1000:.1f} ms, iterparse {totals[1] * 1000:.1f} ms "
+          f"(x{totals[0] / max(totals[1], 1e-9):.1f})")
+
+
+if __name__ == "__main__":
+    main()